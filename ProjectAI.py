@@ -3,10 +3,11 @@
 
 import sys
 import os
-import shutil
+import functools
 import subprocess
+import time
+import sqlite3
 import qdarktheme  
-import chardet
 import re
 import difflib
 
@@ -14,22 +15,41 @@ from pygments import highlight
 from pygments.lexers import get_lexer_by_name
 from pygments.formatters import HtmlFormatter
 from data import BaseAI, GeminiAI, PerplexityAI, DiffViewerDialog
-
-from data.base_ai import AIThread
+from data import PieceTable, LargeFileEditor, LARGE_FILE_THRESHOLD
+
+from data.ai_requests import AIRequestManager
+from data.ai_cache import AIResponseCache
+from data.context_engine import ContextEngine, DEFAULT_BUDGET, PROVIDER_BUDGETS, estimate_tokens
+from data.retrieval_index import RetrievalIndexer
+from data.file_loader import FileLoaderThread
+from data.file_saver import FileSaverThread
+from data.encoding_detector import detect_encoding
+from data.highlighting import ViewportHighlighter, visible_blocks
+from data.color_index import ColorIndex
+from data.text_utils import astral_indexes, to_qt_position
+from data.highlighting import make_selection
+from data.search_engine import (TextSnapshot, MatchCounter, MatchIndex, build_pattern, find_match,
+                                replace_all, replacement_template)
+from data.languages import get_language, shared_formats
+from data.folder_search import FolderSearchThread, literal_prefilter
+from data.workspace import IGNORED_DIRS, parse_file_filter, path_key
+from data.folder_replace import ReplaceApplyThread, ReplacePlanThread, preview_texts
+from data.trigram_index import TrigramIndex, WorkspaceIndexer
 
 
 
 from PyQt6.QtGui import (QAction, QFont, QSyntaxHighlighter, QTextCharFormat, 
-                        QColor, QKeySequence, QFileSystemModel, QTextCursor, QTextDocument)
+                        QColor, QKeySequence, QFileSystemModel, QTextCursor)
                                                              
-from PyQt6.QtCore import Qt, QRegularExpression, QDir, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QRegularExpression, QDir, QThread, QTimer, pyqtSignal
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QTextEdit, QFileDialog, 
                              QVBoxLayout, QWidget, QMenuBar, QMenu, QToolBar, 
                              QStatusBar, QMessageBox, QTabWidget, QComboBox, QLabel,
                              QTreeView, QSplitter, QPushButton, QLineEdit, 
                              QScrollArea, QFrame, QHBoxLayout, QCheckBox, QColorDialog,
-                             QDialog, QListWidget, QPlainTextEdit)
+                             QDialog, QListWidget, QPlainTextEdit, QDockWidget,
+                             QTreeWidget, QTreeWidgetItem, QSpinBox)
                              
                              
 
@@ -53,13 +73,37 @@ class AIChatWidget(QWidget):
         self.conversation_history = []
         self.last_code_suggestion = None
         self.last_file_suggestion = None
+        # Posição no chat onde começa a resposta sendo recebida
+        self.stream_start = None
+        
+        # Trechos do projeto para o Full Project Mode, num índice salvo na
+        # pasta de trabalho e atualizado só nos arquivos que mudam
+        self.context_engine = None
+        self.project_index_thread = None
+        self._pending_project_paths = set()
+        
+        # Respostas já recebidas para o mesmo prompt voltam do cache
+        try:
+            self.response_cache = AIResponseCache()
+        except (OSError, sqlite3.Error) as e:
+            self.response_cache = None
+            print(f"AI response cache unavailable: {e}")
+        
+        # Uma pergunta por vez, na ordem enviada; as outras esperam na fila
+        self.ai_requests = AIRequestManager(self)
         
         self.setup_ui()
+        
+        self.ai_requests.request_started.connect(self.on_request_started)
+        self.ai_requests.chunk_ready.connect(self.on_request_chunk)
+        self.ai_requests.response_ready.connect(self.on_response_ready)
+        self.ai_requests.error_occurred.connect(self.on_request_error)
     
     def on_provider_changed(self, provider_name):
         """Chamado quando o usuário troca de provedor"""
         self.status_label.setText(f"Provedor selecionado: {provider_name}")
         self.status_label.setStyleSheet("color: #2196f3; padding: 5px;")
+        self.budget_spin.setValue(PROVIDER_BUDGETS.get(provider_name, DEFAULT_BUDGET))
         
         # Limpar conexão anterior
         if self.current_provider:
@@ -99,7 +143,7 @@ class AIChatWidget(QWidget):
 
     
     def send_message(self):
-        """Envia mensagem para a IA"""
+        """Envia mensagem para a IA (espera na fila se outra estiver em andamento)"""
         if not self.current_provider or not self.current_provider.is_connected:
             QMessageBox.warning(self, "Aviso", "Conecte-se à IA primeiro!")
             return
@@ -108,20 +152,67 @@ class AIChatWidget(QWidget):
         if not message:
             return
         
-        self.chat_display.append(f"<b>Você:</b> {message}<br><br>")
-        self.message_input.clear()
-        self.message_input.setEnabled(False)
-        self.status_label.setText("Processando...")
-        self.status_label.setStyleSheet("color: #2196f3; padding: 5px;")
-        
         # Obter contexto do arquivo atual
         context_prompt = self.build_context_prompt(message)
         
-        # Criar thread para processar
-        self.ai_thread = AIThread(self.current_provider, context_prompt)
-        self.ai_thread.response_ready.connect(self.display_response)
-        self.ai_thread.error_occurred.connect(self.display_error)
-        self.ai_thread.start()
+        cache_key = None
+        cached = None
+        provider_name = self.current_provider.get_provider_name()
+        model = getattr(self.current_provider, 'model_name', None)
+        if self.response_cache is not None:
+            cache_key = self.response_cache.key(provider_name, model, context_prompt)
+            if not self.bypass_cache_checkbox.isChecked():
+                cached = self.response_cache.get(cache_key)
+        
+        # Respostas do cache também passam pela fila, para sair na ordem
+        request = self.ai_requests.submit(self.current_provider, context_prompt,
+                                          (message, cache_key, provider_name, model, cached is not None), cached)
+        if request is None:
+            self.status_label.setText(f"Fila cheia: aguarde as {self.ai_requests.queued()} perguntas na fila")
+            self.status_label.setStyleSheet("color: #ff9800; padding: 5px;")
+            return
+        self.message_input.clear()
+        if request.waiters > 1:
+            self.status_label.setText("A mesma pergunta já está em andamento; ela terá uma resposta só")
+            self.status_label.setStyleSheet("color: #ff9800; padding: 5px;")
+        elif request in self.ai_requests.queue:
+            self.show_request_status("Processando...")
+    
+    def show_request_status(self, text):
+        queued = self.ai_requests.queued()
+        if queued:
+            text += f" ({queued} na fila)"
+        self.status_label.setText(text)
+        self.status_label.setStyleSheet("color: #2196f3; padding: 5px;")
+    
+    def on_request_started(self, request):
+        message = request.data[0]
+        self.chat_display.append(f"<b>Você:</b> {message}<br><br>")
+        self.stream_start = None
+        self.stop_btn.setEnabled(True)
+        self.show_request_status("Processando...")
+    
+    def on_request_chunk(self, request, chunk):
+        self.append_response_chunk(chunk)
+        self.show_request_status("Recebendo resposta...")
+    
+    def on_request_error(self, request, error):
+        self.display_error(error)
+        self.stop_btn.setEnabled(self.ai_requests.busy())
+    
+    def stop_requests(self):
+        """Interrompe a resposta em andamento e descarta as perguntas na fila"""
+        if not self.ai_requests.busy():
+            return
+        running = self.ai_requests.current is not None
+        self.ai_requests.cancel()
+        if running:
+            # O que já chegou da resposta fica no chat
+            self.stream_start = None
+            self.chat_display.append("<i>(resposta interrompida)</i><br><br>")
+        self.stop_btn.setEnabled(False)
+        self.status_label.setText("Interrompido")
+        self.status_label.setStyleSheet("color: #ff9800; padding: 5px;")
       
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -160,8 +251,19 @@ class AIChatWidget(QWidget):
         # Checkbox for project mode
         project_mode_layout = QHBoxLayout()
         self.project_mode_checkbox = QCheckBox("Full Project Mode")
-        self.project_mode_checkbox.setToolTip("Includes all .lua files in the folder in the context")
+        self.project_mode_checkbox.setToolTip("Includes the project code most relevant to the question in the context")
+        self.project_mode_checkbox.toggled.connect(self.on_project_mode_toggled)
         project_mode_layout.addWidget(self.project_mode_checkbox)
+        self.bypass_cache_checkbox = QCheckBox("Bypass Cache")
+        self.bypass_cache_checkbox.setToolTip("Always ask the AI, even if the same prompt was answered before")
+        project_mode_layout.addWidget(self.bypass_cache_checkbox)
+        project_mode_layout.addWidget(QLabel("Tokens:"))
+        self.budget_spin = QSpinBox()
+        self.budget_spin.setRange(1000, 1000000)
+        self.budget_spin.setSingleStep(1000)
+        self.budget_spin.setValue(PROVIDER_BUDGETS.get(self.provider_combo.currentText(), DEFAULT_BUDGET))
+        self.budget_spin.setToolTip("Prompt size limit (estimated tokens) in Full Project Mode")
+        project_mode_layout.addWidget(self.budget_spin)
         project_mode_layout.addStretch()
         layout.addLayout(project_mode_layout)
         
@@ -199,10 +301,17 @@ class AIChatWidget(QWidget):
         
         send_btn = QPushButton("Send")
         send_btn.clicked.connect(self.send_message)
-        send_btn.setMinimumHeight(60)
+        send_btn.setMinimumHeight(40)
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.clicked.connect(self.stop_requests)
+        self.stop_btn.setEnabled(False)
+        self.stop_btn.setToolTip("Stops the answer being received and drops the queued questions")
+        send_layout = QVBoxLayout()
+        send_layout.addWidget(send_btn)
+        send_layout.addWidget(self.stop_btn)
         
         input_layout.addWidget(self.message_input)
-        input_layout.addWidget(send_btn)
+        input_layout.addLayout(send_layout)
         layout.addLayout(input_layout)
         
         # Extra buttons
@@ -257,39 +366,9 @@ class AIChatWidget(QWidget):
                 file_ext = os.path.splitext(file_path)[1]
                 context_parts.append(f"Arquivo atual: {file_name} ({file_ext})")
 
-            # Se o modo projeto estiver ativo, varrer arquivos da pasta de trabalho
-            if self.project_mode_checkbox.isChecked() and hasattr(main_window, "working_directory") and main_window.working_directory:
-                context_parts.append("\nCONTEXTO DO PROJETO (arquivos relevantes em subpastas):\n")
-                project_files = self.scan_project_files(main_window.working_directory)
-
-                def _lang_from_ext(path):
-                    ext = os.path.splitext(path)[1].lower()
-                    mapping = {
-                        ".py": "python",
-                        ".js": "javascript",
-                        ".lua": "lua",
-                        ".json": "json",
-                        ".html": "html",
-                        ".css": "css",
-                        ".xml": "xml"
-                    }
-                    return mapping.get(ext, "")
-
-                for pfile in project_files:
-                    try:
-                        with open(pfile, "r", encoding="utf-8", errors="ignore") as f:
-                            content = f.read()
-                        if len(content) > 1200:
-                            preview = content[:1200] + "\n# ... (conteúdo cortado para caber no contexto)\n"
-                        else:
-                            preview = content
-
-                        lang = _lang_from_ext(pfile)
-                        context_parts.append(
-                            f"\n--- {os.path.basename(pfile)} ---\n```{lang}\n{preview}\n```"
-                        )
-                    except Exception as e:
-                        print(f"Erro ao ler arquivo do projeto para contexto: {pfile}: {e}")
+            # Se o modo projeto estiver ativo, os trechos mais relevantes do
+            # projeto entram aqui, no espaço que sobrar do orçamento de tokens
+            project_index = len(context_parts)
 
             # Conteúdo do arquivo atual (ou somente o trecho selecionado)
             if selected_text:
@@ -318,12 +397,107 @@ class AIChatWidget(QWidget):
             )
             context_parts.append("\nResponda sempre em português do Brasil.")
 
+            engine = self.project_context_engine() if self.project_mode_checkbox.isChecked() else None
+            if engine is not None:
+                budget = self.budget_spin.value() - estimate_tokens("\n".join(context_parts))
+                context_parts[project_index:project_index] = self.project_context(
+                    engine, user_message, budget, file_path, selected_text or file_content)
+
             return "\n".join(context_parts)
         except Exception as e:
             print(f"Erro ao montar contexto para IA: {e}")
             # Em caso de erro, ainda assim envia a mensagem original
             return user_message + "\n\nResponda em português do Brasil."
                                        
+    # Segundos até o índice do projeto ser conferido de novo (salvamentos
+    # feitos aqui já o atualizam na hora)
+    PROJECT_INDEX_REFRESH = 60
+
+    def project_context_engine(self):
+        """Engine da pasta de trabalho atual (None sem pasta)"""
+        root = getattr(self.window(), "working_directory", None)
+        if not root:
+            return None
+        if self.context_engine is None or self.context_engine.root != root:
+            self.stop_project_index()
+            if self.context_engine is not None:
+                self.context_engine.close()
+            try:
+                self.context_engine = ContextEngine(root)
+            except (OSError, sqlite3.Error) as e:
+                self.context_engine = None
+                print(f"Project index unavailable for '{root}': {e}")
+        return self.context_engine
+    
+    def on_project_mode_toggled(self, checked):
+        # Indexar o projeto já em segundo plano, para a primeira pergunta não esperar
+        if checked and self.project_context_engine() is not None:
+            self.refresh_project_index()
+    
+    def refresh_project_index(self, paths=None):
+        """Atualiza o índice do projeto: todos os arquivos alterados, ou só `paths`"""
+        engine = self.context_engine
+        if engine is None:
+            return
+        if self.project_index_thread is not None:
+            # Um indexador por vez; atualizações de arquivos esperam o atual
+            if paths:
+                self._pending_project_paths.update(paths)
+            return
+        thread = RetrievalIndexer(engine.index, paths)
+        thread.index_ready.connect(functools.partial(self._on_project_index_ready, thread))
+        self.project_index_thread = thread
+        thread.start()
+    
+    def _on_project_index_ready(self, thread, indexed, elapsed):
+        if thread is not self.project_index_thread:
+            return
+        thread.wait()
+        self.project_index_thread = None
+        if thread.paths is None and indexed:
+            self.status_label.setText(f"Project index: {indexed} file(s) indexed in {elapsed:.1f} s")
+        if self._pending_project_paths:
+            paths, self._pending_project_paths = list(self._pending_project_paths), set()
+            self.refresh_project_index(paths)
+    
+    def stop_project_index(self):
+        thread = self.project_index_thread
+        self.project_index_thread = None
+        self._pending_project_paths.clear()
+        if thread is not None:
+            thread.requestInterruption()
+            thread.wait()
+    
+    def project_context(self, engine, user_message, budget, file_path, current_text):
+        """Partes do prompt com os trechos do projeto mais relevantes para a pergunta"""
+        def _lang_from_ext(path):
+            ext = os.path.splitext(path)[1].lower()
+            mapping = {
+                ".py": "python",
+                ".js": "javascript",
+                ".lua": "lua",
+                ".json": "json",
+                ".html": "html",
+                ".css": "css",
+                ".xml": "xml"
+            }
+            return mapping.get(ext, "")
+        
+        # A consulta usa o índice como está; arquivos mudados fora do
+        # editor entram na próxima conferência, em segundo plano
+        if time.time() - engine.index.last_refresh >= self.PROJECT_INDEX_REFRESH:
+            self.refresh_project_index()
+        selected = engine.select(user_message, budget, file_path, current_text)
+        if not selected:
+            return []
+        parts = ["\nCONTEXTO DO PROJETO (trechos mais relevantes para a pergunta):\n"]
+        for path, chunks in selected:
+            lang = _lang_from_ext(path)
+            for chunk in chunks:
+                lines = f"linhas {chunk.first_line + 1}-{chunk.last_line + 1}"
+                parts.append(f"\n--- {engine.relative(path)} ({lines}) ---\n```{lang}\n{chunk.text}\n```")
+        return parts
+    
     def get_current_file_context(self, user_message):
         try:
             main_window = self.window()
@@ -411,7 +585,7 @@ class AIChatWidget(QWidget):
         
         try:
             for root, dirs, files in os.walk(directory):
-                dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules', '__pycache__', '.vscode']]
+                dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
                 
                 for file in files:
                     if any(file.endswith(ext) for ext in extensions):
@@ -468,11 +642,55 @@ class AIChatWidget(QWidget):
                 return True
         return super().eventFilter(obj, event)
        
-    def display_response(self, response):
+    def append_response_chunk(self, chunk):
+        """Mostra o texto puro da resposta enquanto ela chega"""
+        cursor = QTextCursor(self.chat_display.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        if self.stream_start is None:
+            self.stream_start = cursor.position()
+            self.chat_display.append("<b>AI:</b>")
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertBlock()
+        
+        scrollbar = self.chat_display.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        cursor.insertText(chunk, QTextCharFormat())
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+    
+    def discard_streamed_text(self):
+        """Remove o texto puro recebido, antes de exibir a resposta formatada"""
+        if self.stream_start is None:
+            return
+        cursor = QTextCursor(self.chat_display.document())
+        cursor.setPosition(self.stream_start)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self.stream_start = None
+    
+    def on_response_ready(self, request, response):
+        _, cache_key, provider_name, model, cached = request.data
+        if cache_key is not None and response and not cached:
+            try:
+                self.response_cache.put(cache_key, response, provider_name, model)
+            except sqlite3.Error as e:
+                print(f"Could not cache the AI response: {e}")
+        self.display_response(response, cached)
+        self.stop_btn.setEnabled(self.ai_requests.busy())
+    
+    def cache_stats(self):
+        cache = self.response_cache
+        if cache is None or not cache.hits + cache.misses:
+            return ""
+        return f" | Cache: {cache.hits}/{cache.hits + cache.misses} hits ({cache.hit_rate():.0%})"
+    
+    def display_response(self, response, cached=False):
         """Exibe resposta da IA com código formatado em boxes"""
         import re
         from html import escape
         
+        self.discard_streamed_text()
+        
         # Detectar blocos de código ``````
         code_block_pattern = r'``````'
         
@@ -555,10 +773,11 @@ class AIChatWidget(QWidget):
         formatted_response = re.sub(code_pattern, create_code_box, response, flags=re.DOTALL)
         
         # Exibir no chat
-        self.chat_display.append(f"<b>AI:</b><br>{formatted_response}<br>")
+        label = "AI (cache)" if cached else "AI"
+        self.chat_display.append(f"<b>{label}:</b><br>{formatted_response}<br>")
         self.message_input.setEnabled(True)
         self.message_input.setFocus()
-        self.status_label.setText("Ready")
+        self.status_label.setText(("Ready (cached)" if cached else "Ready") + self.cache_stats())
         self.status_label.setStyleSheet("color: #4caf50; padding: 5px;")
 
         
@@ -623,6 +842,8 @@ class AIChatWidget(QWidget):
         return text
    
     def display_error(self, error):
+        # O que já chegou da resposta fica no chat
+        self.stream_start = None
         self.chat_display.append(f"<b>Error:</b> {error}<br><br>")
         self.message_input.setEnabled(True)
         self.status_label.setText("Error during request")
@@ -632,6 +853,7 @@ class AIChatWidget(QWidget):
         """Clears the chat history"""
         self.chat_display.clear()
         self.conversation_history = []
+        self.stream_start = None
     
     
             
@@ -639,198 +861,126 @@ class SyntaxHighlighter(QSyntaxHighlighter):
     def __init__(self, parent, file_extension):
         super().__init__(parent)
         self.file_extension = file_extension.lower()
-        self.highlighting_rules = []
-        
-        # Definir cores para o tema escuro
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#569CD6"))  # Azul
-        keyword_format.setFontWeight(QFont.Weight.Bold)
-        
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#CE9178"))  # Laranja
-        
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("#6A9955"))  # Verde
-        
-        function_format = QTextCharFormat()
-        function_format.setForeground(QColor("#DCDCAA"))  # Amarelo
-        
-        number_format = QTextCharFormat()
-        number_format.setForeground(QColor("#B5CEA8"))  # Verde claro
-        
-        # NOVO: Formato para propriedades OTUI
-        property_format = QTextCharFormat()
-        property_format.setForeground(QColor("#9CDCFE"))  # Azul claro
-        
-        # NOVO: Formato para valores booleanos
-        boolean_format = QTextCharFormat()
-        boolean_format.setForeground(QColor("#569CD6"))  # Azul
-        
-        # NOVO: Formato para widgets OTUI
-        widget_format = QTextCharFormat()
-        widget_format.setForeground(QColor("#4EC9B0"))  # Verde-azulado
-        widget_format.setFontWeight(QFont.Weight.Bold)        
-        
-        # Keywords por linguagem
-        keywords = {
-            '.py': ['def', 'class', 'import', 'from', 'as', 'if', 'elif', 'else', 
-                   'for', 'while', 'return', 'try', 'except', 'finally', 'with', 
-                   'True', 'False', 'None', 'and', 'or', 'not', 'in', 'is', 'lambda'],
-                   
-            '.js': ['var', 'let', 'const', 'function', 'if', 'else', 'for', 'while', 
-                   'return', 'class', 'extends', 'import', 'export', 'async', 'await', 
-                   'try', 'catch', 'finally', 'new', 'this', 'null', 'undefined'],
-                   
-            '.ts': ['var', 'let', 'const', 'function', 'if', 'else', 'for', 'while', 
-                   'return', 'class', 'interface', 'type', 'extends', 'implements', 
-                   'import', 'export', 'async', 'await', 'public', 'private', 'protected'],
-                   
-            '.java': ['public', 'private', 'protected', 'class', 'interface', 'extends', 
-                     'implements', 'void', 'int', 'String', 'boolean', 'if', 'else', 
-                     'for', 'while', 'return', 'new', 'this', 'static', 'final'],
-                     
-            '.cs': ['public', 'private', 'protected', 'class', 'interface', 'namespace', 
-                   'using', 'void', 'int', 'string', 'bool', 'if', 'else', 'for', 
-                   'while', 'return', 'new', 'this', 'static', 'async', 'await'],
-                   
-            '.cpp': ['class', 'namespace', 'public', 'private', 'protected', 'virtual', 
-                    'void', 'int', 'char', 'bool', 'if', 'else', 'for', 'while', 
-                    'return', 'new', 'delete', 'this', 'nullptr', 'const', 'static'],
-                    
-            '.c': ['int', 'char', 'float', 'double', 'void', 'if', 'else', 'for', 
-                  'while', 'return', 'struct', 'typedef', 'const', 'static', 'extern'],
-                  
-            '.php': ['class', 'function', 'if', 'else', 'elseif', 'for', 'while', 
-                    'return', 'public', 'private', 'protected', 'static', 'namespace', 
-                    'use', 'new', 'this', 'echo', 'require', 'include'],
-                    
-            '.rb': ['def', 'class', 'module', 'if', 'elsif', 'else', 'unless', 'for', 
-                   'while', 'return', 'require', 'include', 'attr_accessor', 'end'],
-                   
-            '.go': ['func', 'package', 'import', 'var', 'const', 'type', 'struct', 
-                   'interface', 'if', 'else', 'for', 'return', 'defer', 'go', 'chan'],
-                   
-            '.swift': ['func', 'class', 'struct', 'enum', 'protocol', 'var', 'let', 
-                      'if', 'else', 'for', 'while', 'return', 'import', 'self', 'init'],
-                      
-            '.lua': ['function', 'local', 'if', 'then', 'else', 'elseif', 'end', 
-                    'for', 'while', 'do', 'return', 'nil', 'true', 'false', 'and', 'or', 'not'],
-                    
-            '.otui': ['anchors', 'margin', 'padding', 'size', 'color', 'background-color',
-                     'text', 'font', 'opacity', 'visible', 'enabled', 'focusable',
-                     'phantom', 'draggable', 'image-source', 'image-clip', 'image-border',
-                     'layout', 'image-color', 'text-offset', 'text-align', 'text-wrap',
-                     'on', 'id', '@onLoad', '@onDestroy', '@onSetup'],
-            
-            '.otml': ['anchors', 'margin', 'padding', 'size', 'color', 'background-color',
-                     'text', 'font', 'opacity', 'visible', 'enabled', 'focusable',
-                     'phantom', 'draggable', 'image-source', 'image-clip', 'image-border',
-                     'layout', 'image-color', 'text-offset', 'text-align', 'text-wrap',
-                     'on', 'id', '@onLoad', '@onDestroy', '@onSetup'],                    
-                    
-                    
-                    
-        }
-        
-        # Adicionar keywords
-        otui_widgets = [
-            'UIWidget', 'UIButton', 'UILabel', 'UITextEdit', 'UICheckBox',
-            'UIWindow', 'UIScrollArea', 'UIScrollBar', 'UIProgressBar',
-            'UISpinBox', 'UIComboBox', 'UITabBar', 'UILineEdit',
-            'UIItem', 'UICreature', 'UIMap', 'UIMinimap', 'Panel',
-            'Button', 'Label', 'TextEdit', 'CheckBox', 'Window',
-            'ScrollArea', 'VerticalScrollBar', 'HorizontalScrollBar',
-            'MainWindow', 'MiniWindow', 'Item', 'Creature'
-        ]
-        
-        # Adicionar keywords
-        current_keywords = keywords.get(self.file_extension, [])
-        for word in current_keywords:
-            pattern = QRegularExpression(f'\\b{word}\\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-        
-        # NOVO: Adicionar widgets OTUI
-        if self.file_extension in ['.otui', '.otml']:
-            for widget in otui_widgets:
-                pattern = QRegularExpression(f'\\b{widget}\\b')
-                self.highlighting_rules.append((pattern, widget_format))
-            
-            # Propriedades (palavras seguidas de :)
-            property_pattern = QRegularExpression(r'\b[\w-]+(?=\s*:)')
-            self.highlighting_rules.append((property_pattern, property_format))
-            
-            # Valores booleanos
-            bool_pattern = QRegularExpression(r'\b(true|false)\b')
-            self.highlighting_rules.append((bool_pattern, boolean_format))
-            
-            # IDs (start with #)
-            id_pattern = QRegularExpression(r'#[\w-]+')
-            self.highlighting_rules.append((id_pattern, widget_format))
-            
-            # Cores hexadecimais
-            color_pattern = QRegularExpression(r'#[0-9A-Fa-f]{6,8}\b')
-            color_format = QTextCharFormat()
-            color_format.setForeground(QColor("#CE9178"))
-            self.highlighting_rules.append((color_pattern, color_format))
-        
-        # Strings
-        self.highlighting_rules.append((QRegularExpression(r'"[^"]*"'), string_format))
-        self.highlighting_rules.append((QRegularExpression(r"'[^']*'"), string_format))
-        
-        # Numbers
-        self.highlighting_rules.append((QRegularExpression(r'\b\d+\b'), number_format))
-        
-        # Comments
-        if self.file_extension in ['.py', '.rb', '.sh', '.otui', '.otml']:
-            self.highlighting_rules.append((QRegularExpression(r'#.*'), comment_format))
-        elif self.file_extension in ['.js', '.ts', '.java', '.cs', '.cpp', '.c', '.php', '.go', '.swift']:
-            self.highlighting_rules.append((QRegularExpression(r'//.*'), comment_format))
-        elif self.file_extension == '.lua':
-            self.highlighting_rules.append((QRegularExpression(r'--.*'), comment_format))
-        elif self.file_extension == '.sql':
-            self.highlighting_rules.append((QRegularExpression(r'--.*'), comment_format))
-        
-        # Functions
-        self.highlighting_rules.append((QRegularExpression(r'\b[A-Za-z]+[A-Za-z0-9_]*(?=\()'), function_format))
+        # Definitions and formats are compiled once and shared by all tabs
+        self.language = get_language(self.file_extension)
+        self.tokenizer = self.language.tokenizer
+        self.formats = shared_formats()
     
     def highlightBlock(self, text):
-        for pattern, format_style in self.highlighting_rules:
-            iterator = pattern.globalMatch(text)
-            while iterator.hasNext():
-                match = iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format_style)
+        # The block state carries multi-line comments/strings to the next
+        # block; Qt only re-highlights the following blocks while their
+        # start state keeps changing
+        formats = self.formats
+        tokens, state = self.tokenizer.highlight_line(text, max(self.previousBlockState(), 0))
+        for start, length, kind in tokens:
+            self.setFormat(start, length, formats[kind])
+        self.setCurrentBlockState(state)
 
 class CodeEditor(QTextEdit):
+    load_progress = pyqtSignal(int)
+    load_finished = pyqtSignal(bool)
+    save_finished = pyqtSignal(bool, str)
+    search_matches_changed = pyqtSignal()
+
+    # Characters copied per event-loop turn when snapshotting for a save
+    SNAPSHOT_CHUNK = 1024 * 1024
+
     def __init__(self, file_path=None):
         super().__init__()
         self.file_path = file_path
         self.current_encoding = 'utf-8'
+        self.highlighter = None
+        self.load_thread = None
+        self.loading = False
+        self.save_thread = None
+        self._snapshot_position = 0
+        self._pending_save_encoding = None
+        self._pending_goto = None
+        # Extra selections are kept per layer so syntax, color and search
+        # highlights do not replace each other
+        self.extra_selection_layers = {'syntax': [], 'colors': [], 'search': []}
+        self.color_index = ColorIndex(self.document())
+        # Matches of the last search, kept current as the text changes;
+        # only the ones on screen get extra selections when highlighted
+        self.search_matches = None
+        self.search_highlighting = False
+        self.search_format = QTextCharFormat()
+        self.search_format.setBackground(QColor("#6A5ACD"))
+        self.viewport_update_timer = QTimer(self)
+        self.viewport_update_timer.setSingleShot(True)
+        self.viewport_update_timer.timeout.connect(self.update_viewport_selections)
         self.setFont(QFont("Consolas", 11))
         self.textChanged.connect(self.on_text_changed)        
+        self.document().contentsChange.connect(self.on_contents_change)
+        self.verticalScrollBar().valueChanged.connect(self.on_scrolled)
         
         if file_path:
             self.load_file(file_path)
-            ext = os.path.splitext(file_path)[1]
-            
-            file_size = os.path.getsize(file_path)
-            max_size_for_highlighting = 1024 * 1024
-            
-            if file_size < max_size_for_highlighting:
-                self.highlighter = SyntaxHighlighter(self.document(), ext)
-            else:
-                print(f"Large file ({file_size} bytes), syntax highlighting disabled")
+
+    def setup_highlighter(self):
+        """Attach the syntax highlighter before the document is loaded"""
+        if not self.file_path:
+            return
+        if self.highlighter is not None:
+            self.highlighter.setDocument(self.document())
+            return
+
+        ext = os.path.splitext(self.file_path)[1]
+        file_size = os.path.getsize(self.file_path)
+        max_size_for_highlighting = 1024 * 1024
+        
+        if file_size < max_size_for_highlighting:
+            self.highlighter = SyntaxHighlighter(self.document(), ext)
+        else:
+            # Big files: only the blocks on screen are highlighted
+            self.highlighter = ViewportHighlighter(self, get_language(ext).tokenizer, shared_formats())
    
+    def set_extra_selections(self, layer, selections):
+        """Replace one layer of extra selections and show all layers"""
+        self.extra_selection_layers[layer] = selections
+        merged = []
+        for layer_selections in self.extra_selection_layers.values():
+            merged.extend(layer_selections)
+        self.setExtraSelections(merged)
+
+    def colors_or_search_shown(self):
+        return (getattr(self, 'color_highlighting_enabled', False)
+                or self.search_highlighting)
+
     def on_text_changed(self):
-        """Update color highlighting when text changes"""
-        if hasattr(self, 'color_highlighting_enabled') and self.color_highlighting_enabled:
-            # Use a timer to avoid updating on every keystroke
-            if not hasattr(self, 'color_update_timer'):
-                from PyQt6.QtCore import QTimer
-                self.color_update_timer = QTimer()
-                self.color_update_timer.setSingleShot(True)
-                self.color_update_timer.timeout.connect(self.highlight_all_colors)
-            
-            self.color_update_timer.start(500)  # Update after 500ms of inactivity
+        """Update color and search highlighting when text changes"""
+        if self.colors_or_search_shown():
+            # Only changed blocks are rescanned, so a short debounce is enough
+            self.viewport_update_timer.start(100)
+
+    def on_contents_change(self, position, removed, added):
+        if self.search_matches is not None:
+            self.search_matches.update(self.document(), position, removed, added)
+            self.search_matches_changed.emit()
+
+    def on_scrolled(self):
+        if self.colors_or_search_shown():
+            self.viewport_update_timer.start(0)
+
+    def update_viewport_selections(self):
+        if getattr(self, 'color_highlighting_enabled', False):
+            self.highlight_all_colors()
+        if self.search_highlighting:
+            self.highlight_search_matches()
+
+    def set_search_matches(self, matches):
+        """Use a new MatchIndex; highlights of the previous search are removed"""
+        self.search_matches = matches
+        self.show_search_matches(False)
+        self.search_matches_changed.emit()
+
+    def show_search_matches(self, visible):
+        self.search_highlighting = visible and self.search_matches is not None
+        self.highlight_search_matches()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.on_scrolled()
 
     def mouseDoubleClickEvent(self, event):
         import re
@@ -945,49 +1095,41 @@ class CodeEditor(QTextEdit):
         super().keyPressEvent(event)
               
     def highlight_all_colors(self):
-
-        # Remove previous highlights
-        cursor = QTextCursor(self.document())
-        cursor.select(QTextCursor.SelectionType.Document)
-        default_format = QTextCharFormat()
-        cursor.setCharFormat(default_format)
-        
-        # Find all color codes
-        text = self.toPlainText()
-        pattern = r'#[0-9A-Fa-f]{3,8}\b'
-        
-        extra_selections = []
-        
-        for match in re.finditer(pattern, text):
-            if len(match.group()) in [4, 7, 9]:  # #RGB, #RRGGBB, #RRGGBBAA
-                color_code = match.group()
-                
-                # Create cursor for this position
-                cursor = QTextCursor(self.document())
-                cursor.setPosition(match.start())
-                cursor.setPosition(match.end(), QTextCursor.MoveMode.KeepAnchor)
-                
-                # Create extra selection with background color
-                selection = QTextEdit.ExtraSelection()
-                selection.cursor = cursor
-                
-                # Format with background color
-                color_format = QTextCharFormat()
-                qcolor = QColor(color_code)
-                color_format.setBackground(qcolor)
-                
-                # Adjust text color based on brightness
-                brightness = (qcolor.red() * 299 + qcolor.green() * 587 + qcolor.blue() * 114) / 1000
-                if brightness < 128:
-                    color_format.setForeground(QColor("#FFFFFF"))
-                else:
-                    color_format.setForeground(QColor("#000000"))
-                
-                selection.format = color_format
-                extra_selections.append(selection)
-        
-        self.setExtraSelections(extra_selections)
+        """Show the color codes on screen with their color as background"""
+        first, last = visible_blocks(self)
+        self.set_extra_selections('colors', self.color_index.selections(first, last))
+
+    def highlight_search_matches(self):
+        """Show the search matches on screen"""
+        selections = []
+        if self.search_highlighting:
+            document = self.document()
+            first, last = visible_blocks(self)
+            last_block = document.findBlockByNumber(last)
+            for start, end in self.search_matches.matches_between(
+                    document.findBlockByNumber(first).position(),
+                    last_block.position() + last_block.length()):
+                if end > start:
+                    selections.append(make_selection(document, start, end - start, self.search_format))
+        self.set_extra_selections('search', selections)
              
+    def apply_replace_result(self, snapshot, result):
+        """Apply a replace_all result as a single edit (one undo step, one re-layout)"""
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        cursor.setPosition(snapshot.position(result.start))
+        cursor.setPosition(snapshot.position(result.end), QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(result.text)
+        cursor.endEditBlock()
+
+    def replace_matches(self, pattern, replacement, regex=False):
+        """Replace every match in the document; returns how many were replaced"""
+        snapshot = TextSnapshot.from_document(self.document())
+        result = replace_all(snapshot, pattern, replacement, regex)
+        if result.count:
+            self.apply_replace_result(snapshot, result)
+        return result.count
+
     def show_find_dialog(self):
         # Check if there is already an open window
         if not hasattr(self, 'find_dialog') or not self.find_dialog.isVisible():
@@ -1004,6 +1146,30 @@ class CodeEditor(QTextEdit):
         self.find_dialog.raise_()
         self.find_dialog.activateWindow()
 
+    def goto_line(self, line, column=0, length=0):
+        """Select `length` characters at a 0-based line and column.
+
+        While the file is loading, the move waits for the load to finish.
+        """
+        if self.loading:
+            self._pending_goto = (line, column, length)
+            return
+        self._pending_goto = None
+        block = self.document().findBlockByNumber(line)
+        if not block.isValid():
+            return
+        text = block.text()
+        astral = astral_indexes(text)
+        start = min(column, len(text))
+        end = min(column + length, len(text))
+        cursor = QTextCursor(block)
+        cursor.setPosition(block.position() + to_qt_position(start, astral))
+        cursor.setPosition(block.position() + to_qt_position(end, astral),
+                           QTextCursor.MoveMode.KeepAnchor)
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+        self.setFocus()
+
     def duplicate_line(self):
         cursor = self.textCursor()
         
@@ -1103,131 +1269,154 @@ class CodeEditor(QTextEdit):
         
         self.setTextCursor(cursor)
     
-    def detect_encoding(self, file_path):
-        try:
-
-            with open(file_path, 'rb') as f:
-                raw_data = f.read(10240)  # Limit to 10KB
-            
-            # If the file is tiny, use everything
-            if len(raw_data) == 0:
-                return 'utf-8', 1.0
-            
-            result = chardet.detect(raw_data)
-            detected_encoding = result['encoding']
-            confidence = result['confidence']
-            
-            # Normalize encoding names
-            if detected_encoding:
-                detected_encoding = detected_encoding.lower()
-                if 'iso-8859' in detected_encoding or 'latin' in detected_encoding:
-                    detected_encoding = 'latin-1'  # ANSI
-                elif 'utf-8' in detected_encoding:
-                    detected_encoding = 'utf-8'
-                elif 'windows-1252' in detected_encoding or 'cp1252' in detected_encoding:
-                    detected_encoding = 'cp1252'  # ANSI Windows
-                elif 'ascii' in detected_encoding:
-                    detected_encoding = 'utf-8'  # ASCII is compatible with UTF-8
-            
-            # If confidence is too low, default to UTF-8
-            if confidence < 0.7:
-                detected_encoding = 'utf-8'
-            
-            return detected_encoding, confidence
-        except Exception as e:
-            print(f"Error detecting encoding: {e}")
-            return 'utf-8', 0.0
-                  
     def load_file(self, file_path, encoding=None):
+        """Start loading a file in the background; returns False if it can't start"""
+        self.cancel_load()
 
         try:
-
-            file_size = os.path.getsize(file_path)
-            
-            if not encoding:
-                detected_encoding, confidence = self.detect_encoding(file_path)
-                encoding = detected_encoding if detected_encoding else 'utf-8'
-            
-            self.current_encoding = encoding
-            
-
-            if file_size > 5 * 1024 * 1024:  # 5MB
-                reply = QMessageBox.question(
-                    None, 
-                    'Large File', 
-                    f'The file is {file_size / (1024*1024):.1f}MB. It may take time to load. Continue?',
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-                )
-                if reply == QMessageBox.StandardButton.No:
-                    return False
-            
-            # Load file
-            with open(file_path, 'r', encoding=encoding, errors='replace') as f:
-                content = f.read()
-            
-            # Desabilitar updates durante carregamento de texto grande
-            self.setUpdatesEnabled(False)
-            self.setPlainText(content)
-            self.setUpdatesEnabled(True)
-            
+            if encoding:
+                self.current_encoding = encoding
             self.file_path = file_path
+            self.loading = True
+
+            # Chunks are appended without undo history
+            self.setUndoRedoEnabled(False)
+            self.setReadOnly(True)
+            self.clear()
+            # The highlighter formats each chunk as it is inserted: doing it
+            # once the document is laid out costs a relayout per block
+            self.setup_highlighter()
+
+            thread = FileLoaderThread(file_path, encoding)
+            thread.encoding_detected.connect(functools.partial(self._on_encoding_detected, thread))
+            thread.chunk_ready.connect(functools.partial(self._append_loaded_chunk, thread))
+            thread.load_failed.connect(functools.partial(self._on_load_failed, thread))
+            thread.finished.connect(functools.partial(self._on_load_finished, thread))
+            self.load_thread = thread
+            thread.start()
             return True
             
         except Exception as e:
-            # Fallback to UTF-8
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
-                
-                self.setUpdatesEnabled(False)
-                self.setPlainText(content)
-                self.setUpdatesEnabled(True)
-                
-                self.file_path = file_path
-                self.current_encoding = 'utf-8'
-                return True
-            except Exception as e2:
-                QMessageBox.critical(None, "Error", f"Error opening file: {str(e2)}")
-                return False
-               
-        except Exception as e:
-            # Fallback to UTF-8 on error
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
-                self.setPlainText(content)
-                self.file_path = file_path
-                self.current_encoding = 'utf-8'
-                return True
-            except Exception as e2:
-                QMessageBox.critical(None, "Error", f"Error opening file: {str(e2)}")
-                return False
+            self.loading = False
+            QMessageBox.critical(None, "Error", f"Error opening file: {str(e)}")
+            return False
 
-    
-    def save_file(self, encoding=None):
+    def cancel_load(self):
+        """Stop a background load still in progress"""
+        thread = self.load_thread
+        self.load_thread = None
+        if thread is not None and thread.isRunning():
+            thread.cancel()
+        if self.loading:
+            self.loading = False
+            self.setReadOnly(False)
+            self.setUndoRedoEnabled(True)
+
+    def _on_encoding_detected(self, thread, encoding):
+        if thread is self.load_thread:
+            self.current_encoding = encoding
 
+    def _append_loaded_chunk(self, thread, text, percent):
+        if thread is not self.load_thread:
+            return
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        thread.chunk_consumed()
+        self.load_progress.emit(percent)
+
+    def _on_load_failed(self, thread, error):
+        if thread is not self.load_thread:
+            return
+        QMessageBox.critical(None, "Error", f"Error opening file: {error}")
+
+    def _on_load_finished(self, thread):
+        if thread is not self.load_thread:
+            return
+        self.load_thread = None
+        self.loading = False
+        self.setReadOnly(False)
+        self.setUndoRedoEnabled(True)
+        self.document().setModified(False)
+        self.moveCursor(QTextCursor.MoveOperation.Start)
+        if self._pending_goto is not None:
+            self.goto_line(*self._pending_goto)
+        self.load_finished.emit(True)
+
+    def closeEvent(self, event):
+        self.cancel_load()
+        if self.save_thread is not None:
+            # Let a running save reach the disk before the editor goes away
+            thread = self.save_thread
+            while not thread.isRunning() and not thread.isFinished():
+                self._snapshot_step(thread)
+            thread.wait()
+            self.save_thread = None
+        super().closeEvent(event)
+
+    def save_file(self, encoding=None):
+        """Snapshot the text and write it from a worker thread"""
         if not self.file_path:
             return self.save_file_as(encoding)
         
         if not encoding:
             encoding = self.current_encoding
-        
-        try:
-            # Criar backup .bak antes de salvar
-            if os.path.exists(self.file_path):
-                try:
-                    backup_path = self.file_path + ".bak"
-                    shutil.copy2(self.file_path, backup_path)
-                except Exception as backup_error:
-                    # Não impedir o salvamento se o backup falhar, apenas informar no console
-                    print(f"Falha ao criar backup .bak de '{self.file_path}': {backup_error}")
-            with open(self.file_path, 'w', encoding=encoding, errors='replace') as f:
-                f.write(self.toPlainText())
-            self.current_encoding = encoding
-            return True
-        except Exception as e:
-            QMessageBox.critical(None, "Error", f"Error saving file: {str(e)}")
+
+        if self.loading:
+            QMessageBox.warning(None, "Warning", "The file is still loading")
             return False
+
+        if self.save_thread is not None:
+            # Save the latest text again once the running save is done
+            self._pending_save_encoding = encoding
+            return True
+
+        thread = FileSaverThread(self.file_path, [], encoding)
+        thread.revision = self.document().revision()
+        thread.finished.connect(functools.partial(self._on_save_finished, thread))
+        self.save_thread = thread
+
+        # Copy the text in slices between event-loop turns so big documents
+        # don't freeze the UI; editing is paused until the copy is complete
+        self.setReadOnly(True)
+        self._snapshot_position = 0
+        self._snapshot_step(thread)
+        return True
+
+    def _snapshot_step(self, thread):
+        if thread is not self.save_thread or thread.isRunning() or thread.isFinished():
+            return
+        position = self._snapshot_position
+        end = self.document().characterCount() - 1
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(position)
+        cursor.setPosition(min(position + self.SNAPSHOT_CHUNK, end), QTextCursor.MoveMode.KeepAnchor)
+        thread.source.append(cursor.selectedText().replace('\u2029', '\n'))
+        self._snapshot_position = cursor.position()
+
+        if self._snapshot_position < end:
+            QTimer.singleShot(0, functools.partial(self._snapshot_step, thread))
+        else:
+            self.setReadOnly(False)
+            thread.start()
+
+    def _on_save_finished(self, thread):
+        if thread is not self.save_thread:
+            return
+        self.save_thread = None
+
+        if thread.error:
+            QMessageBox.critical(None, "Error", f"Error saving file: {thread.error}")
+            self.save_finished.emit(False, thread.error)
+        else:
+            self.current_encoding = thread.encoding
+            if self.document().revision() == thread.revision:
+                self.document().setModified(False)
+            self.save_finished.emit(True, f"File saved: {thread.file_path} ({thread.elapsed * 1000:.0f} ms)")
+
+        encoding, self._pending_save_encoding = self._pending_save_encoding, None
+        if encoding:
+            self.save_file(encoding)
     
     def save_file_as(self, encoding=None):
         file_path, _ = QFileDialog.getSaveFileName(None, 
@@ -1250,7 +1439,22 @@ class FindReplaceDialog(QWidget):
         super().__init__(parent)
         self.editor = editor
         self.last_match_position = -1
+        
+        # Snapshot of the document shared by searches until it is edited
+        self._snapshot = None
+        # Live "N of M" counter: matches are found in a worker thread after
+        # typing pauses; results of outdated requests are dropped
+        self._count_request = 0
+        self._counters = []
+        self.count_timer = QTimer(self)
+        self.count_timer.setSingleShot(True)
+        self.count_timer.setInterval(250)
+        self.count_timer.timeout.connect(self.start_count)
+        
         self.setup_ui()
+        editor.textChanged.connect(self.on_document_changed)
+        editor.cursorPositionChanged.connect(self.update_count_label)
+        editor.search_matches_changed.connect(self.update_count_label)
         
     def setup_ui(self):
         self.setWindowTitle("Find and Replace")
@@ -1270,15 +1474,22 @@ class FindReplaceDialog(QWidget):
         self.find_input = QLineEdit()
         self.find_input.setPlaceholderText("Enter the text to find...")
         self.find_input.returnPressed.connect(self.find_next)
+        self.find_input.textChanged.connect(self.on_search_changed)
         find_input_layout.addWidget(self.find_input)
+        self.count_label = QLabel("")
+        self.count_label.setStyleSheet("color: #888;")
+        find_input_layout.addWidget(self.count_label)
         find_layout.addLayout(find_input_layout)
         
         # Search options
         options_layout = QHBoxLayout()
         self.case_sensitive_check = QCheckBox("Match case")
         self.whole_word_check = QCheckBox("Whole word")
-        options_layout.addWidget(self.case_sensitive_check)
-        options_layout.addWidget(self.whole_word_check)
+        self.regex_check = QCheckBox("Regex")
+        self.regex_check.setToolTip("Python regular expression; use \\1 or \\g<name> in the replacement")
+        for check in (self.case_sensitive_check, self.whole_word_check, self.regex_check):
+            check.toggled.connect(self.on_search_changed)
+            options_layout.addWidget(check)
         find_layout.addLayout(options_layout)
         
         # Search buttons
@@ -1340,34 +1551,58 @@ class FindReplaceDialog(QWidget):
         close_layout.addWidget(close_btn)
         layout.addLayout(close_layout)
     
-    def get_search_flags(self):
-        flags = QTextDocument.FindFlag(0)
-        
-        if self.case_sensitive_check.isChecked():
-            flags |= QTextDocument.FindFlag.FindCaseSensitively
-        
-        if self.whole_word_check.isChecked():
-            flags |= QTextDocument.FindFlag.FindWholeWords
-        
-        return flags
-    
-    def find_next(self):
+    def search_pattern(self, report=True):
+        """Compiled pattern for the search options, None if empty or invalid"""
         search_text = self.find_input.text()
+        message = None
+        pattern = None
         if not search_text:
-            self.status_label.setText("Enter text to find")
+            message = "Enter text to find"
+        else:
+            try:
+                pattern = build_pattern(search_text,
+                                        self.case_sensitive_check.isChecked(),
+                                        self.whole_word_check.isChecked(),
+                                        self.regex_check.isChecked())
+            except re.error as e:
+                message = f"Invalid regex: {e}"
+        if message and report:
+            self.status_label.setText(message)
+        return pattern
+    
+    def snapshot(self):
+        """Text of the document, taken again only after it changes"""
+        if self._snapshot is None:
+            self._snapshot = TextSnapshot.from_document(self.editor.document())
+        return self._snapshot
+    
+    def select_match(self, snapshot, match):
+        cursor = self.editor.textCursor()
+        cursor.setPosition(snapshot.position(match.start()))
+        cursor.setPosition(snapshot.position(match.end()), QTextCursor.MoveMode.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.editor.ensureCursorVisible()
+    
+    def find_next(self):
+        pattern = self.search_pattern()
+        if pattern is None:
             return
         
+        snapshot = self.snapshot()
         cursor = self.editor.textCursor()
-        flags = self.get_search_flags()
+        index = snapshot.index(cursor.selectionEnd())
         
         # Search from the current position
-        found_cursor = self.editor.document().find(search_text, cursor, flags)
+        match = find_match(snapshot, pattern, index)
+        if match is not None and match.end() == match.start() == index and not cursor.hasSelection():
+            # Step over an empty match (e.g. '^') already under the cursor
+            match = find_match(snapshot, pattern, index + 1) if index < len(snapshot.text) else None
         
-        if found_cursor.isNull():
+        if match is None:
             # If not found, search from start
-            found_cursor = self.editor.document().find(search_text, 0, flags)
+            match = find_match(snapshot, pattern, 0)
             
-            if found_cursor.isNull():
+            if match is None:
                 self.status_label.setText("No occurrences found")
                 return
             else:
@@ -1376,28 +1611,24 @@ class FindReplaceDialog(QWidget):
             self.status_label.setText("Found")
         
         # Select the found text
-        self.editor.setTextCursor(found_cursor)
-        self.editor.ensureCursorVisible()
+        self.select_match(snapshot, match)
     
     def find_previous(self):
-        search_text = self.find_input.text()
-        if not search_text:
-            self.status_label.setText("Enter text to find")
+        pattern = self.search_pattern()
+        if pattern is None:
             return
         
+        snapshot = self.snapshot()
         cursor = self.editor.textCursor()
-        flags = self.get_search_flags()
-        flags |= QTextDocument.FindFlag.FindBackward
         
         # Search backwards
-        found_cursor = self.editor.document().find(search_text, cursor, flags)
+        match = find_match(snapshot, pattern, snapshot.index(cursor.selectionStart()), backward=True)
         
-        if found_cursor.isNull():
+        if match is None:
             # If not found, search from end
-            cursor.movePosition(QTextCursor.MoveOperation.End)
-            found_cursor = self.editor.document().find(search_text, cursor, flags)
+            match = find_match(snapshot, pattern, len(snapshot.text) + 1, backward=True)
             
-            if found_cursor.isNull():
+            if match is None:
                 self.status_label.setText("No occurrences found")
                 return
             else:
@@ -1406,58 +1637,43 @@ class FindReplaceDialog(QWidget):
             self.status_label.setText("Found")
         
         # Select the found text
-        self.editor.setTextCursor(found_cursor)
-        self.editor.ensureCursorVisible()
+        self.select_match(snapshot, match)
     
     def highlight_all(self):
-        search_text = self.find_input.text()
-        if not search_text:
-            self.status_label.setText("Enter text to find")
+        pattern = self.search_pattern()
+        if pattern is None:
             return
-            
-        # Remove previous highlights
-        cursor = self.editor.textCursor()
-        cursor.select(QTextCursor.SelectionType.Document)
-        
-        # Create highlight format
-        highlight_format = QTextCharFormat()
-        highlight_format.setBackground(QColor("#6A5ACD"))
         
-        # Find and highlight all
-        extra_selections = []
-        flags = self.get_search_flags()
+        matches = self.editor.search_matches
+        if matches is None or matches.pattern is not pattern:
+            # The background count has not finished: index the matches now
+            self._count_request += 1
+            matches = MatchIndex.from_snapshot(pattern, self.snapshot())
+            self.editor.set_search_matches(matches)
         
-        cursor = self.editor.document().find(search_text, 0, flags)
-        count = 0
-        
-        while not cursor.isNull():
-            selection = QTextEdit.ExtraSelection()
-            selection.cursor = cursor
-            selection.format = highlight_format
-            extra_selections.append(selection)
-            count += 1
-            
-            cursor = self.editor.document().find(search_text, cursor, flags)
-        
-        self.editor.setExtraSelections(extra_selections)
-        self.status_label.setText(f"{count} occurrence(s) found")
+        # Only the matches on screen are turned into extra selections
+        self.editor.show_search_matches(True)
+        self.status_label.setText(f"{len(matches)} occurrence(s) found")
     
     def replace_current(self):
         cursor = self.editor.textCursor()
+        pattern = self.search_pattern()
+        if pattern is None:
+            return
         
         if cursor.hasSelection():
-            search_text = self.find_input.text()
-            selected_text = cursor.selectedText()
-            
-            # Check if the selected text matches the search
-            matches = False
-            if self.case_sensitive_check.isChecked():
-                matches = selected_text == search_text
-            else:
-                matches = selected_text.lower() == search_text.lower()
+            # Check if the selection is exactly a match, in its context
+            snapshot = self.snapshot()
+            start = snapshot.index(cursor.selectionStart())
+            match = pattern.match(snapshot.text, start)
             
-            if matches:
-                replace_text = self.replace_input.text()
+            if match is not None and match.end() == snapshot.index(cursor.selectionEnd()):
+                try:
+                    replace_text = match.expand(replacement_template(self.replace_input.text(),
+                                                                     self.regex_check.isChecked()))
+                except (re.error, IndexError) as e:
+                    self.status_label.setText(f"Invalid replacement: {e}")
+                    return
                 cursor.insertText(replace_text)
                 self.status_label.setText("Replaced")
                 
@@ -1473,8 +1689,8 @@ class FindReplaceDialog(QWidget):
         search_text = self.find_input.text()
         replace_text = self.replace_input.text()
         
-        if not search_text:
-            self.status_label.setText("Enter text to find")
+        pattern = self.search_pattern()
+        if pattern is None:
             return
         
         # Confirm action
@@ -1489,29 +1705,91 @@ class FindReplaceDialog(QWidget):
         if reply != QMessageBox.StandardButton.Yes:
             return
         
-        # Perform replacements
-        cursor = QTextCursor(self.editor.document())
-        cursor.beginEditBlock()
-        
-        flags = self.get_search_flags()
-        count = 0
+        # Build the new text in one pass and apply it as a single edit
+        # instead of one edit per match
+        snapshot = self.snapshot()
+        try:
+            result = replace_all(snapshot, pattern, replace_text, self.regex_check.isChecked())
+        except (re.error, IndexError) as e:
+            self.status_label.setText(f"Invalid replacement: {e}")
+            return
         
-        search_cursor = self.editor.document().find(search_text, 0, flags)
+        if result.count:
+            start_time = time.perf_counter()
+            self.editor.apply_replace_result(snapshot, result)
+            elapsed = result.elapsed + time.perf_counter() - start_time
+        else:
+            elapsed = result.elapsed
         
-        while not search_cursor.isNull():
-            search_cursor.insertText(replace_text)
-            count += 1
-            search_cursor = self.editor.document().find(search_text, search_cursor, flags)
+        self.status_label.setText(f"{result.count} occurrence(s) replaced in {elapsed * 1000:.0f} ms")
+    
+    def on_document_changed(self):
+        self._snapshot = None
+        # The editor keeps its match index current; a count still running
+        # was started on the old text and has to be redone
+        if self._counters:
+            self.schedule_count()
+    
+    def on_search_changed(self):
+        self.editor.show_search_matches(False)
+        self.schedule_count()
+    
+    def schedule_count(self):
+        """Recount the matches once typing pauses"""
+        self._count_request += 1
+        self.count_timer.start()
+    
+    def start_count(self):
+        for counter in self._counters:
+            counter.requestInterruption()
         
-        cursor.endEditBlock()
+        pattern = self.search_pattern(report=False)
+        if pattern is None:
+            self.count_label.setText("Invalid regex" if self.find_input.text() else "")
+            return
+        if self.editor.search_matches is not None and self.editor.search_matches.pattern is pattern:
+            # Already indexed, and kept current by the editor
+            self.update_count_label()
+            return
         
-        self.status_label.setText(f"{count} occurrence(s) replaced")
+        counter = MatchCounter(self._count_request, self.snapshot(), pattern)
+        counter.matches_found.connect(self.on_matches_found)
+        counter.finished.connect(functools.partial(self._on_count_finished, counter))
+        self._counters.append(counter)
+        counter.start()
+    
+    def _on_count_finished(self, counter):
+        counter.wait()
+        self._counters.remove(counter)
+    
+    def on_matches_found(self, request_id, matches):
+        if request_id != self._count_request:
+            return
+        self.editor.set_search_matches(matches)
+    
+    def update_count_label(self):
+        """Show "N of M" when a match is selected, the total otherwise"""
+        matches = self.editor.search_matches
+        if matches is None or matches.pattern is not self.search_pattern(report=False):
+            return
+        current = matches.number(self.editor.textCursor().selectionStart())
+        total = len(matches)
+        self.count_label.setText(f"{current} of {total}" if current else f"{total} found")
     
     def showEvent(self, event):
         """When showing the window, focus on the search field"""
         super().showEvent(event)
         self.find_input.setFocus()
         self.find_input.selectAll()
+        self.schedule_count()
+    
+    def closeEvent(self, event):
+        # Stop counting before the dialog (and its threads) can be dropped
+        self.count_timer.stop()
+        for counter in self._counters:
+            counter.requestInterruption()
+            counter.wait()
+        super().closeEvent(event)
     
     def keyPressEvent(self, event):
         """Detect Esc to close"""
@@ -1520,6 +1798,392 @@ class FindReplaceDialog(QWidget):
         else:
             super().keyPressEvent(event)
 
+class FindInFolderPanel(QWidget):
+    """Searches the files of the working folder; results appear as they are found"""
+
+    result_activated = pyqtSignal(str, int, int, int)  # path, line, column, length
+
+    # File groups expanded automatically; the rest stay collapsed
+    EXPANDED_FILES = 50
+    # Seconds an index refresh is trusted; older ones are refreshed by the
+    # next search, which reads every file meanwhile
+    INDEX_REFRESH_INTERVAL = 30
+
+    def __init__(self, main_window, parent=None):
+        super().__init__(parent)
+        self.main_window = main_window
+        self.search_thread = None
+        self.file_count = 0
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search in the working folder...")
+        self.search_input.returnPressed.connect(self.start_search)
+        search_layout.addWidget(self.search_input, 3)
+
+        self.files_input = QLineEdit()
+        self.files_input.setPlaceholderText("Files to include (e.g. *.lua, *.otui)")
+        self.files_input.returnPressed.connect(self.start_search)
+        search_layout.addWidget(self.files_input, 2)
+
+        self.case_sensitive_check = QCheckBox("Match case")
+        self.whole_word_check = QCheckBox("Whole word")
+        self.regex_check = QCheckBox("Regex")
+        search_layout.addWidget(self.case_sensitive_check)
+        search_layout.addWidget(self.whole_word_check)
+        search_layout.addWidget(self.regex_check)
+
+        self.search_btn = QPushButton("Search")
+        self.search_btn.clicked.connect(self.toggle_search)
+        search_layout.addWidget(self.search_btn)
+        layout.addLayout(search_layout)
+
+        replace_layout = QHBoxLayout()
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("Replace with...")
+        replace_layout.addWidget(self.replace_input, 3)
+        self.replace_btn = QPushButton("Replace All...")
+        self.replace_btn.setToolTip("Preview the changes in every file, then apply them")
+        self.replace_btn.clicked.connect(self.preview_replace)
+        replace_layout.addWidget(self.replace_btn)
+        replace_layout.addStretch(2)
+        layout.addLayout(replace_layout)
+
+        self.results_tree = QTreeWidget()
+        self.results_tree.setHeaderHidden(True)
+        self.results_tree.setUniformRowHeights(True)
+        self.results_tree.itemClicked.connect(self.open_result)
+        layout.addWidget(self.results_tree)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #888; padding: 2px;")
+        layout.addWidget(self.status_label)
+
+    def toggle_search(self):
+        if self.search_thread is not None:
+            self.stop_search()
+            self.status_label.setText("Search stopped")
+        else:
+            self.start_search()
+
+    def search_pattern(self):
+        """Compiled pattern of the search options, None (reported) if invalid"""
+        search_text = self.search_input.text()
+        if not search_text:
+            self.status_label.setText("Enter text to find")
+            return None
+        try:
+            return build_pattern(search_text, self.case_sensitive_check.isChecked(),
+                                 self.whole_word_check.isChecked(), self.regex_check.isChecked())
+        except re.error as e:
+            self.status_label.setText(f"Invalid regex: {e}")
+            return None
+
+    def search_arguments(self):
+        """Arguments shared by the folder search and replace threads"""
+        search_text = self.search_input.text()
+        regex = self.regex_check.isChecked()
+        # With an index of the folder only the files that can match are read
+        root = self.main_window.working_directory
+        index = self.main_window.workspace_index
+        candidates = None
+        if index is not None and index.root == root:
+            # Files changed outside the editor are caught by a periodic refresh
+            fresh = time.time() - index.last_refresh <= self.INDEX_REFRESH_INTERVAL
+            if not fresh:
+                self.main_window.refresh_workspace_index()
+            if index.ready and fresh:
+                candidates = functools.partial(index.candidates, search_text, regex)
+        return dict(prefilter=literal_prefilter(search_text, self.case_sensitive_check.isChecked(), regex),
+                    file_patterns=parse_file_filter(self.files_input.text()),
+                    candidates=candidates)
+
+    def start_search(self):
+        pattern = self.search_pattern()
+        if pattern is None:
+            return
+
+        self.stop_search()
+        self.results_tree.clear()
+        self.file_count = 0
+        self._first_result_time = None
+        self._search_start = time.perf_counter()
+
+        thread = FolderSearchThread(self.main_window.working_directory, pattern, **self.search_arguments())
+        thread.results_found.connect(functools.partial(self._on_results_found, thread))
+        thread.search_finished.connect(functools.partial(self._on_search_finished, thread))
+        self.search_thread = thread
+        self.search_btn.setText("Stop")
+        self.status_label.setText("Searching...")
+        thread.start()
+
+    def stop_search(self):
+        thread = self.search_thread
+        self.search_thread = None
+        if thread is not None:
+            thread.requestInterruption()
+            thread.wait()
+        self.search_btn.setText("Search")
+
+    def _on_results_found(self, thread, batch):
+        if thread is not self.search_thread:
+            return
+        if self._first_result_time is None:
+            self._first_result_time = time.perf_counter() - self._search_start
+
+        root = self.main_window.working_directory
+        file_items = []
+        for path, matches in batch:
+            file_item = QTreeWidgetItem([f"{os.path.relpath(path, root)} ({len(matches)})"])
+            file_item.setData(0, Qt.ItemDataRole.UserRole, (path, 0, 0, 0))
+            file_item.addChildren([
+                self._match_item(path, match) for match in matches
+            ])
+            file_items.append(file_item)
+
+        self.results_tree.setUpdatesEnabled(False)
+        self.results_tree.addTopLevelItems(file_items)
+        for file_item in file_items:
+            if self.file_count < self.EXPANDED_FILES:
+                file_item.setExpanded(True)
+            self.file_count += 1
+        self.results_tree.setUpdatesEnabled(True)
+        self.status_label.setText(f"Searching... {self.file_count} file(s) with results")
+
+    def _match_item(self, path, match):
+        item = QTreeWidgetItem([f"{match.line + 1}: {match.text.strip()}"])
+        item.setData(0, Qt.ItemDataRole.UserRole, (path, match.line, match.column, match.length))
+        return item
+
+    def _on_search_finished(self, thread, files, matches, elapsed):
+        if thread is not self.search_thread:
+            return
+        thread.wait()
+        self.search_thread = None
+        self.search_btn.setText("Search")
+        message = f"{matches} result(s) in {self.file_count} file(s), {files} file(s) searched in {elapsed:.2f} s"
+        if self._first_result_time is not None:
+            message += f" (first results after {self._first_result_time * 1000:.0f} ms)"
+        if thread.limited:
+            message += f" - stopped at {FolderSearchThread.MAX_RESULTS} results"
+        if thread.used_candidates:
+            message += " [index]"
+        self.status_label.setText(message)
+
+    def open_result(self, item):
+        data = item.data(0, Qt.ItemDataRole.UserRole)
+        if data:
+            self.result_activated.emit(*data)
+
+    def preview_replace(self):
+        pattern = self.search_pattern()
+        if pattern is None:
+            return
+        replacement = self.replace_input.text()
+        regex = self.regex_check.isChecked()
+        try:
+            # Parses the template: bad group references fail here, not per file
+            pattern.sub(replacement_template(replacement, regex), '')
+        except (re.error, IndexError) as e:
+            self.status_label.setText(f"Invalid replacement: {e}")
+            return
+
+        # Open tabs: unsaved text is replaced in memory, tabs that cannot
+        # be edited that way keep their files untouched
+        buffers = {}
+        skipped = {}
+        for key, editor in self.main_window.open_editors().items():
+            if not isinstance(editor, CodeEditor):
+                skipped[key] = "open in large-file mode"
+            elif editor.loading:
+                skipped[key] = "still loading in a tab"
+            elif editor.document().isModified():
+                buffers[editor.file_path] = TextSnapshot.from_document(editor.document()).text
+
+        thread = ReplacePlanThread(self.main_window.working_directory, pattern, replacement, regex,
+                                   buffers=buffers, skipped=skipped, **self.search_arguments())
+        dialog = ReplacePreviewDialog(self.main_window, thread, self)
+        dialog.exec()
+        if dialog.summary:
+            self.status_label.setText(dialog.summary)
+
+
+class ReplacePreviewDialog(QDialog):
+    """Lists the files a replace in files will change before anything is written"""
+
+    def __init__(self, main_window, plan_thread, parent=None):
+        super().__init__(parent)
+        self.main_window = main_window
+        self.plan_thread = plan_thread
+        self.apply_thread = None
+        self.root = plan_thread.root
+        self.pattern = plan_thread.pattern
+        self.replacement = plan_thread.replacement
+        self.regex = plan_thread.regex
+        self.summary = ""
+        self.setWindowTitle("Replace in Files")
+        self.resize(800, 500)
+        self.setup_ui()
+
+        plan_thread.results_found.connect(functools.partial(self._on_planned, plan_thread))
+        plan_thread.search_finished.connect(functools.partial(self._on_plan_finished, plan_thread))
+        plan_thread.start()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        self.info_label = QLabel(f"Looking for files to change under {self.root}...")
+        layout.addWidget(self.info_label)
+
+        self.files_tree = QTreeWidget()
+        self.files_tree.setHeaderHidden(True)
+        self.files_tree.setUniformRowHeights(True)
+        self.files_tree.itemDoubleClicked.connect(self.show_diff)
+        layout.addWidget(self.files_tree)
+
+        button_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #888; padding: 2px;")
+        button_layout.addWidget(self.status_label, 1)
+        diff_btn = QPushButton("Show Diff")
+        diff_btn.clicked.connect(lambda: self.show_diff(self.files_tree.currentItem()))
+        button_layout.addWidget(diff_btn)
+        self.apply_btn = QPushButton("Replace")
+        self.apply_btn.setEnabled(False)
+        self.apply_btn.clicked.connect(self.apply)
+        button_layout.addWidget(self.apply_btn)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.reject)
+        button_layout.addWidget(self.cancel_btn)
+        layout.addLayout(button_layout)
+
+    def _on_planned(self, thread, batch):
+        if thread is not self.plan_thread:
+            return
+        items = []
+        for path, planned in batch:
+            text = f"{os.path.relpath(path, self.root)} ({planned.count})"
+            if planned.text is not None:
+                text += " - unsaved tab, changed in memory"
+            item = QTreeWidgetItem([text])
+            item.setData(0, Qt.ItemDataRole.UserRole, planned)
+            if planned.error:
+                item.setText(0, f"{text} - skipped: {planned.error}")
+                item.setForeground(0, QColor("#888"))
+            else:
+                item.setCheckState(0, Qt.CheckState.Checked)
+            items.append(item)
+        self.files_tree.addTopLevelItems(items)
+
+    def _on_plan_finished(self, thread, files, matches, elapsed):
+        if thread is not self.plan_thread:
+            return
+        thread.wait()
+        self.plan_thread = None
+        self.files_tree.sortItems(0, Qt.SortOrder.AscendingOrder)
+        count = self.files_tree.topLevelItemCount()
+        self.info_label.setText(
+            f"{matches} occurrence(s) in {count} file(s) will be replaced "
+            f"({files} file(s) read in {elapsed:.2f} s). Double-click a file to see its changes.")
+        self.apply_btn.setEnabled(count > 0)
+
+    def checked_files(self):
+        planned = []
+        for i in range(self.files_tree.topLevelItemCount()):
+            item = self.files_tree.topLevelItem(i)
+            if item.checkState(0) == Qt.CheckState.Checked:
+                planned.append(item.data(0, Qt.ItemDataRole.UserRole))
+        return planned
+
+    def show_diff(self, item):
+        if item is None:
+            return
+        planned = item.data(0, Qt.ItemDataRole.UserRole)
+        if planned.error:
+            return
+        try:
+            old_text, new_text = preview_texts(planned, self.pattern, self.replacement, self.regex)
+        except (OSError, ValueError) as e:
+            self.status_label.setText(f"Cannot preview: {e}")
+            return
+        name = os.path.basename(planned.path)
+        dialog = DiffViewerDialog(self)
+        dialog.set_files_from_tabs(old_text, name, new_text, f"{name} (replaced)")
+        dialog.exec()
+
+    def apply(self):
+        planned = self.checked_files()
+        if not planned:
+            self.status_label.setText("No file selected")
+            return
+        self.apply_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
+        self.files_tree.setEnabled(False)
+
+        # Unsaved tabs are edited in memory and stay unsaved
+        self._in_memory = []
+        on_disk = []
+        editors = self.main_window.open_editors()
+        for file in planned:
+            if file.text is None:
+                on_disk.append(file)
+                continue
+            editor = editors.get(path_key(file.path))
+            if isinstance(editor, CodeEditor):
+                self._in_memory.append(editor.replace_matches(self.pattern, self.replacement, self.regex))
+
+        thread = ReplaceApplyThread(on_disk, self.pattern, self.replacement, self.regex)
+        thread.progress.connect(lambda done, total: self.status_label.setText(f"Writing {done}/{total}..."))
+        thread.finished.connect(functools.partial(self._on_applied, thread))
+        self.apply_thread = thread
+        thread.start()
+
+    def _on_applied(self, thread):
+        if thread is not self.apply_thread:
+            return
+        self.apply_thread = None
+        self.main_window.on_files_replaced(thread.replaced, self.pattern, self.replacement, self.regex)
+
+        replaced = sum(count for _, count in thread.replaced) + sum(self._in_memory)
+        files = len(thread.replaced) + len(self._in_memory)
+        self.summary = f"{replaced} occurrence(s) replaced in {files} file(s) in {thread.elapsed * 1000:.0f} ms"
+        if not thread.errors:
+            self.accept()
+            return
+        # Keep the dialog open with the files that could not be written
+        self.summary += f", {len(thread.errors)} file(s) failed"
+        self.files_tree.clear()
+        self.files_tree.addTopLevelItems([
+            QTreeWidgetItem([f"{os.path.relpath(path, self.root)} - {message}"])
+            for path, message in thread.errors
+        ])
+        self.files_tree.setEnabled(True)
+        self.info_label.setText(self.summary)
+        self.status_label.setText("")
+        self.cancel_btn.setText("Close")
+        self.cancel_btn.setEnabled(True)
+
+    def reject(self):
+        if self.apply_thread is not None:
+            return  # files are being written: let it finish
+        thread = self.plan_thread
+        self.plan_thread = None
+        if thread is not None:
+            thread.requestInterruption()
+            thread.wait()
+        super().reject()
+
+    def closeEvent(self, event):
+        if self.apply_thread is not None:
+            event.ignore()
+            return
+        super().closeEvent(event)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -1529,6 +2193,11 @@ class MainWindow(QMainWindow):
         # Default working folder
         self.working_directory = os.getcwd()
         
+        # Trigram index of the working folder, built once a folder is chosen
+        self.workspace_index = None
+        self.index_thread = None
+        self._pending_index_paths = set()
+        
         # Widget central com splitter
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -1564,6 +2233,14 @@ class MainWindow(QMainWindow):
         
         main_layout.addWidget(self.main_splitter)
         
+        # Find in Folder panel (bottom dock, hidden until used)
+        self.find_in_folder = FindInFolderPanel(self)
+        self.find_in_folder.result_activated.connect(self.open_search_result)
+        self.find_in_folder_dock = QDockWidget("Find in Folder", self)
+        self.find_in_folder_dock.setWidget(self.find_in_folder)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.find_in_folder_dock)
+        self.find_in_folder_dock.hide()
+        
         # Criar menus
         self.create_menus()
         
@@ -1589,7 +2266,7 @@ class MainWindow(QMainWindow):
                 current_editor.highlight_all_colors()
                 self.statusBar().showMessage("Destaque de cores ATIVADO")
             else:
-                current_editor.setExtraSelections([])
+                current_editor.set_extra_selections('colors', [])
                 self.statusBar().showMessage("Destaque de cores DESATIVADO")
                 
                 
@@ -1719,6 +2396,21 @@ class MainWindow(QMainWindow):
             current_editor.show_find_dialog()
         
     
+    def show_find_in_folder(self):
+        current_editor = self.tabs.currentWidget()
+        if isinstance(current_editor, CodeEditor):
+            selected_text = current_editor.textCursor().selectedText()
+            if selected_text and '\u2029' not in selected_text:
+                self.find_in_folder.search_input.setText(selected_text)
+        self.find_in_folder_dock.show()
+        self.find_in_folder.search_input.setFocus()
+        self.find_in_folder.search_input.selectAll()
+
+    def open_search_result(self, file_path, line, column, length):
+        editor = self.open_file_path(file_path)
+        if editor is not None and hasattr(editor, 'goto_line'):
+            editor.goto_line(line, column, length)
+
     def select_working_folder(self):
         folder = QFileDialog.getExistingDirectory(
             self,
@@ -1731,28 +2423,86 @@ class MainWindow(QMainWindow):
             self.file_tree.setRootIndex(self.file_model.index(folder))
             self.current_path_label.setText(f"Current path: {folder}")
             self.statusBar().showMessage(f"Working folder: {folder}")
+            self.start_workspace_index(folder)
+
+    def start_workspace_index(self, root):
+        """Open (or create) the folder's search index and refresh it in the background"""
+        self.stop_workspace_index()
+        try:
+            self.workspace_index = TrigramIndex(root)
+        except (OSError, sqlite3.Error) as e:
+            self.workspace_index = None
+            print(f"Search index unavailable for '{root}': {e}")
+            return
+        self.refresh_workspace_index()
+
+    def refresh_workspace_index(self, paths=None):
+        """Re-index changed files: all of them, or just `paths`"""
+        if self.workspace_index is None:
+            return
+        if self.index_thread is not None:
+            # One indexer at a time; file updates wait for the running one
+            if paths:
+                self._pending_index_paths.update(paths)
+            return
+        thread = WorkspaceIndexer(self.workspace_index, paths)
+        thread.index_ready.connect(functools.partial(self._on_index_ready, thread))
+        self.index_thread = thread
+        thread.start()
+
+    def _on_index_ready(self, thread, indexed, elapsed):
+        if thread is not self.index_thread:
+            return
+        thread.wait()
+        self.index_thread = None
+        if thread.paths is None:
+            self.statusBar().showMessage(
+                f"Search index updated: {indexed} file(s) indexed in {elapsed:.1f} s")
+        if self._pending_index_paths:
+            paths, self._pending_index_paths = list(self._pending_index_paths), set()
+            self.refresh_workspace_index(paths)
+
+    def stop_workspace_index(self):
+        thread = self.index_thread
+        self.index_thread = None
+        self._pending_index_paths.clear()
+        if thread is not None:
+            thread.requestInterruption()
+            thread.wait()
   
     def open_file_from_explorer(self, index):
         file_path = self.file_model.filePath(index)
         
 
         if os.path.isfile(file_path):
- 
-            for i in range(self.tabs.count()):
-                editor = self.tabs.widget(i)
-                if hasattr(editor, 'file_path') and editor.file_path == file_path:
-                    self.tabs.setCurrentIndex(i)
-                    self.statusBar().showMessage(f"File already open: {os.path.basename(file_path)}")
-                    return
-            
-            # Open new file
-            editor = CodeEditor(file_path)
-            file_name = os.path.basename(file_path)
-            index = self.tabs.addTab(editor, file_name)
-            self.tabs.setCurrentIndex(index)
-            
-            detected_enc = editor.current_encoding.upper()
-            self.statusBar().showMessage(f"File: {file_name} | Encoding: {detected_enc}")
+            self.open_file_path(file_path)
+
+    def open_editors(self):
+        """Editors of the open tabs that have a file, by path_key"""
+        editors = {}
+        for i in range(self.tabs.count()):
+            editor = self.tabs.widget(i)
+            if getattr(editor, 'file_path', None):
+                editors.setdefault(path_key(editor.file_path), editor)
+        return editors
+
+    def open_file_path(self, file_path):
+        """Show the tab of a file, opening it if needed; returns its editor"""
+        editor = self.open_editors().get(path_key(file_path))
+        if editor is not None:
+            self.tabs.setCurrentWidget(editor)
+            self.statusBar().showMessage(f"File already open: {os.path.basename(file_path)}")
+            return editor
+        
+        # Open new file
+        editor = self.create_editor(file_path)
+        file_name = os.path.basename(file_path)
+        index = self.add_editor_tab(editor, file_name)
+        self.tabs.setCurrentIndex(index)
+        
+        detected_enc = editor.current_encoding.upper()
+        self.statusBar().showMessage(f"File: {file_name} | Encoding: {detected_enc}")
+        return editor
        
     def create_menus(self):
         menubar = self.menuBar()
@@ -1814,6 +2564,11 @@ class MainWindow(QMainWindow):
         find_action.triggered.connect(self.show_find_replace)
         edit_menu.addAction(find_action)
         
+        find_in_folder_action = QAction("Find in Folder", self)
+        find_in_folder_action.setShortcut("Ctrl+Shift+F")
+        find_in_folder_action.triggered.connect(self.show_find_in_folder)
+        edit_menu.addAction(find_in_folder_action)
+        
         edit_menu.addSeparator()
 
         duplicate_action = QAction("Duplicate Line", self)
@@ -2060,9 +2815,74 @@ class MainWindow(QMainWindow):
             current_editor.current_encoding = encoding
             self.statusBar().showMessage(f"Encoding alterado para: {encoding.upper()}")
     
+    def create_editor(self, file_path):
+        """Open huge files in the piece-table view, everything else in CodeEditor"""
+        try:
+            if os.path.getsize(file_path) >= LARGE_FILE_THRESHOLD:
+                encoding, _ = detect_encoding(file_path)
+                if PieceTable.supports_encoding(encoding):
+                    return LargeFileEditor(file_path, encoding)
+        except Exception as e:
+            print(f"Large-file mode unavailable for '{file_path}': {e}")
+        return CodeEditor(file_path)
+
+    def add_editor_tab(self, editor, file_name):
+        """Add an editor tab, showing load progress in the tab title"""
+        index = self.tabs.addTab(editor, file_name)
+        editor.save_finished.connect(lambda ok, message, e=editor: self.on_editor_saved(ok, message, e))
+        if isinstance(editor, CodeEditor) and editor.loading:
+            self.tabs.setTabText(index, f"{file_name} (0%)")
+            editor.load_progress.connect(
+                lambda percent, e=editor, n=file_name: self.set_editor_tab_text(e, f"{n} ({percent}%)"))
+            editor.load_finished.connect(
+                lambda ok, e=editor, n=file_name: self.on_editor_loaded(e, n))
+        return index
+
+    def set_editor_tab_text(self, editor, text):
+        index = self.tabs.indexOf(editor)
+        if index >= 0:
+            self.tabs.setTabText(index, text)
+
+    def on_editor_saved(self, ok, message, editor=None):
+        if ok:
+            self.statusBar().showMessage(message)
+            # Keep the search index in step with files saved from here
+            index = self.workspace_index
+            file_path = getattr(editor, 'file_path', None)
+            if file_path:
+                self.set_editor_tab_text(editor, os.path.basename(file_path))
+            if index is not None and file_path:
+                relative = os.path.relpath(os.path.abspath(file_path), index.root)
+                if not relative.startswith(os.pardir):
+                    self.refresh_workspace_index([os.path.abspath(file_path)])
+            if file_path:
+                self.ai_chat.refresh_project_index([os.path.abspath(file_path)])
+
+    def on_files_replaced(self, replaced, pattern, replacement, regex):
+        """Bring open tabs and the search index up to date with files rewritten on disk"""
+        editors = self.open_editors()
+        for path, _ in replaced:
+            editor = editors.get(path_key(path))
+            if isinstance(editor, CodeEditor) and not editor.loading:
+                # Edited in place (keeps undo and scroll) instead of reloaded;
+                # text typed meanwhile keeps the tab marked as modified
+                document = editor.document()
+                modified = document.isModified()
+                editor.replace_matches(pattern, replacement, regex)
+                document.setModified(modified)
+        if replaced:
+            self.refresh_workspace_index([os.path.abspath(path) for path, _ in replaced])
+            self.ai_chat.refresh_project_index([os.path.abspath(path) for path, _ in replaced])
+
+    def on_editor_loaded(self, editor, file_name):
+        self.set_editor_tab_text(editor, file_name)
+        if editor is self.tabs.currentWidget():
+            self.update_encoding_selector()
+            self.statusBar().showMessage(f"File: {file_name} | Encoding: {editor.current_encoding.upper()}")
+
     def new_file(self):
         editor = CodeEditor()
-        index = self.tabs.addTab(editor, "Untitled")
+        index = self.add_editor_tab(editor, "Untitled")
         self.tabs.setCurrentIndex(index)
     
     def open_file(self):
@@ -2095,9 +2915,9 @@ class MainWindow(QMainWindow):
         
         for file_path in file_paths:
             if file_path:
-                editor = CodeEditor(file_path)
+                editor = self.create_editor(file_path)
                 file_name = os.path.basename(file_path)
-                index = self.tabs.addTab(editor, file_name)
+                index = self.add_editor_tab(editor, file_name)
                 self.tabs.setCurrentIndex(index)
                 
                 # Mostrar encoding detectado
@@ -2109,20 +2929,34 @@ class MainWindow(QMainWindow):
         if current_editor and current_editor.save_file():
             file_name = os.path.basename(current_editor.file_path)
             self.tabs.setTabText(self.tabs.currentIndex(), file_name)
-            self.statusBar().showMessage(f"File saved: {current_editor.file_path}")
+            self.statusBar().showMessage(f"Saving {current_editor.file_path}...")
     
     def save_file_as(self):
         current_editor = self.tabs.currentWidget()
         if current_editor and current_editor.save_file_as():
-            file_name = os.path.basename(current_editor.file_path)
-            self.tabs.setTabText(self.tabs.currentIndex(), file_name)
-            self.statusBar().showMessage(f"File saved: {current_editor.file_path}")
+            # The tab is renamed once the save succeeds (on_editor_saved)
+            self.statusBar().showMessage("Saving...")
     
     def close_tab(self, index):
+        editor = self.tabs.widget(index)
         self.tabs.removeTab(index)
+        if editor:
+            # Releases resources such as the large-file memory map
+            editor.close()
+            editor.deleteLater()
         if self.tabs.count() == 0:
             self.new_file()
     
+    def closeEvent(self, event):
+        # Finish pending saves and stop background loads before exiting
+        self.find_in_folder.stop_search()
+        self.stop_workspace_index()
+        self.ai_chat.stop_project_index()
+        self.ai_chat.ai_requests.shutdown()
+        for i in range(self.tabs.count()):
+            self.tabs.widget(i).close()
+        super().closeEvent(event)
+
     def undo(self):
         current_editor = self.tabs.currentWidget()
         if current_editor:
@@ -0,0 +1,101 @@
+"""Rapid-fire AI prompts: one thread per send vs AIRequestManager.
+
+Sends a burst of prompts (some repeated) to the fake OpenAI-compatible
+server of bench_ai_streaming. The old way started an AIThread per send
+and displayed replies as they came; the manager runs them in order, one
+call per distinct prompt. Counts server calls and replies out of order.
+
+Usage: python benchmarks/bench_ai_requests.py [prompts] [distinct]
+"""
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PyQt6.QtCore import QCoreApplication
+
+from bench_ai_streaming import FakeCompletions, ThreadingHTTPServer
+from data.ai_requests import AIRequestManager
+from data.base_ai import AIThread
+from data.perplexity_ai import PerplexityAI
+
+
+class CountingCompletions(FakeCompletions):
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        with CountingCompletions.lock:
+            CountingCompletions.calls += 1
+        super().do_POST()
+
+
+def burst(count, distinct):
+    return [f"prompt {n % distinct}" for n in range(count)]
+
+
+def run_threads(app, provider, prompts):
+    replies = []
+    threads = []
+    for prompt in prompts:
+        thread = AIThread(provider, prompt)
+        thread.response_ready.connect(lambda text, prompt=prompt: replies.append(prompt))
+        thread.error_occurred.connect(lambda error, prompt=prompt: replies.append(prompt))
+        threads.append(thread)
+        thread.start()
+    while len(replies) < len(prompts):
+        app.processEvents()
+        time.sleep(0.001)
+    for thread in threads:
+        thread.wait()
+    return replies
+
+
+def run_manager(app, provider, prompts):
+    manager = AIRequestManager()
+    replies = []
+    manager.response_ready.connect(lambda request, text: replies.append(request.prompt))
+    manager.error_occurred.connect(lambda request, error: replies.append(request.prompt))
+    for prompt in prompts:
+        manager.submit(provider, prompt)
+    while manager.busy():
+        app.processEvents()
+        time.sleep(0.001)
+    manager.shutdown()
+    return replies
+
+
+def out_of_order(replies, prompts):
+    order = {prompt: index for index, prompt in reversed(list(enumerate(prompts)))}
+    return sum(order[a] > order[b] for a, b in zip(replies, replies[1:]))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    CountingCompletions.tokens = 20
+    CountingCompletions.delay = 0.01
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CountingCompletions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app = QCoreApplication(sys.argv)
+    provider = PerplexityAI(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    provider.connect("fake-key")
+
+    prompts = burst(count, distinct)
+    print(f"{count} prompts, {distinct} distinct")
+    for label, run in (("thread per send", run_threads), ("AIRequestManager", run_manager)):
+        CountingCompletions.calls = 0
+        start = time.perf_counter()
+        replies = run(app, provider, prompts)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<17} {elapsed * 1000:8.1f} ms   {CountingCompletions.calls:3} calls"
+              f"   {len(replies):3} replies   {out_of_order(replies, prompts):3} out of order")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
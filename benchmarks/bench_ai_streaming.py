@@ -0,0 +1,99 @@
+"""Time to first text of an AI response, whole vs streamed.
+
+Runs a local fake OpenAI-compatible server that sends a response token
+by token, and points PerplexityAI at it. The blocking path waits for
+generate_response; the streaming path goes through AIThread as the chat
+does and times the first chunk_ready signal.
+
+Usage: python benchmarks/bench_ai_streaming.py [tokens] [ms per token]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6.QtCore import QCoreApplication
+
+from data.base_ai import AIThread
+from data.perplexity_ai import PerplexityAI
+
+
+class FakeCompletions(BaseHTTPRequestHandler):
+    tokens = 200
+    delay = 0.025
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        words = [f"word{n} " for n in range(self.tokens)]
+        if not request.get('stream'):
+            time.sleep(self.delay * self.tokens)
+            self._send('application/json', json.dumps({
+                'id': 'fake', 'object': 'chat.completion', 'created': 0, 'model': request['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ''.join(words)}}],
+            }).encode())
+            return
+        self._send('text/event-stream', None)
+        for word in words:
+            time.sleep(self.delay)
+            chunk = {'id': 'fake', 'object': 'chat.completion.chunk', 'created': 0, 'model': request['model'],
+                     'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send(self, content_type, body):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if body is not None:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+
+def run_thread(app, provider, stream):
+    thread = AIThread(provider, "Explain this module", stream=stream)
+    times = {}
+    start = time.perf_counter()
+    thread.chunk_ready.connect(lambda chunk: times.setdefault('first', time.perf_counter() - start))
+    thread.response_ready.connect(lambda text: times.update(done=time.perf_counter() - start, size=len(text)))
+    thread.error_occurred.connect(lambda error: times.update(done=time.perf_counter() - start, error=error))
+    thread.finished.connect(app.quit)
+    thread.start()
+    app.exec()
+    thread.wait()
+    return times
+
+
+def main():
+    FakeCompletions.tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    FakeCompletions.delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 25) / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCompletions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app = QCoreApplication(sys.argv)
+
+    provider = PerplexityAI(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    provider.connect("fake-key")
+    print(f"{FakeCompletions.tokens} tokens, {FakeCompletions.delay * 1000:.0f} ms each")
+    for label, stream in (("generate_response", False), ("stream_response", True)):
+        times = run_thread(app, provider, stream)
+        if 'error' in times:
+            print(f"  {label:<18} {times['error']}")
+            continue
+        first = times.get('first', times['done'])
+        print(f"  {label:<18} first text {first * 1000:8.1f} ms   complete {times['done'] * 1000:8.1f} ms"
+              f"   {times['size']} chars")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Project context for the AI: first-15-files scan vs ContextEngine.
+
+Generates a Lua project with one file that answers the question, then
+times prompt assembly both ways and checks whether that file made it
+into the context. The old way is what build_context_prompt did: the
+first 15 files os.walk yields, 1200 characters of each. The engine's
+RetrievalIndex is built once, then updated after one file changes.
+
+Usage: python benchmarks/bench_context.py [modules] [files per module]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.context_engine import ContextEngine, estimate_tokens
+from data.retrieval_index import RetrievalIndexer
+
+
+WORDS = ['player', 'item', 'creature', 'spell', 'bank', 'market', 'outfit', 'mount', 'quest',
+         'storage', 'house', 'guild', 'party', 'vocation', 'skill', 'depot']
+QUESTION = "Where does depositGold update the bank balance?"
+
+
+def make_project(root, modules, files, seed=0):
+    rng = random.Random(seed)
+    for m in range(modules):
+        folder = os.path.join(root, 'modules', f'mod{m}')
+        os.makedirs(folder)
+        for f in range(files):
+            body = []
+            for n in range(30):
+                a, b, c = rng.sample(WORDS, 3)
+                body.append(f"function {a}{b.capitalize()}{n}(player)\n  local value = player:get{c.capitalize()}()\n"
+                            f"  if value then\n    return {n}\n  end\n  return nil\nend\n")
+            with open(os.path.join(folder, f'mod{m}_f{f}.lua'), 'w') as out:
+                out.write('\n'.join(body))
+    target = os.path.join(root, 'modules', f'mod{modules // 2}', 'bank_system.lua')
+    with open(target, 'w') as out:
+        out.write("function depositGold(player, amount)\n  player:setBankBalance(player:getBankBalance() + amount)\nend\n")
+    return target
+
+
+def old_context(root):
+    files = []
+    for folder, dirs, names in os.walk(root):
+        for name in names:
+            if name.endswith('.lua'):
+                files.append(os.path.join(folder, name))
+            if len(files) >= 15:
+                break
+        if len(files) >= 15:
+            break
+    parts = []
+    for path in files:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            parts.append(f"--- {os.path.basename(path)} ---\n{f.read()[:1200]}")
+    return files, '\n'.join(parts)
+
+
+def main():
+    modules = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as root:
+        target = make_project(root, modules, files)
+        print(f"{modules * files + 1} files")
+
+        start = time.perf_counter()
+        picked, text = old_context(root)
+        print(f"  first 15 files     {(time.perf_counter() - start) * 1000:8.1f} ms"
+              f"   {estimate_tokens(text):6} tokens   answer included: {target in picked}")
+
+        engine = ContextEngine(root)
+        start = time.perf_counter()
+        RetrievalIndexer(engine.index).run()
+        print(f"  index, first build {(time.perf_counter() - start) * 1000:8.1f} ms   (background, once)")
+        start = time.perf_counter()
+        RetrievalIndexer(engine.index).run()
+        print(f"  index, no changes  {(time.perf_counter() - start) * 1000:8.1f} ms")
+        with open(target, 'a') as out:
+            out.write("\nfunction withdrawGold(player, amount)\n  return depositGold(player, -amount)\nend\n")
+        start = time.perf_counter()
+        RetrievalIndexer(engine.index, [target]).run()
+        print(f"  index, saved file  {(time.perf_counter() - start) * 1000:8.1f} ms")
+        for budget in (8000, 30000):
+            start = time.perf_counter()
+            selected = engine.select(QUESTION, budget)
+            elapsed = time.perf_counter() - start
+            tokens = sum(estimate_tokens(chunk.text) for _, chunks in selected for chunk in chunks)
+            print(f"  engine, {budget:5} tok {elapsed * 1000:8.1f} ms   {tokens:6} tokens"
+                  f"   answer included: {any(path == target for path, _ in selected)}")
+        engine.close()
+
+if __name__ == "__main__":
+    main()
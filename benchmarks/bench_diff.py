@@ -0,0 +1,148 @@
+"""Compare the diff engine with difflib on synthetic and real file pairs.
+
+Real pairs are the repository's own files, first commit against the
+working tree; pass more as extra arguments (old new ...). difflib.Differ
+(what DiffViewerDialog used to run) is skipped above --differ-limit lines,
+as it takes minutes there.
+
+Usage: python benchmarks/bench_diff.py [lines] [--differ-limit N] [old new ...]
+"""
+import difflib
+import gc
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.diff_engine import ALGORITHMS, diff_lines, diff_stats
+
+
+LUA_FUNCTION = (
+    "function {name}(player, item, position)\n"
+    "  local tile = Tile(position)\n"
+    "  if not tile then\n"
+    "    return false\n"
+    "  end\n"
+    "  player:sendTextMessage(MESSAGE_INFO_DESCR, \"{name} used at \" .. {n})\n"
+    "  return true\n"
+    "end\n"
+    "\n"
+)
+
+
+def synthetic_file(lines, seed=0):
+    rng = random.Random(seed)
+    text = []
+    n = 0
+    while len(text) < lines:
+        n += 1
+        text.extend(LUA_FUNCTION.format(name=f"onUse{rng.randrange(10 ** 6)}", n=n).splitlines())
+    return text[:lines]
+
+
+def edited(lines, fraction, seed=1):
+    """Copy of `lines` with edits, inserts and deletes on `fraction` of them."""
+    rng = random.Random(seed)
+    result = []
+    for line in lines:
+        roll = rng.random()
+        if roll < fraction / 3:
+            continue
+        if roll < 2 * fraction / 3:
+            result.append(line.replace("return", "return not"))
+        else:
+            result.append(line)
+        if rng.random() < fraction / 3:
+            result.append(f"  log('inserted {rng.randrange(10 ** 6)}')")
+    return result
+
+
+def moved_blocks(lines, seed=2):
+    """Copy of `lines` with a few big blocks swapped around."""
+    rng = random.Random(seed)
+    size = max(1, len(lines) // 8)
+    blocks = [lines[i:i + size] for i in range(0, len(lines), size)]
+    for _ in range(3):
+        i, j = rng.randrange(len(blocks)), rng.randrange(len(blocks))
+        blocks[i], blocks[j] = blocks[j], blocks[i]
+    return [line for block in blocks for line in block]
+
+
+def real_pairs(extra):
+    pairs = []
+    first = subprocess.run(["git", "-C", ROOT, "rev-list", "--max-parents=0", "HEAD"],
+                           capture_output=True, text=True).stdout.split()
+    for name in ("ProjectAI.py", "data/diffViewer.py", "data/file_saver.py"):
+        old = subprocess.run(["git", "-C", ROOT, "show", f"{first[0]}:{name}"],
+                             capture_output=True, text=True) if first else None
+        if old is not None and old.returncode == 0 and os.path.exists(os.path.join(ROOT, name)):
+            with open(os.path.join(ROOT, name), encoding="utf-8") as f:
+                pairs.append((f"{name} (first commit -> now)", old.stdout.splitlines(), f.read().splitlines()))
+    for old_path, new_path in zip(extra[::2], extra[1::2]):
+        with open(old_path, encoding="utf-8", errors="replace") as f:
+            old = f.read().splitlines()
+        with open(new_path, encoding="utf-8", errors="replace") as f:
+            new = f.read().splitlines()
+        pairs.append((f"{os.path.basename(old_path)} -> {os.path.basename(new_path)}", old, new))
+    return pairs
+
+
+def timed(function):
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def run_pair(name, a, b, differ_limit):
+    print(f"\n{name}: {len(a)} -> {len(b)} lines")
+    for algorithm in ALGORITHMS:
+        hunks, elapsed = timed(lambda: diff_lines(a, b, algorithm))
+        added, removed = diff_stats(hunks)
+        print(f"  {algorithm:<22} {elapsed * 1000:10.1f} ms   +{added} -{removed}")
+
+    def sequence_matcher():
+        opcodes = difflib.SequenceMatcher(None, a, b).get_opcodes()
+        return [op for op in opcodes if op[0] != 'equal']
+    opcodes, elapsed = timed(sequence_matcher)
+    added = sum(j2 - j1 for _, _, _, j1, j2 in opcodes)
+    removed = sum(i2 - i1 for _, i1, i2, _, _ in opcodes)
+    print(f"  {'difflib SequenceMatcher':<22} {elapsed * 1000:10.1f} ms   +{added} -{removed}")
+
+    if max(len(a), len(b)) <= differ_limit:
+        diff, elapsed = timed(lambda: list(difflib.Differ().compare(a, b)))
+        added = sum(1 for line in diff if line.startswith('+ '))
+        removed = sum(1 for line in diff if line.startswith('- '))
+        print(f"  {'difflib Differ':<22} {elapsed * 1000:10.1f} ms   +{added} -{removed}")
+    else:
+        print(f"  {'difflib Differ':<22}    skipped (over {differ_limit} lines)")
+
+
+def main():
+    args = sys.argv[1:]
+    differ_limit = 5000
+    if "--differ-limit" in args:
+        position = args.index("--differ-limit")
+        differ_limit = int(args[position + 1])
+        del args[position:position + 2]
+    lines = int(args.pop(0)) if args and args[0].isdigit() else 50000
+
+    base = synthetic_file(lines)
+    pairs = [
+        ("identical", base, list(base)),
+        ("1% of lines edited", base, edited(base, 0.01)),
+        ("10% of lines edited", base, edited(base, 0.10)),
+        ("blocks moved", base, moved_blocks(base)),
+        ("unrelated files", base, synthetic_file(lines, seed=99)),
+        ("small file, 10% edited", base[:2000], edited(base[:2000], 0.10)),
+    ]
+    for name, a, b in pairs + real_pairs(args):
+        run_pair(name, a, b, differ_limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Open and scroll a big side-by-side diff: HTML QTextEdits vs DiffPane.
+
+The HTML path is what DiffViewerDialog.render_diff did before: a <div>
+per line pushed into QTextEdit.setHtml on each side. Memory is the
+growth of the process RSS (Linux only). DiffPane marks changed words
+only on the rows it paints; computing them for every replaced line
+up front is timed for comparison.
+
+Usage: python benchmarks/bench_diff_view.py [lines]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PyQt6.QtWidgets import QApplication, QTextEdit
+
+from bench_diff import edited, synthetic_file
+from data.diff_engine import diff_lines, intraline_changes
+from data.diff_view import DiffPane, DiffRows
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return float('nan')
+
+
+def escape_html(text):
+    return (text.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace(' ', '&nbsp;')) or '&nbsp;'
+
+
+def legacy_html(left_lines, right_lines, hunks):
+    left_html, right_html = [], []
+    blank = "<div style='padding: 2px; background-color: #2d2d2d;'>&nbsp;</div>"
+    for hunk in hunks:
+        if hunk.tag == 'equal':
+            for content in left_lines[hunk.a_start:hunk.a_end]:
+                html = f"<div style='padding: 2px;'>{escape_html(content)}</div>"
+                left_html.append(html)
+                right_html.append(html)
+            continue
+        removed = left_lines[hunk.a_start:hunk.a_end]
+        added = right_lines[hunk.b_start:hunk.b_end]
+        left_html.extend(f"<div style='background-color: #4d1f1f; padding: 2px; border-left: 3px solid #f44336;'>"
+                         f"{escape_html(c)}</div>" for c in removed)
+        right_html.extend(f"<div style='background-color: #1f4d1f; padding: 2px; border-left: 3px solid #4caf50;'>"
+                          f"{escape_html(c)}</div>" for c in added)
+        left_html.extend([blank] * (len(added) - len(removed)))
+        right_html.extend([blank] * (len(removed) - len(added)))
+    return ''.join(left_html), ''.join(right_html)
+
+
+def scroll(widgets, app, steps=50):
+    """Average ms to scroll both sides by a page and repaint."""
+    bar = widgets[0].verticalScrollBar()
+    start = time.perf_counter()
+    for step in range(steps):
+        value = bar.maximum() * step // steps
+        for widget in widgets:
+            widget.verticalScrollBar().setValue(value)
+            widget.viewport().repaint()
+        app.processEvents()
+    return (time.perf_counter() - start) / steps * 1000
+
+
+def bench_html(app, left, right, hunks):
+    before = rss_mb()
+    start = time.perf_counter()
+    editors = [QTextEdit(), QTextEdit()]
+    for editor, html in zip(editors, legacy_html(left, right, hunks)):
+        editor.setReadOnly(True)
+        editor.resize(800, 900)
+        editor.show()
+        editor.setHtml(html)
+    app.processEvents()
+    opened = time.perf_counter() - start
+    print(f"  {'HTML QTextEdit':<14} open {opened * 1000:9.1f} ms   scroll {scroll(editors, app):7.2f} ms/step"
+          f"   +{rss_mb() - before:6.1f} MB")
+    for editor in editors:
+        editor.close()
+        editor.deleteLater()
+
+
+def bench_pane(app, left, right, hunks):
+    before = rss_mb()
+    start = time.perf_counter()
+    panes = [DiffPane('left'), DiffPane('right')]
+    rows = DiffRows(hunks)
+    for pane, lines in zip(panes, (left, right)):
+        pane.resize(800, 900)
+        pane.show()
+        pane.set_diff(rows, lines, right if lines is left else left)
+    app.processEvents()
+    opened = time.perf_counter() - start
+    print(f"  {'DiffPane':<14} open {opened * 1000:9.1f} ms   scroll {scroll(panes, app):7.2f} ms/step"
+          f"   +{rss_mb() - before:6.1f} MB")
+    for pane in panes:
+        pane.close()
+        pane.deleteLater()
+
+
+def bench_intraline(left, right, hunks):
+    pairs = [(left[i], right[j]) for hunk in hunks if hunk.tag == 'replace'
+             for i, j in zip(range(hunk.a_start, hunk.a_end), range(hunk.b_start, hunk.b_end))]
+    intraline_changes.cache_clear()
+    start = time.perf_counter()
+    for a, b in pairs:
+        intraline_changes.__wrapped__(a, b)
+    print(f"  intraline for all {len(pairs)} replaced pairs up front: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = QApplication(sys.argv)
+    left = synthetic_file(lines)
+    right = edited(left, 0.05)
+    hunks = diff_lines(left, right)
+    size = sum(map(len, left)) + sum(map(len, right))
+    print(f"{lines} lines, inputs {size / 2 ** 20:.1f} MB of text, {len(hunks)} hunks")
+    bench_intraline(left, right, hunks)
+    bench_pane(app, left, right, hunks)
+    bench_html(app, left, right, hunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare the layered encoding detector with the old chardet-only detection.
+
+Also checks that a UTF-8 file longer than the sample, with a multi-byte
+character cut at the sample boundary, is still detected as UTF-8 when
+the caller passes a bigger sample (as FileLoaderThread does).
+
+Usage: python benchmarks/bench_encoding.py [files_per_encoding]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.encoding_detector import EncodingDetector
+
+
+def legacy_detect_encoding(file_path):
+    """CodeEditor.detect_encoding before the layered detector"""
+    import chardet
+    with open(file_path, 'rb') as f:
+        raw_data = f.read(10240)
+    if len(raw_data) == 0:
+        return 'utf-8', 1.0
+    result = chardet.detect(raw_data)
+    detected_encoding = result['encoding']
+    confidence = result['confidence']
+    if detected_encoding:
+        detected_encoding = detected_encoding.lower()
+        if 'iso-8859' in detected_encoding or 'latin' in detected_encoding:
+            detected_encoding = 'latin-1'
+        elif 'utf-8' in detected_encoding:
+            detected_encoding = 'utf-8'
+        elif 'windows-1252' in detected_encoding or 'cp1252' in detected_encoding:
+            detected_encoding = 'cp1252'
+        elif 'ascii' in detected_encoding:
+            detected_encoding = 'utf-8'
+    if confidence < 0.7:
+        detected_encoding = 'utf-8'
+    return detected_encoding, confidence
+
+
+SAMPLE = (
+    "-- Configuração do módulo de ações\n"
+    "local função = {}\n"
+    "function função.inicializar(janela)\n"
+    "  janela:setText('Olá, coração! Ação concluída às 12h')\n"
+    "end\n"
+)
+
+
+def build_corpus(directory, per_encoding):
+    corpus = []
+    for encoding in ('utf-8', 'cp1252', 'utf-16'):
+        for i in range(per_encoding):
+            path = os.path.join(directory, f"{encoding}_{i}.lua")
+            with open(path, 'w', encoding=encoding, newline='') as f:
+                f.write(SAMPLE * (40 + i % 200))
+            corpus.append((path, encoding))
+    return corpus
+
+
+def run(name, detect, corpus):
+    start = time.perf_counter()
+    correct = 0
+    for path, expected in corpus:
+        encoding, _ = detect(path)
+        correct += encoding.replace('-sig', '') == expected
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed * 1000:9.1f} ms  {elapsed / len(corpus) * 1e6:8.1f} us/file  "
+          f"{correct}/{len(corpus)} correct")
+
+
+def check_sample_boundary(directory):
+    detector = EncodingDetector()
+    path = os.path.join(directory, "boundary.lua")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('a' * (detector.sample_size - 1) + 'é' + 'b' * 40000)
+    with open(path, 'rb') as f:
+        sample = f.read(4 * detector.sample_size)
+    encoding, _ = detector.detect(path, sample)
+    print(f"UTF-8 character cut at the sample boundary: {encoding}")
+    assert encoding == 'utf-8', encoding
+
+
+def import_time(module):
+    def interpreter(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        return time.perf_counter() - start
+    return max(interpreter(f"import {module}") - interpreter("pass"), 0.0)
+
+
+def main():
+    per_encoding = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as directory:
+        check_sample_boundary(directory)
+        corpus = build_corpus(directory, per_encoding)
+
+        print(f"chardet import (fresh interpreter): {import_time('chardet') * 1000:.1f} ms\n")
+
+        run("legacy chardet", legacy_detect_encoding, corpus)
+        detector = EncodingDetector()
+        run("layered (cold cache)", detector.detect, corpus)
+        run("layered (warm cache)", detector.detect, corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare two generated release folders with FolderCompareThread.
+
+The right folder is a copy of the left one with a few hundred files
+edited, added and removed. It is timed twice: as copied (modification
+times kept, so unchanged files are skipped without being read) and
+after touching every file (so equal-sized files must be read), against
+filecmp.dircmp walking the same trees.
+
+Usage: python benchmarks/bench_folder_compare.py [files] [changes]
+"""
+import filecmp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.folder_compare import FolderCompareThread
+
+
+def make_tree(root, files, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for n in range(files):
+        folder = os.path.join(root, f"modules/mod{n % 200}/{'ui' if n % 3 else 'scripts'}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"file{n}.lua")
+        with open(path, 'w') as f:
+            f.write(f"-- module {n}\n" + "local value = %d\n" % rng.randrange(10 ** 6) * rng.randrange(5, 200))
+        paths.append(path)
+    return paths
+
+
+def change_tree(root, changes, seed=1):
+    rng = random.Random(seed)
+    files = sorted(os.path.join(folder, name) for folder, _, names in os.walk(root) for name in names)
+    for path in rng.sample(files, changes):
+        action = rng.randrange(3)
+        if action == 0:
+            os.remove(path)
+        else:
+            with open(path, 'r+') as f:
+                text = f.read()
+                f.seek(0)
+                # Half the edits keep the size, so only the contents tell them apart
+                f.write(text.replace("local", "LOCAL", 1) if action == 1 else text + "-- edited\n")
+    for n in range(changes // 3):
+        with open(os.path.join(root, f"modules/mod{n}/new{n}.lua"), 'w') as f:
+            f.write("return true\n")
+
+
+def touch_all(root):
+    for folder, _, names in os.walk(root):
+        for name in names:
+            os.utime(os.path.join(folder, name))
+
+
+def run_thread(left, right):
+    thread = FolderCompareThread(left, right)
+    found = []
+    thread.differences_found.connect(found.extend)
+    start = time.perf_counter()
+    thread.run()  # synchronously; signals are delivered directly
+    return found, thread.files_read, time.perf_counter() - start
+
+
+def run_dircmp(left, right):
+    start = time.perf_counter()
+    differences = 0
+    pending = [filecmp.dircmp(left, right)]
+    while pending:
+        comparison = pending.pop()
+        # dircmp only compares stat signatures; check contents like the thread does
+        _, mismatch, errors = filecmp.cmpfiles(comparison.left, comparison.right,
+                                               comparison.common_files, shallow=False)
+        differences += len(comparison.left_only) + len(comparison.right_only) + len(mismatch) + len(errors)
+        pending.extend(comparison.subdirs.values())
+    return differences, time.perf_counter() - start
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    with tempfile.TemporaryDirectory() as tmp:
+        left = os.path.join(tmp, "release1")
+        right = os.path.join(tmp, "release2")
+        make_tree(left, files)
+        shutil.copytree(left, right)
+        change_tree(right, changes)
+        print(f"{files} files, {changes} changed, {changes // 3} added")
+        for label in ("mtimes kept", "all touched"):
+            if label == "all touched":
+                touch_all(right)
+            found, read, elapsed = run_thread(left, right)
+            print(f"  {label:<12} FolderCompareThread {elapsed * 1000:8.1f} ms"
+                  f"   {len(found)} differences, {read} files read")
+            differences, elapsed = run_dircmp(left, right)
+            print(f"  {label:<12} filecmp.dircmp      {elapsed * 1000:8.1f} ms   {differences} differences")
+
+
+if __name__ == "__main__":
+    main()
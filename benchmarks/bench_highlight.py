@@ -0,0 +1,142 @@
+"""Compare the single-pass tokenizer with the old rule-per-keyword highlighter.
+
+Usage: python benchmarks/bench_highlight.py [lines]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QRegularExpression
+from PyQt6.QtGui import QSyntaxHighlighter, QTextDocument
+from PyQt6.QtWidgets import QApplication
+
+from ProjectAI import SyntaxHighlighter
+
+
+class LegacyHighlighter(QSyntaxHighlighter):
+    """SyntaxHighlighter before the tokenizer: one regex per rule"""
+
+    def __init__(self, document, file_extension):
+        super().__init__(document)
+        current = SyntaxHighlighter(None, file_extension)
+        formats = current.formats
+        tokenizer = current.tokenizer
+        rules = []
+        for word in sorted(tokenizer.keywords) + sorted(tokenizer.phrases):
+            rules.append((QRegularExpression(f'\\b{word}\\b'), formats['keyword']))
+        if file_extension in ('.otui', '.otml'):
+            for widget in sorted(tokenizer.widgets):
+                rules.append((QRegularExpression(f'\\b{widget}\\b'), formats['widget']))
+            rules.append((QRegularExpression(r'\b[\w-]+(?=\s*:)'), formats['property']))
+            rules.append((QRegularExpression(r'\b(true|false)\b'), formats['boolean']))
+            rules.append((QRegularExpression(r'#[\w-]+'), formats['widget']))
+            rules.append((QRegularExpression(r'#[0-9A-Fa-f]{6,8}\b'), formats['string']))
+        rules.append((QRegularExpression(r'"[^"]*"'), formats['string']))
+        rules.append((QRegularExpression(r"'[^']*'"), formats['string']))
+        rules.append((QRegularExpression(r'\b\d+\b'), formats['number']))
+        comment = {'.py': '#', '.otui': '#', '.lua': '--'}.get(file_extension)
+        if comment:
+            rules.append((QRegularExpression(QRegularExpression.escape(comment) + '.*'), formats['comment']))
+        rules.append((QRegularExpression(r'\b[A-Za-z]+[A-Za-z0-9_]*(?=\()'), formats['function']))
+        self.highlighting_rules = rules
+
+    def highlightBlock(self, text):
+        for pattern, format_style in self.highlighting_rules:
+            iterator = pattern.globalMatch(text)
+            while iterator.hasNext():
+                match = iterator.next()
+                self.setFormat(match.capturedStart(), match.capturedLength(), format_style)
+
+
+SAMPLES = {
+    '.py': (
+        "class Parser(object):\n"
+        "    def parse(self, data, limit=100):\n"
+        "        # skip the header before reading items\n"
+        "        for index, item in enumerate(data):\n"
+        "            if item is None or index > limit:\n"
+        "                return False\n"
+        "        value = {'key': 42, \"name\": 'parser'}\n"
+        "        return self.finish(value)\n"
+    ),
+    '.lua': (
+        "local function onUse(player, item, fromPosition, target)\n"
+        "  -- teleport the player to the temple\n"
+        "  if not player or item.itemid ~= 2160 then\n"
+        "    return false\n"
+        "  end\n"
+        "  player:teleportTo({x = 1000, y = 1000, z = 7})\n"
+        "  print('used ' .. item.itemid)\n"
+        "end\n"
+    ),
+    '.otui': (
+        "MainWindow\n"
+        "  id: optionsWindow\n"
+        "  size: 490 360\n"
+        "  background-color: alpha\n"
+        "  @onEnter: modules.options.hide()\n"
+        "  Button\n"
+        "    text: Close\n"
+        "    anchors.right: parent.right\n"
+        "    visible: true\n"
+    ),
+}
+
+
+def document_colors(document):
+    colors = []
+    block = document.begin()
+    while block.isValid():
+        line = []
+        for fmt_range in block.layout().formats():
+            line.append((fmt_range.start, fmt_range.length, fmt_range.format.foreground().color().name()))
+        colors.append(sorted(line))
+        block = block.next()
+    return colors
+
+
+def char_colors(line_ranges, length):
+    # Later ranges win, as with repeated setFormat calls
+    chars = [None] * length
+    for start, size, color in line_ranges:
+        for i in range(start, min(start + size, length)):
+            chars[i] = color
+    return chars
+
+
+def run(name, highlighter_class, text, extension):
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = highlighter_class(document, extension)
+    start = time.perf_counter()
+    highlighter.rehighlight()
+    elapsed = time.perf_counter() - start
+    lines = document.blockCount()
+    print(f"  {name:<20} {elapsed * 1000:9.1f} ms  {lines / elapsed:12.0f} lines/s")
+    return document, elapsed
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = QApplication(sys.argv)
+    for extension, sample in SAMPLES.items():
+        sample_lines = sample.count('\n')
+        text = sample * (line_count // sample_lines)
+        print(f"{extension} ({line_count} lines)")
+        legacy_doc, legacy_time = run("legacy rules", LegacyHighlighter, text, extension)
+        current_doc, current_time = run("tokenizer", SyntaxHighlighter, text, extension)
+
+        lines = text.split('\n')
+        different = 0
+        for line, old, new in zip(lines, document_colors(legacy_doc), document_colors(current_doc)):
+            if char_colors(old, len(line)) != char_colors(new, len(line)):
+                different += 1
+        print(f"  speedup {legacy_time / current_time:.1f}x, lines with different colors: {different}\n")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Count how many blocks are re-highlighted per keystroke in a large file.
+
+With block states, an edit re-highlights forward only until a block's end
+state matches the one it had before, so the work per keystroke depends on
+the edit, not on the size of the document.
+
+Usage: python benchmarks/bench_highlight_state.py [lines]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtGui import QTextCursor, QTextDocument
+from PyQt6.QtWidgets import QApplication, QPlainTextDocumentLayout
+
+from ProjectAI import SyntaxHighlighter
+
+
+class CountingHighlighter(SyntaxHighlighter):
+    calls = 0
+
+    def highlightBlock(self, text):
+        CountingHighlighter.calls += 1
+        super().highlightBlock(text)
+
+
+SAMPLES = {
+    '.py': (
+        "def handler(event, context):\n"
+        "    \"\"\"Handle one event.\n"
+        "\n"
+        "    Returns the processed payload.\n"
+        "    \"\"\"\n"
+        "    payload = event.get('body', 42)\n"
+        "    return process(payload)\n"
+        "\n"
+    ),
+    '.lua': (
+        "--[[ Teleports the player\n"
+        "     to the temple position ]]\n"
+        "local function onUse(player, item)\n"
+        "  local text = [==[\n"
+        "multi-line string ]] still inside\n"
+        "]==]\n"
+        "  return player:teleportTo(42)\n"
+        "end\n"
+    ),
+}
+
+
+def type_text(document, block_number, column, text):
+    """Type `text` one character at a time; returns highlightBlock calls per key."""
+    cursor = QTextCursor(document.findBlockByNumber(block_number))
+    cursor.movePosition(QTextCursor.MoveOperation.Right, n=column)
+    calls = []
+    for char in text:
+        CountingHighlighter.calls = 0
+        cursor.insertText(char)
+        calls.append(CountingHighlighter.calls)
+    return calls
+
+
+def report(name, calls, elapsed):
+    print(f"  {name:<34} {len(calls):3} keys  max {max(calls):6} blocks/key  "
+          f"total {sum(calls):7}  {elapsed * 1000 / len(calls):7.2f} ms/key")
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = QApplication(sys.argv)
+    for extension, sample in SAMPLES.items():
+        sample_lines = sample.count('\n')
+        text = sample * (line_count // sample_lines)
+        document = QTextDocument()
+        document.setPlainText(text)
+        # Without a layout (as when shown in an editor) the document does
+        # not emit contentsChange, which drives re-highlighting
+        document.setDocumentLayout(QPlainTextDocumentLayout(document))
+        CountingHighlighter(document, extension)
+
+        # The first full pass runs from the event loop; edits are ignored
+        # by QSyntaxHighlighter until it has happened
+        CountingHighlighter.calls = 0
+        start = time.perf_counter()
+        app.processEvents()
+        full = CountingHighlighter.calls
+        print(f"{extension} ({document.blockCount()} blocks): full highlight {full} blocks "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        middle = (document.blockCount() // 2 // sample_lines) * sample_lines
+        cases = [
+            ("typing on a code line", middle + sample_lines - 2, 4, "value = other + 1"),
+            ("typing inside a multi-line span", middle + 1, 8, " more words here"),
+            ("new lines inside a multi-line span", middle + 1, 8, "\n\n\n"),
+        ]
+        if extension == '.lua':
+            # Opening a comment changes the state of the following blocks
+            # until the next ']]', then closing it restores them
+            cases.append(("opening and closing a comment", middle + sample_lines - 2, 2, "--[[ x ]]"))
+        for name, block, column, keys in cases:
+            start = time.perf_counter()
+            calls = type_text(document, block, column, keys)
+            report(name, calls, time.perf_counter() - start)
+        print()
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
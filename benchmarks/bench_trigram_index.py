@@ -0,0 +1,110 @@
+"""Narrow a workspace search with TrigramIndex vs reading every file.
+
+Builds a generated tree, indexes it with WorkspaceIndexer, then for a
+few plain and regex searches compares the candidates query plus
+searching the candidates with reading and searching every file. Checks
+that no file with a match is left out of the candidates, and that
+required_literals only keeps text every match must contain.
+
+Usage: python benchmarks/bench_trigram_index.py [files]
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.trigram_index import TrigramIndex, WorkspaceIndexer, required_literals
+
+WORDS = ["local", "function", "return", "player", "inventory", "weapon", "damage",
+         "health", "spawn", "vehicle", "config", "handler", "event", "trigger"]
+
+SEARCHES = [
+    ("plain", "inventory"),
+    ("plain", "RARE_MARKER_7"),
+    ("regex", r"damage\s*=\s*\d+"),
+    ("regex", r"(?i:RARE_MARKER)_\d"),
+    ("regex", r"(?im)^spawn_\w+\(\)$"),
+]
+
+# Pattern, literals it must give
+LITERAL_CASES = [
+    (r"(?i:abc)", ["abc"]),
+    (r"(?-i:ABC)DEF", ["ABC", "DEF"]),
+    (r"x(?s:.)yyy", ["x", "yyy"]),
+    (r"(?im)abcd", ["abcd"]),
+    (r"(?ix)a b c", []),
+    (r"(?(1)a|b)cde", []),
+    (r"\x41bc", ["bc"]),
+    (r"(?P<name>abc)d", ["abc", "d"]),
+]
+
+
+def make_tree(root, files, seed=0):
+    rng = random.Random(seed)
+    for n in range(files):
+        folder = os.path.join(root, f"resources/res{n % 50}")
+        os.makedirs(folder, exist_ok=True)
+        lines = [f"{rng.choice(WORDS)}_{rng.choice(WORDS)} = {rng.randrange(1000)}" for _ in range(80)]
+        if n % 97 == 0:
+            lines.append(f"RARE_MARKER_{n % 10} = true")
+        if n % 13 == 0:
+            lines.append("damage = 25")
+        if n % 31 == 0:
+            lines.append(f"spawn_{rng.choice(WORDS)}()")
+        with open(os.path.join(folder, f"file{n}.lua"), 'w', encoding='utf-8', newline='') as f:
+            f.write(('\r\n' if n % 2 else '\n').join(lines))
+
+
+def matching_files(paths, search_kind, text):
+    pattern = re.compile(text if search_kind == "regex" else re.escape(text))
+    found = set()
+    for path in paths:
+        with open(path, encoding='utf-8', newline='') as f:
+            if pattern.search(f.read().replace('\r\n', '\n')):
+                found.add(path)
+    return found
+
+
+def check_literals():
+    for pattern, expected in LITERAL_CASES:
+        literals = required_literals(pattern)
+        assert literals == expected, (pattern, literals, expected)
+    print(f"required_literals: {len(LITERAL_CASES)} cases ok")
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    check_literals()
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, files)
+        every_file = [os.path.join(folder, name) for folder, _, names in os.walk(root)
+                      for name in names if name.endswith('.lua')]
+        index = TrigramIndex(root)
+        indexer = WorkspaceIndexer(index)
+        start = time.perf_counter()
+        indexer.run()
+        print(f"{files} files, indexed in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        for search_kind, text in SEARCHES:
+            start = time.perf_counter()
+            expected = matching_files(every_file, search_kind, text)
+            walk = time.perf_counter() - start
+
+            start = time.perf_counter()
+            candidates = index.candidates(text, regex=search_kind == "regex")
+            candidates = every_file if candidates is None else list(candidates)
+            found = matching_files(candidates, search_kind, text)
+            narrowed = time.perf_counter() - start
+
+            assert found == expected, (text, len(expected - found))
+            print(f"  {text:<26} walk {walk * 1000:8.1f} ms   index {narrowed * 1000:8.1f} ms"
+                  f"   {len(candidates):5} candidates   {len(found):5} matches")
+
+
+if __name__ == "__main__":
+    main()
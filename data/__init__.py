@@ -2,6 +2,26 @@ from .base_ai import BaseAI, AIThread
 from .gemini_ai import GeminiAI
 from .perplexity_ai import PerplexityAI
 from .diffViewer import DiffViewerDialog
+from .piece_table import PieceTable, LineIndex
+from .large_file_editor import LargeFileEditor, LARGE_FILE_THRESHOLD
+from .file_loader import FileLoaderThread
+from .encoding_detector import EncodingDetector, detect_encoding
+from .file_saver import FileSaverThread, atomic_write
+from .highlighting import Tokenizer, ViewportHighlighter
+from .languages import LanguageDefinition, register_language, get_language
+from .color_index import ColorIndex
+from .search_engine import TextSnapshot, MatchIndex, MatchCounter
+from .workspace import iter_workspace_files
+from .folder_search import FolderSearchThread
+from .trigram_index import TrigramIndex, WorkspaceIndexer
+from .folder_replace import ReplacePlanThread, ReplaceApplyThread
+from .diff_engine import DiffHunk, DiffWorker, diff_lines
+from .diff_view import DiffRows, DiffPane
+from .folder_compare import FolderCompareThread
+from .ai_cache import AIResponseCache
+from .context_engine import ContextEngine
+from .retrieval_index import RetrievalIndex, RetrievalIndexer
+from .ai_requests import AIRequestManager
 
 
 
@@ -13,5 +33,40 @@ __all__ =   [
            'GeminiAI', 
            'PerplexityAI', 
            'DiffViewerDialog', 
+           'PieceTable', 
+           'LineIndex', 
+           'LargeFileEditor', 
+           'LARGE_FILE_THRESHOLD', 
+           'FileLoaderThread', 
+           'EncodingDetector', 
+           'detect_encoding', 
+           'FileSaverThread', 
+           'atomic_write', 
+           'Tokenizer', 
+           'ViewportHighlighter', 
+           'LanguageDefinition', 
+           'register_language', 
+           'get_language', 
+           'ColorIndex', 
+           'TextSnapshot', 
+           'MatchIndex', 
+           'MatchCounter', 
+           'iter_workspace_files', 
+           'FolderSearchThread', 
+           'TrigramIndex', 
+           'WorkspaceIndexer', 
+           'ReplacePlanThread', 
+           'ReplaceApplyThread', 
+           'DiffHunk', 
+           'diff_lines', 
+           'DiffWorker', 
+           'DiffRows', 
+           'DiffPane', 
+           'FolderCompareThread', 
+           'AIResponseCache', 
+           'ContextEngine', 
+           'RetrievalIndex', 
+           'RetrievalIndexer', 
+           'AIRequestManager', 
            
            ]
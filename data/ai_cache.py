@@ -0,0 +1,118 @@
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from .workspace import CACHE_DIR_NAME
+
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS responses ("
+    " key TEXT PRIMARY KEY, provider TEXT, model TEXT, response TEXT NOT NULL,"
+    " size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)",
+)
+
+
+def default_cache_path():
+    """Cache file shared by every workspace (prompts carry their own code)."""
+    folder = os.path.join(os.path.expanduser('~'), CACHE_DIR_NAME)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, AIResponseCache.FILE_NAME)
+
+
+class AIResponseCache:
+    """AI responses of earlier prompts, keyed on provider, model and prompt hash.
+
+    A small in-memory LRU sits in front of a SQLite store. Entries older
+    than MAX_AGE are dropped, and the least recently used ones go once
+    the stored responses pass MAX_BYTES.
+    """
+
+    FILE_NAME = 'ai_cache.sqlite'
+    MEMORY_ENTRIES = 64
+    MAX_BYTES = 64 * 1024 * 1024
+    MAX_AGE = 30 * 24 * 3600
+    # Eviction runs once every this many stored responses
+    EVICT_EVERY = 32
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self.memory = OrderedDict()  # key -> (response, created)
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+        self.evict()
+
+    @staticmethod
+    def key(provider, model, prompt):
+        data = '\0'.join((provider or '', model or '', prompt))
+        return hashlib.sha256(data.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def get(self, key):
+        """The cached response, or None (counted as a hit or a miss)."""
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None and now - entry[1] < self.MAX_AGE:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.memory.pop(key, None)
+
+        row = self.connection.execute(
+            "SELECT response, created FROM responses WHERE key = ? AND created > ?",
+            (key, now - self.MAX_AGE)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.connection.commit()
+        self._remember(key, row[0], row[1])
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, response, provider=None, model=None):
+        now = time.time()
+        self._remember(key, response, now)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, provider, model, response, size, created, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, response, len(response.encode('utf-8', 'surrogatepass')), now, now))
+        self.connection.commit()
+        self._puts += 1
+        if self._puts % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired responses, then the least recently used over MAX_BYTES."""
+        self.connection.execute("DELETE FROM responses WHERE created <= ?", (time.time() - self.MAX_AGE,))
+        self.connection.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS total"
+            " FROM responses) WHERE total > ?)", (self.MAX_BYTES,))
+        self.connection.commit()
+
+    def clear(self):
+        self.memory.clear()
+        self.connection.execute("DELETE FROM responses")
+        self.connection.commit()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def close(self):
+        self.connection.close()
+
+    def _remember(self, key, response, created):
+        self.memory[key] = (response, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.MEMORY_ENTRIES:
+            self.memory.popitem(last=False)
@@ -0,0 +1,144 @@
+import functools
+from collections import deque
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .base_ai import AIThread
+
+
+class AIRequest:
+    """One prompt waiting for, or getting, its AI response."""
+
+    __slots__ = ('provider', 'prompt', 'data', 'response', 'waiters', 'thread')
+
+    def __init__(self, provider, prompt, data=None, response=None):
+        self.provider = provider
+        self.prompt = prompt
+        self.data = data          # whatever the caller needs back with the response
+        self.response = response  # known beforehand (e.g. cached): delivered without a call
+        self.waiters = 1          # submissions merged into this request
+        self.thread = None
+
+    @property
+    def key(self):
+        # A request that must call the provider (e.g. bypassing the cache)
+        # is never answered by a pre-answered one
+        return self.provider, self.prompt, self.response is not None
+
+
+class AIRequestManager(QObject):
+    """Runs AI requests one at a time, in the order they were submitted.
+
+    Up to MAX_QUEUED requests wait behind the running one; a prompt equal
+    to one running or waiting is merged into it, unless just one of the
+    two is answered beforehand. Cancelled threads are interrupted and
+    left to finish on their own (a call blocked on the network cannot be
+    cut short), their signals ignored, so cancelling never waits;
+    shutdown() waits for all of them.
+    """
+
+    request_started = pyqtSignal(object)
+    chunk_ready = pyqtSignal(object, str)
+    response_ready = pyqtSignal(object, str)
+    error_occurred = pyqtSignal(object, str)
+    request_cancelled = pyqtSignal(object)
+
+    MAX_QUEUED = 8
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.queue = deque()
+        self.current = None
+        # Every thread still running, cancelled or not, until it finishes
+        self._threads = set()
+
+    def busy(self):
+        return self.current is not None or bool(self.queue)
+
+    def queued(self):
+        return len(self.queue)
+
+    def submit(self, provider, prompt, data=None, response=None):
+        """The request that will answer `prompt`: a new one, or the equal one already pending.
+
+        Returns None when the queue is full.
+        """
+        key = (provider, prompt, response is not None)
+        for request in (self.current, *self.queue):
+            if request is not None and request.key == key:
+                request.waiters += 1
+                return request
+        if self.current is not None and len(self.queue) >= self.MAX_QUEUED:
+            return None
+        request = AIRequest(provider, prompt, data, response)
+        self.queue.append(request)
+        if self.current is None:
+            self._start_next()
+        return request
+
+    def cancel(self):
+        """Stop the running request and drop the waiting ones."""
+        cancelled = [request for request in (self.current, *self.queue) if request is not None]
+        current, self.current = self.current, None
+        self.queue.clear()
+        if current is not None and current.thread is not None:
+            current.thread.requestInterruption()
+        for request in cancelled:
+            self.request_cancelled.emit(request)
+
+    def shutdown(self):
+        self.cancel()
+        for thread in list(self._threads):
+            thread.requestInterruption()
+            thread.wait()
+        self._threads.clear()
+
+    def _start_next(self):
+        while self.current is None and self.queue:
+            request = self.queue.popleft()
+            self.current = request
+            self.request_started.emit(request)
+            if request.response is not None:
+                self._finish(request)
+                self.response_ready.emit(request, request.response)
+                continue
+            thread = AIThread(request.provider, request.prompt)
+            thread.chunk_ready.connect(functools.partial(self._on_chunk, request))
+            thread.response_ready.connect(functools.partial(self._on_response, request))
+            thread.error_occurred.connect(functools.partial(self._on_error, request))
+            thread.finished.connect(functools.partial(self._on_finished, request))
+            request.thread = thread
+            self._threads.add(thread)
+            thread.start()
+
+    def _finish(self, request):
+        if request is self.current:
+            self.current = None
+
+    def _on_chunk(self, request, chunk):
+        if request is self.current:
+            self.chunk_ready.emit(request, chunk)
+
+    def _on_response(self, request, response):
+        if request is not self.current:
+            return
+        request.response = response
+        self._finish(request)
+        self.response_ready.emit(request, response)
+        self._start_next()
+
+    def _on_error(self, request, error):
+        if request is not self.current:
+            return
+        self._finish(request)
+        self.error_occurred.emit(request, error)
+        self._start_next()
+
+    def _on_finished(self, request):
+        thread, request.thread = request.thread, None
+        thread.wait()
+        self._threads.discard(thread)
+        if request is self.current:
+            # Ended without a response (interrupted): let the queue move on
+            self._finish(request)
+            self._start_next()
@@ -1,21 +1,51 @@
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from PyQt6.QtCore import QThread, pyqtSignal
 
 
 class AIThread(QThread):
+    """Runs a prompt; with `stream`, the text also arrives in chunks as it is generated."""
 
-    response_ready = pyqtSignal(str)
+    chunk_ready = pyqtSignal(str)
+    response_ready = pyqtSignal(str)  # the whole response, at the end
     error_occurred = pyqtSignal(str)
+
+    # Chunks arriving closer than this are emitted together
+    BATCH_INTERVAL = 0.05
     
-    def __init__(self, ai_provider, prompt):
+    def __init__(self, ai_provider, prompt, stream=True):
         super().__init__()
         self.ai_provider = ai_provider
         self.prompt = prompt
+        self.stream = stream
     
     def run(self):
         try:
-            response = self.ai_provider.generate_response(self.prompt)
-            self.response_ready.emit(response)
+            if not self.stream:
+                self.response_ready.emit(self.ai_provider.generate_response(self.prompt))
+                return
+            parts = []
+            pending = []
+            last_emit = 0.0
+            chunks = self.ai_provider.stream_response(self.prompt)
+            try:
+                for chunk in chunks:
+                    if self.isInterruptionRequested():
+                        return
+                    parts.append(chunk)
+                    pending.append(chunk)
+                    now = time.perf_counter()
+                    # The first chunk goes out at once; later ones are grouped
+                    if not last_emit or now - last_emit >= self.BATCH_INTERVAL:
+                        self.chunk_ready.emit(''.join(pending))
+                        pending = []
+                        last_emit = now
+            finally:
+                chunks.close()
+            if pending:
+                self.chunk_ready.emit(''.join(pending))
+            self.response_ready.emit(''.join(parts))
         except Exception as e:
             self.error_occurred.emit(f"Erro: {str(e)}")
 
@@ -37,6 +67,13 @@ class BaseAI(ABC):
 
         pass
     
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        """Yield the response in chunks as they are generated.
+
+        Providers without streaming give the whole response as one chunk.
+        """
+        yield self.generate_response(prompt)
+    
     @abstractmethod
     def get_available_models(self) -> list[str]:
 
@@ -0,0 +1,68 @@
+import re
+
+from PyQt6.QtGui import QTextCharFormat, QColor
+
+from .highlighting import cached_block_value, cache_block_value, make_selection
+from .text_utils import astral_indexes, to_qt_position
+
+
+COLOR_PATTERN = re.compile(r'#[0-9A-Fa-f]{3,8}\b')
+
+
+class ColorIndex:
+    """Hex color codes of a document, indexed per block.
+
+    A block is only rescanned after it changes, and selections are built
+    for the blocks asked for (the visible ones), so the cost of an update
+    does not grow with the document.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self._formats = {}
+
+    def color_format(self, color_code):
+        """Background in the color itself, text readable on top of it."""
+        color_format = self._formats.get(color_code)
+        if color_format is None:
+            color_format = QTextCharFormat()
+            qcolor = QColor(color_code)
+            color_format.setBackground(qcolor)
+
+            # Adjust text color based on brightness
+            brightness = (qcolor.red() * 299 + qcolor.green() * 587 + qcolor.blue() * 114) / 1000
+            if brightness < 128:
+                color_format.setForeground(QColor("#FFFFFF"))
+            else:
+                color_format.setForeground(QColor("#000000"))
+            self._formats[color_code] = color_format
+        return color_format
+
+    def block_selections(self, block):
+        selections = cached_block_value(block, 'colors')
+        if selections is not None:
+            return selections
+
+        text = block.text()
+        selections = []
+        if '#' in text:
+            astral = astral_indexes(text)
+            position = block.position()
+            for match in COLOR_PATTERN.finditer(text):
+                color_code = match.group()
+                if len(color_code) in [4, 7, 9]:  # #RGB, #RRGGBB, #RRGGBBAA
+                    start = to_qt_position(match.start(), astral)
+                    end = to_qt_position(match.end(), astral)
+                    selections.append(make_selection(self.document, position + start, end - start,
+                                                     self.color_format(color_code)))
+        cache_block_value(block, 'colors', selections)
+        return selections
+
+    def selections(self, first, last):
+        """Extra selections for the color codes in blocks first..last."""
+        result = []
+        block = self.document.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            result.extend(self.block_selections(block))
+            block = block.next()
+        return result
@@ -0,0 +1,113 @@
+import os
+
+from .retrieval_index import RetrievalIndex, file_stem, reference_stems, term_counts
+from .workspace import is_inside, path_key
+
+
+# Token budget of the whole prompt, per provider
+PROVIDER_BUDGETS = {
+    "Google Gemini": 30000,
+    "Perplexity AI": 8000,
+}
+DEFAULT_BUDGET = 8000
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class ContextEngine:
+    """Picks the parts of a project most relevant to a question.
+
+    Chunks come from the workspace's RetrievalIndex (kept up to date by a
+    RetrievalIndexer), ranked by the BM25 score of the question's terms
+    and, less, of the current file's rarer terms, plus a bonus for files
+    the current file requires or is required by and for files in its
+    folder. With an embedder, similarity to the question is added too.
+    The best chunks are taken until the token budget is used up.
+    """
+
+    # Tokens of the header and code fence around each chunk in the prompt
+    CHUNK_OVERHEAD = 25
+    REQUIRE_BONUS = 3.0
+    SAME_FOLDER_BONUS = 1.0
+    # Weight of the current file's terms next to the question's
+    CURRENT_FILE_WEIGHT = 0.2
+    CURRENT_FILE_TERMS = 32
+    # Terms found in more than this share of the chunks tell little apart
+    # and cost the most to score: the current file's are skipped, and the
+    # question's too past COMMON_TERM_SHARE (unless all of them are)
+    MAX_TERM_SHARE = 0.05
+    COMMON_TERM_SHARE = 0.5
+    # Candidates read per query; more than any budget can hold
+    SEARCH_LIMIT = 400
+    EMBEDDING_WEIGHT = 5.0
+
+    def __init__(self, root, embedder=None):
+        self.root = root
+        self.index = RetrievalIndex(root, embedder)
+
+    def select(self, question, budget, current_path=None, current_text=""):
+        """[(path, [Chunk])] fitting in `budget` tokens, best files first."""
+        index = self.index
+        current_key = path_key(current_path) if current_path else None
+        current_folder = os.path.dirname(current_key) if current_key else None
+
+        chunk_count = index.chunk_count()
+        asked = term_counts(question)
+        frequencies = index.frequencies(asked)
+        common = max(self.COMMON_TERM_SHARE * chunk_count, min(frequencies.values(), default=0))
+        asked_terms = [term for term, frequency in frequencies.items() if frequency <= common]
+
+        scores = {}  # chunk id -> score
+        chunks = {}  # chunk id -> Chunk
+        for score, chunk in index.search(asked_terms, self.SEARCH_LIMIT):
+            scores[chunk.id] = score
+            chunks[chunk.id] = chunk
+
+        if current_text:
+            current = term_counts(current_text)
+            rare = index.frequencies(current.keys() - asked.keys())
+            rare = [term for term, frequency in rare.items() if frequency <= self.MAX_TERM_SHARE * chunk_count]
+            rare = sorted(rare, key=current.get, reverse=True)[:self.CURRENT_FILE_TERMS]
+            for score, chunk in index.search(rare, self.SEARCH_LIMIT):
+                scores[chunk.id] = scores.get(chunk.id, 0.0) + self.CURRENT_FILE_WEIGHT * score
+                chunks[chunk.id] = chunk
+
+        # Files the current one requires, and the ones requiring it; their
+        # first chunks count even without shared terms
+        related = set()
+        if current_path:
+            for chunk in index.related_chunks(reference_stems(current_text), file_stem(current_path)):
+                scores.setdefault(chunk.id, 0.0)
+                chunks[chunk.id] = chunk
+                related.add(chunk.path)
+        for chunk_id, chunk in chunks.items():
+            if chunk.path in related:
+                scores[chunk_id] += self.REQUIRE_BONUS
+            if current_folder and os.path.dirname(path_key(os.path.join(self.root, chunk.path))) == current_folder:
+                scores[chunk_id] += self.SAME_FOLDER_BONUS
+
+        for chunk_id, similarity in index.similarities(question, scores).items():
+            scores[chunk_id] += self.EMBEDDING_WEIGHT * similarity
+
+        picked = {}
+        used = 0
+        for chunk_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            chunk = chunks[chunk_id]
+            if current_key and path_key(os.path.join(self.root, chunk.path)) == current_key:
+                continue
+            cost = estimate_tokens(chunk.text) + self.CHUNK_OVERHEAD
+            if used + cost > budget:
+                continue
+            used += cost
+            picked.setdefault(chunk.path, []).append(chunk)
+        return [(os.path.join(self.root, path), sorted(chunks, key=lambda chunk: chunk.first_line))
+                for path, chunks in picked.items()]
+
+    def relative(self, path):
+        return os.path.relpath(path, self.root) if is_inside(path, self.root) else path
+
+    def close(self):
+        self.index.close()
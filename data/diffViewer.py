@@ -1,11 +1,15 @@
 import sys
 import os
+import functools
 import shutil
 import subprocess
 import qdarktheme  
-import chardet
 import re
-import difflib
+
+from .diff_engine import ALGORITHMS, DiffWorker
+from .diff_view import DiffPane, DiffRows
+from .folder_compare import FolderCompareThread
+from .folder_search import read_file_text
 
 from PyQt6.QtGui import (QAction, QFont, QSyntaxHighlighter, QTextCharFormat, 
                         QColor, QKeySequence, QFileSystemModel, QTextCursor, QTextDocument)
@@ -17,7 +21,7 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QTextEdit, QFileDialog,
                              QStatusBar, QMessageBox, QTabWidget, QComboBox, QLabel,
                              QTreeView, QSplitter, QPushButton, QLineEdit, 
                              QScrollArea, QFrame, QHBoxLayout, QCheckBox, QColorDialog,
-                             QDialog, QListWidget, QPlainTextEdit)
+                             QDialog, QListWidget, QListWidgetItem, QPlainTextEdit)
                              
                              
 class DiffViewerDialog(QDialog):
@@ -30,6 +34,10 @@ class DiffViewerDialog(QDialog):
         self.right_content = ""
         self.left_name = ""
         self.right_name = ""
+        self.diff_thread = None
+        self.folder_thread = None
+        self.rows = DiffRows()
+        self.folder_counts = {}
         
         self.setup_ui()
     
@@ -74,10 +82,24 @@ class DiffViewerDialog(QDialog):
         compare_layout = QVBoxLayout(compare_widget)
         compare_layout.setContentsMargins(0, 0, 0, 0)
         
+        compare_row = QHBoxLayout()
         compare_btn = QPushButton("Comparar")
         compare_btn.clicked.connect(self.compare_files)
         compare_btn.setStyleSheet("background-color: #0e639c; padding: 8px; font-weight: bold;")
-        compare_layout.addWidget(compare_btn)
+        compare_row.addWidget(compare_btn, 1)
+        
+        folder_btn = QPushButton("Comparar Pastas...")
+        folder_btn.clicked.connect(self.select_folders)
+        compare_row.addWidget(folder_btn)
+        
+        # Algoritmo do diff: histogram segue melhor a estrutura do código,
+        # myers gera o menor diff
+        compare_row.addWidget(QLabel("Algoritmo:"))
+        self.algorithm_combo = QComboBox()
+        self.algorithm_combo.addItems([name.capitalize() for name in ALGORITHMS])
+        self.algorithm_combo.currentIndexChanged.connect(self.on_algorithm_changed)
+        compare_row.addWidget(self.algorithm_combo)
+        compare_layout.addLayout(compare_row)
         layout.addWidget(compare_widget)
         
         # ===== Estatísticas (compacta) =====
@@ -99,13 +121,11 @@ class DiffViewerDialog(QDialog):
         self.left_title.setStyleSheet("background-color: #2d2d2d; padding: 8px; font-weight: bold; font-size: 13px;")
         self.left_title.setMaximumHeight(32)
         
-        self.left_editor = QTextEdit()
-        self.left_editor.setReadOnly(True)
-        self.left_editor.setFont(QFont("Consolas", 10))
-        self.left_editor.setStyleSheet("background-color: #1e1e1e;")
+        # Só as linhas visíveis são desenhadas, qualquer que seja o tamanho do diff
+        self.left_view = DiffPane('left')
         
         left_layout.addWidget(self.left_title)
-        left_layout.addWidget(self.left_editor)  # Vai ocupar todo espaço restante
+        left_layout.addWidget(self.left_view)  # Vai ocupar todo espaço restante
         
         # Editor direito
         right_container = QWidget()
@@ -117,20 +137,31 @@ class DiffViewerDialog(QDialog):
         self.right_title.setStyleSheet("background-color: #2d2d2d; padding: 8px; font-weight: bold; font-size: 13px;")
         self.right_title.setMaximumHeight(32)
         
-        self.right_editor = QTextEdit()
-        self.right_editor.setReadOnly(True)
-        self.right_editor.setFont(QFont("Consolas", 10))
-        self.right_editor.setStyleSheet("background-color: #1e1e1e;")
+        self.right_view = DiffPane('right')
         
         right_layout.addWidget(self.right_title)
-        right_layout.addWidget(self.right_editor)  # Vai ocupar todo espaço restante
+        right_layout.addWidget(self.right_view)  # Vai ocupar todo espaço restante
         
         diff_splitter.addWidget(left_container)
         diff_splitter.addWidget(right_container)
         diff_splitter.setSizes([600, 600])
         
+        # Lista de arquivos diferentes (só aparece ao comparar pastas)
+        self.folder_list = QListWidget()
+        self.folder_list.setSortingEnabled(True)
+        self.folder_list.currentItemChanged.connect(self.open_difference)
+        self.folder_list.hide()
+        
+        main_splitter = QSplitter(Qt.Orientation.Horizontal)
+        main_splitter.addWidget(self.folder_list)
+        main_splitter.addWidget(diff_splitter)
+        main_splitter.setSizes([300, 1200])
+        
         # ADICIONAR com stretch=100 para ocupar MÁXIMO espaço
-        layout.addWidget(diff_splitter, stretch=100)  # <-- IMPORTANTE
+        layout.addWidget(main_splitter, stretch=100)  # <-- IMPORTANTE
+        
+        # Sincronizar scroll (uma vez só; as duas colunas têm as mesmas linhas)
+        self.sync_scrollbars()
         
         # ===== Botão fechar (compacto) =====
         close_btn = QPushButton("Fechar")
@@ -177,6 +208,90 @@ class DiffViewerDialog(QDialog):
         # Comparar automaticamente
         self.compare_files()
     
+    def select_folders(self):
+        left_root = QFileDialog.getExistingDirectory(self, "Selecionar Pasta Original")
+        if not left_root:
+            return
+        right_root = QFileDialog.getExistingDirectory(self, "Selecionar Pasta Modificada")
+        if right_root:
+            self.compare_folders(left_root, right_root)
+    
+    def compare_folders(self, left_root, right_root):
+        """Listar os arquivos adicionados, removidos e alterados entre duas pastas"""
+        self.cancel_folder_compare()
+        self.cancel_diff()
+        self.left_file_label.setText(f"Pasta: {left_root}")
+        self.right_file_label.setText(f"Pasta: {right_root}")
+        self.left_content = self.right_content = ""
+        self.rows = DiffRows()
+        self.left_view.set_diff(self.rows, [])
+        self.right_view.set_diff(self.rows, [])
+        self.folder_list.clear()
+        self.folder_list.show()
+        self.folder_counts = {'added': 0, 'removed': 0, 'changed': 0}
+        self.stats_label.setText("Comparando pastas...")
+        
+        thread = FolderCompareThread(left_root, right_root)
+        thread.differences_found.connect(functools.partial(self._on_differences_found, thread))
+        thread.compare_finished.connect(functools.partial(self._on_folder_compare_finished, thread))
+        self.folder_thread = thread
+        thread.start()
+    
+    def show_folder_stats(self, suffix=""):
+        counts = self.folder_counts
+        self.stats_label.setText(
+            f"Adicionados: <span style='color: #4caf50;'>{counts['added']}</span> | "
+            f"Removidos: <span style='color: #f44336;'>{counts['removed']}</span> | "
+            f"Alterados: <span style='color: #e2c08d;'>{counts['changed']}</span>{suffix}"
+        )
+    
+    def _on_differences_found(self, thread, differences):
+        if thread is not self.folder_thread:
+            return
+        symbols = {'added': ('+', "#4caf50"), 'removed': ('-', "#f44336"), 'changed': ('~', "#e2c08d")}
+        for difference in differences:
+            symbol, color = symbols[difference.status]
+            item = QListWidgetItem(f"{symbol} {difference.relative}")
+            item.setForeground(QColor(color))
+            item.setData(Qt.ItemDataRole.UserRole, difference)
+            self.folder_list.addItem(item)
+            self.folder_counts[difference.status] += 1
+        self.show_folder_stats(" | Comparando...")
+    
+    def _on_folder_compare_finished(self, thread, files, differences, elapsed):
+        if thread is not self.folder_thread:
+            return
+        thread.wait()
+        self.folder_thread = None
+        self.show_folder_stats(f" | {files} arquivos, {thread.files_read} lidos | {elapsed * 1000:.0f} ms")
+    
+    def open_difference(self, item, previous=None):
+        """Mostrar o diff de um arquivo da lista (calculado só quando é aberto)"""
+        if item is None:
+            return
+        difference = item.data(Qt.ItemDataRole.UserRole)
+        left = read_file_text(difference.left) if difference.left else ""
+        right = read_file_text(difference.right) if difference.right else ""
+        if left is None or right is None:
+            self.cancel_diff()
+            self.rows = DiffRows()
+            self.left_view.set_diff(self.rows, [])
+            self.right_view.set_diff(self.rows, [])
+            self.stats_label.setText(f"{difference.relative}: arquivo binário ou ilegível")
+            return
+        self.left_content, self.right_content = left, right
+        self.left_name = self.right_name = difference.relative
+        self.left_title.setText(f"Original: {difference.relative}")
+        self.right_title.setText(f"Modificado: {difference.relative}")
+        self.start_diff()
+    
+    def algorithm(self):
+        return ALGORITHMS[self.algorithm_combo.currentIndex()]
+    
+    def on_algorithm_changed(self):
+        if self.left_content or self.right_content:
+            self.start_diff()
+    
     def compare_files(self):
         if not self.left_content or not self.right_content:
             QMessageBox.warning(self, "Aviso", "Selecione ambos os arquivos para comparar")
@@ -186,74 +301,76 @@ class DiffViewerDialog(QDialog):
         self.left_title.setText(f"Original: {self.left_name}")
         self.right_title.setText(f"Modificado: {self.right_name}")
         
-        # Calcular diferenças
+        self.start_diff()
+    
+    def start_diff(self):
+        # O diff roda numa thread: a janela não trava, e as primeiras
+        # diferenças aparecem antes de o cálculo terminar
+        self.cancel_diff()
         left_lines = self.left_content.splitlines()
         right_lines = self.right_content.splitlines()
         
-        differ = difflib.Differ()
-        diff = list(differ.compare(left_lines, right_lines))
-        
-        # Contar alterações
-        additions = sum(1 for line in diff if line.startswith('+ '))
-        deletions = sum(1 for line in diff if line.startswith('- '))
-        
+        # As duas colunas compartilham o mesmo modelo de linhas alinhadas
+        self.rows = DiffRows()
+        self.left_view.set_diff(self.rows, left_lines, right_lines)
+        self.right_view.set_diff(self.rows, right_lines, left_lines)
+        self.stats_label.setText("Comparando...")
+        
+        thread = DiffWorker(left_lines, right_lines, self.algorithm())
+        thread.hunks_ready.connect(functools.partial(self._on_hunks_ready, thread))
+        thread.diff_finished.connect(functools.partial(self._on_diff_finished, thread))
+        self.diff_thread = thread
+        thread.start()
+    
+    def show_stats(self, additions, deletions, suffix=""):
         self.stats_label.setText(
             f"Adições: <span style='color: #4caf50;'>{additions}</span> | "
-            f"Remoções: <span style='color: #f44336;'>{deletions}</span>"
+            f"Remoções: <span style='color: #f44336;'>{deletions}</span>{suffix}"
         )
-        
-        # Renderizar diff com cores
-        self.render_diff(left_lines, right_lines, diff)
     
-    def render_diff(self, left_lines, right_lines, diff):
-        left_html = []
-        right_html = []
-        
-        left_idx = 0
-        right_idx = 0
-        
-        for line in diff:
-            if line.startswith('  '):  # Linha igual
-                content = line[2:]
-                left_html.append(f"<div style='padding: 2px;'>{self.escape_html(content)}</div>")
-                right_html.append(f"<div style='padding: 2px;'>{self.escape_html(content)}</div>")
-                left_idx += 1
-                right_idx += 1
-                
-            elif line.startswith('- '):  # Linha removida (só no original)
-                content = line[2:]
-                left_html.append(
-                    f"<div style='background-color: #4d1f1f; padding: 2px; border-left: 3px solid #f44336;'>"
-                    f"{self.escape_html(content)}</div>"
-                )
-                right_html.append("<div style='padding: 2px; background-color: #2d2d2d;'>&nbsp;</div>")
-                left_idx += 1
-                
-            elif line.startswith('+ '):  # Linha adicionada (só no modificado)
-                content = line[2:]
-                left_html.append("<div style='padding: 2px; background-color: #2d2d2d;'>&nbsp;</div>")
-                right_html.append(
-                    f"<div style='background-color: #1f4d1f; padding: 2px; border-left: 3px solid #4caf50;'>"
-                    f"{self.escape_html(content)}</div>"
-                )
-                right_idx += 1
-        
-        # Aplicar HTML aos editores
-        self.left_editor.setHtml(''.join(left_html))
-        self.right_editor.setHtml(''.join(right_html))
-        
-        # Sincronizar scroll
-        self.sync_scrollbars()
+    def _on_hunks_ready(self, thread, hunks, additions, deletions):
+        if thread is not self.diff_thread:
+            return
+        self.rows.extend(hunks)
+        self.left_view.rows_changed()
+        self.right_view.rows_changed()
+        self.show_stats(additions, deletions, " | Comparando...")
+    
+    def _on_diff_finished(self, thread, additions, deletions, elapsed):
+        if thread is not self.diff_thread:
+            return
+        thread.wait()
+        self.diff_thread = None
+        self.show_stats(additions, deletions, f" | {elapsed * 1000:.0f} ms")
+    
+    def cancel_diff(self):
+        """Interromper um diff ainda em andamento"""
+        thread = self.diff_thread
+        self.diff_thread = None
+        if thread is not None:
+            thread.requestInterruption()
+            thread.wait()
+    
+    def cancel_folder_compare(self):
+        thread = self.folder_thread
+        self.folder_thread = None
+        if thread is not None:
+            thread.requestInterruption()
+            thread.wait()
+    
+    def closeEvent(self, event):
+        self.cancel_folder_compare()
+        self.cancel_diff()
+        super().closeEvent(event)
+    
+    def reject(self):
+        self.cancel_folder_compare()
+        self.cancel_diff()
+        super().reject()
     
     def sync_scrollbars(self):
-        left_scroll = self.left_editor.verticalScrollBar()
-        right_scroll = self.right_editor.verticalScrollBar()
+        left_scroll = self.left_view.verticalScrollBar()
+        right_scroll = self.right_view.verticalScrollBar()
         
         left_scroll.valueChanged.connect(right_scroll.setValue)
         right_scroll.valueChanged.connect(left_scroll.setValue)
-    
-    def escape_html(self, text):
-        return (text.replace('&', '&amp;')
-                   .replace('<', '&lt;')
-                   .replace('>', '&gt;')
-                   .replace(' ', '&nbsp;'))
\ No newline at end of file
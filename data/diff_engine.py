@@ -0,0 +1,421 @@
+"""Line diff algorithms for comparing files.
+
+Lines are replaced by integer IDs first, so the algorithms compare ints
+instead of strings. Every algorithm produces matching blocks, turned
+into DiffHunks like difflib's opcodes.
+"""
+import functools
+import itertools
+import re
+import time
+from bisect import bisect_left
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+
+ALGORITHMS = ('histogram', 'patience', 'myers')
+
+# Lines occurring more often than this in a region are not used as
+# anchors by the histogram algorithm (e.g. blank lines, 'end')
+MAX_CHAIN = 64
+
+# Edit distance after which Myers stops looking for the middle snake and
+# splits at the furthest point reached (like xdiff's heuristic): the diff
+# may then be a little longer than the shortest one, but unrelated texts
+# no longer take quadratic time
+MYERS_MAX_COST = 256
+
+# Words, runs of whitespace and single punctuation marks
+_TOKEN = re.compile(r'\w+|\s+|[^\w\s]')
+INTRALINE_CACHE_SIZE = 4096
+# Longer lines are not compared word by word
+MAX_INTRALINE_LENGTH = 10000
+# Line pairs sharing less than this fraction of their characters get no
+# intraline marks: marking almost everything would only add noise
+MIN_INTRALINE_SIMILARITY = 0.4
+
+
+class DiffHunk:
+    """A run of lines that is equal, replaced, deleted or inserted.
+
+    Uses the same tags and ranges as difflib.SequenceMatcher opcodes:
+    a[a_start:a_end] became b[b_start:b_end].
+    """
+
+    __slots__ = ('tag', 'a_start', 'a_end', 'b_start', 'b_end')
+
+    def __init__(self, tag, a_start, a_end, b_start, b_end):
+        self.tag = tag
+        self.a_start = a_start
+        self.a_end = a_end
+        self.b_start = b_start
+        self.b_end = b_end
+
+    def __repr__(self):
+        return f"DiffHunk({self.tag!r}, {self.a_start}, {self.a_end}, {self.b_start}, {self.b_end})"
+
+    def __eq__(self, other):
+        return isinstance(other, DiffHunk) and (
+            (self.tag, self.a_start, self.a_end, self.b_start, self.b_end)
+            == (other.tag, other.a_start, other.a_end, other.b_start, other.b_end))
+
+
+def line_ids(a_lines, b_lines):
+    """Both sequences with every distinct line replaced by an int."""
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in a_lines]
+    b = [ids.setdefault(line, len(ids)) for line in b_lines]
+    return a, b
+
+
+def _trim(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Lengths of the common prefix and suffix of a region."""
+    limit = min(a_hi - a_lo, b_hi - b_lo)
+    prefix = 0
+    while prefix < limit and a[a_lo + prefix] == b[b_lo + prefix]:
+        prefix += 1
+    limit -= prefix
+    suffix = 0
+    while suffix < limit and a[a_hi - 1 - suffix] == b[b_hi - 1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def _middle_snake(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Myers' middle snake of a region whose ends differ.
+
+    Runs the forward and backward searches until they overlap, keeping
+    only one diagonal array each: linear space. Returns the snake as
+    (x, y, u, v), relative to the region.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    delta = n - m
+    odd = delta & 1
+    max_d = min((n + m + 1) // 2, MYERS_MAX_COST)
+    offset = max_d + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x = x
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= k - delta <= d - 1 and x + backward[offset + delta - k] >= n:
+                return start_x, start_x - k, x, y
+
+        for k in range(-d, d + 1, 2):
+            # Backward coordinates run from the end of the region
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x = x
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return n - x, m - y, n - start_x, m - (start_x - k)
+
+    # Too expensive: split where the forward search got furthest
+    best_x = best_y = 0
+    for k in range(-max_d, max_d + 1, 2):
+        x = forward[offset + k]
+        y = x - k
+        if x <= n and 0 <= y <= m and x + y > best_x + best_y:
+            best_x, best_y = x, y
+    return best_x, best_y, best_x, best_y
+
+
+def _myers(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Split a region at its middle snake (Myers, linear space)."""
+    x, y, u, v = _middle_snake(a, b, a_lo, a_hi, b_lo, b_hi)
+    parts = [(a_lo, a_lo + x, b_lo, b_lo + y, _myers)]
+    if u > x:
+        parts.append((a_lo + x, b_lo + y, u - x))
+    parts.append((a_lo + u, a_hi, b_lo + v, b_hi, _myers))
+    return parts
+
+
+def _has_common_line(a, b, a_lo, a_hi, b_lo, b_hi):
+    lines = set(a[a_lo:a_hi])
+    return any(line in lines for line in b[b_lo:b_hi])
+
+
+def _fallback(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Myers for a region without anchors; nothing if no line is shared."""
+    if _has_common_line(a, b, a_lo, a_hi, b_lo, b_hi):
+        return _myers(a, b, a_lo, a_hi, b_lo, b_hi)
+    return []
+
+
+def _histogram(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Histogram diff (as in git): split a region at its rarest common run.
+
+    Lines that are rare in the old text make good anchors, so the result
+    follows the code's structure instead of aligning braces and blank
+    lines. Regions without a usable anchor fall back to Myers.
+    """
+    occurrences = {}
+    for i in range(a_lo, a_hi):
+        occurrences.setdefault(a[i], []).append(i)
+
+    best_count = MAX_CHAIN + 1
+    best_length = 0
+    best = None
+    j = b_lo
+    while j < b_hi:
+        positions = occurrences.get(b[j])
+        next_j = j + 1
+        if positions is None or len(positions) > best_count:
+            j = next_j
+            continue
+        for i in positions:
+            # Grow the run both ways; its count is that of its rarest line
+            count = len(positions)
+            start_i, start_j = i, j
+            while start_i > a_lo and start_j > b_lo and a[start_i - 1] == b[start_j - 1]:
+                start_i -= 1
+                start_j -= 1
+                count = min(count, len(occurrences[a[start_i]]))
+            end_i, end_j = i + 1, j + 1
+            while end_i < a_hi and end_j < b_hi and a[end_i] == b[end_j]:
+                count = min(count, len(occurrences[a[end_i]]))
+                end_i += 1
+                end_j += 1
+            next_j = max(next_j, end_j)
+            if end_i - start_i > best_length or count < best_count:
+                best = (start_i, start_j, end_i - start_i)
+                best_length = end_i - start_i
+                best_count = count
+        j = next_j
+
+    if best is None:
+        return _fallback(a, b, a_lo, a_hi, b_lo, b_hi)
+    i, j, length = best
+    return [(a_lo, i, b_lo, j, _histogram), best, (i + length, a_hi, j + length, b_hi, _histogram)]
+
+
+def _unique_common(a, b, a_lo, a_hi, b_lo, b_hi):
+    """(a index, b index) of the lines found exactly once in each side."""
+    counts = {}
+    for i in range(a_lo, a_hi):
+        entry = counts.get(a[i])
+        counts[a[i]] = [i, -1] if entry is None else [-1, -1]
+    for j in range(b_lo, b_hi):
+        entry = counts.get(b[j])
+        if entry is not None and entry[0] >= 0:
+            # -2 marks a second occurrence in b
+            entry[1] = j if entry[1] == -1 else -2
+    return sorted((i, j) for i, j in counts.values() if i >= 0 and j >= 0)
+
+
+def _longest_increasing(pairs):
+    """Longest run of pairs whose b indexes increase (patience sorting)."""
+    tops = []      # b index on top of each pile
+    top_pair = []  # index into pairs of each top
+    previous = [-1] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pile = bisect_left(tops, j)
+        if pile == len(tops):
+            tops.append(j)
+            top_pair.append(k)
+        else:
+            tops[pile] = j
+            top_pair[pile] = k
+        previous[k] = top_pair[pile - 1] if pile else -1
+    result = []
+    k = top_pair[-1] if top_pair else -1
+    while k >= 0:
+        result.append(pairs[k])
+        k = previous[k]
+    result.reverse()
+    return result
+
+
+def _patience(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Patience diff: split a region at the lines unique on both sides."""
+    anchors = _longest_increasing(_unique_common(a, b, a_lo, a_hi, b_lo, b_hi))
+    if not anchors:
+        return _fallback(a, b, a_lo, a_hi, b_lo, b_hi)
+    # Regions between anchors; trimming them grows each anchor's run
+    parts = []
+    i, j = a_lo, b_lo
+    for anchor_i, anchor_j in anchors:
+        parts.append((i, anchor_i, j, anchor_j, _patience))
+        parts.append((anchor_i, anchor_j, 1))
+        i, j = anchor_i + 1, anchor_j + 1
+    parts.append((i, a_hi, j, b_hi, _patience))
+    return parts
+
+
+_ALGORITHM_FUNCTIONS = {'histogram': _histogram, 'patience': _patience, 'myers': _myers}
+
+
+def iter_matching_blocks(a, b, algorithm='histogram', should_stop=None):
+    """Yield the (i, j, length) runs of equal items of two sequences, in order.
+
+    Regions are split depth-first from the left, so the first blocks come
+    out long before the whole diff is known. Stops early (without
+    finishing) once `should_stop()` returns True.
+    """
+    try:
+        split = _ALGORITHM_FUNCTIONS[algorithm]
+    except KeyError:
+        raise ValueError(f"unknown diff algorithm: {algorithm}") from None
+    # Items are regions still to split (a_lo, a_hi, b_lo, b_hi, split)
+    # and blocks already found (i, j, length)
+    stack = [(0, len(a), 0, len(b), split)]
+    pending = None  # last block, held back to merge it with the next one
+    while stack:
+        item = stack.pop()
+        if len(item) == 5:
+            if should_stop is not None and should_stop():
+                return
+            a_lo, a_hi, b_lo, b_hi, split = item
+            prefix, suffix = _trim(a, b, a_lo, a_hi, b_lo, b_hi)
+            if suffix:
+                stack.append((a_hi - suffix, b_hi - suffix, suffix))
+            a_lo, b_lo = a_lo + prefix, b_lo + prefix
+            a_hi, b_hi = a_hi - suffix, b_hi - suffix
+            if a_lo < a_hi and b_lo < b_hi:
+                stack.extend(reversed(split(a, b, a_lo, a_hi, b_lo, b_hi)))
+            if not prefix:
+                continue
+            item = (a_lo - prefix, b_lo - prefix, prefix)
+
+        i, j, length = item
+        if pending is not None and pending[0] + pending[2] == i and pending[1] + pending[2] == j:
+            pending = (pending[0], pending[1], pending[2] + length)
+            continue
+        if pending is not None:
+            yield pending
+        pending = item
+    if pending is not None:
+        yield pending
+
+
+def matching_blocks(a, b, algorithm='histogram'):
+    """Merged (i, j, length) runs of equal items of two sequences."""
+    return list(iter_matching_blocks(a, b, algorithm))
+
+
+def iter_hunks(a_lines, b_lines, algorithm='histogram', should_stop=None):
+    """Yield the DiffHunks turning a_lines into b_lines, in order.
+
+    Equal runs are included. `algorithm` is one of ALGORITHMS; histogram
+    gives the most readable diffs of code, myers the smallest ones.
+    """
+    a, b = line_ids(a_lines, b_lines)
+    i = j = 0
+    blocks = iter_matching_blocks(a, b, algorithm, should_stop)
+    for block_i, block_j, length in itertools.chain(blocks, [(len(a), len(b), 0)]):
+        if should_stop is not None and should_stop():
+            return
+        if i < block_i and j < block_j:
+            yield DiffHunk('replace', i, block_i, j, block_j)
+        elif i < block_i:
+            yield DiffHunk('delete', i, block_i, j, block_j)
+        elif j < block_j:
+            yield DiffHunk('insert', i, block_i, j, block_j)
+        if length:
+            yield DiffHunk('equal', block_i, block_i + length, block_j, block_j + length)
+        i, j = block_i + length, block_j + length
+
+
+def diff_lines(a_lines, b_lines, algorithm='histogram'):
+    """List of the DiffHunks turning a_lines into b_lines (see iter_hunks)."""
+    return list(iter_hunks(a_lines, b_lines, algorithm))
+
+
+def diff_stats(hunks):
+    """(lines added, lines removed) of a diff."""
+    added = removed = 0
+    for hunk in hunks:
+        if hunk.tag != 'equal':
+            added += hunk.b_end - hunk.b_start
+            removed += hunk.a_end - hunk.a_start
+    return added, removed
+
+
+def _changed_spans(tokens, kept):
+    """(start, end) character spans of the tokens outside the (index, length) runs."""
+    offsets = list(itertools.accumulate(map(len, tokens), initial=0))
+    spans = []
+    position = 0
+    for start, length in itertools.chain(kept, [(len(tokens), 0)]):
+        if start > position:
+            spans.append((offsets[position], offsets[start]))
+        position = start + length
+    return tuple(spans)
+
+
+@functools.lru_cache(maxsize=INTRALINE_CACHE_SIZE)
+def intraline_changes(a_line, b_line):
+    """Changed character spans of two versions of a line, as (a_spans, b_spans).
+
+    Lines are compared word by word. Results are memoized, so repainting
+    the same pair costs a dict lookup.
+    """
+    if max(len(a_line), len(b_line)) > MAX_INTRALINE_LENGTH:
+        return (), ()
+    a = _TOKEN.findall(a_line)
+    b = _TOKEN.findall(b_line)
+    # Matching bare whitespace between two changes only scatters the marks
+    blocks = [(i, j, length) for i, j, length in matching_blocks(a, b, 'myers')
+              if not ''.join(a[i:i + length]).isspace()]
+    same = sum(len(token) for i, _, length in blocks for token in a[i:i + length])
+    if 2 * same < MIN_INTRALINE_SIMILARITY * (len(a_line) + len(b_line)):
+        return (), ()
+    return (_changed_spans(a, [(i, length) for i, _, length in blocks]),
+            _changed_spans(b, [(j, length) for _, j, length in blocks]))
+
+
+class DiffWorker(QThread):
+    """Computes a diff outside the UI thread, sending hunks as they are found.
+
+    Hunks arrive in order, in batches (the first one at once, then at
+    most every BATCH_INTERVAL seconds), with the running totals of added
+    and removed lines. Call requestInterruption() to cancel.
+    """
+
+    hunks_ready = pyqtSignal(object, int, int)  # new hunks, lines added, lines removed
+    diff_finished = pyqtSignal(int, int, float)  # lines added, lines removed, seconds
+
+    BATCH_INTERVAL = 0.05
+
+    def __init__(self, a_lines, b_lines, algorithm='histogram'):
+        super().__init__()
+        self.a_lines = a_lines
+        self.b_lines = b_lines
+        self.algorithm = algorithm
+
+    def run(self):
+        start_time = time.perf_counter()
+        added = removed = 0
+        batch = []
+        last_emit = 0.0
+        for hunk in iter_hunks(self.a_lines, self.b_lines, self.algorithm, self.isInterruptionRequested):
+            batch.append(hunk)
+            if hunk.tag != 'equal':
+                added += hunk.b_end - hunk.b_start
+                removed += hunk.a_end - hunk.a_start
+            now = time.perf_counter()
+            if not last_emit or now - last_emit >= self.BATCH_INTERVAL:
+                self.hunks_ready.emit(batch, added, removed)
+                batch = []
+                last_emit = now
+        if self.isInterruptionRequested():
+            return
+        if batch:
+            self.hunks_ready.emit(batch, added, removed)
+        self.diff_finished.emit(added, removed, time.perf_counter() - start_time)
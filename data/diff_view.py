@@ -0,0 +1,189 @@
+from array import array
+from bisect import bisect_right
+
+from PyQt6.QtGui import QFont, QPainter, QColor
+from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtWidgets import QAbstractScrollArea
+
+from .diff_engine import intraline_changes
+
+
+class DiffRows:
+    """Aligned rows of a side-by-side diff.
+
+    Each hunk takes as many rows as its longer side; the shorter side is
+    padded with filler rows. Only the hunks and the first row of each are
+    stored, so memory grows with the number of changes, not of lines.
+    """
+
+    def __init__(self, hunks=()):
+        self.hunks = []
+        self._row_starts = array('q')
+        self.row_count = 0
+        self.extend(hunks)
+
+    def extend(self, hunks):
+        for hunk in hunks:
+            self.hunks.append(hunk)
+            self._row_starts.append(self.row_count)
+            self.row_count += max(hunk.a_end - hunk.a_start, hunk.b_end - hunk.b_start)
+
+    def __len__(self):
+        return self.row_count
+
+    def rows(self, first, count):
+        """(tag, left line, right line) of `count` rows from `first`.
+
+        A line is None on the side of a filler row.
+        """
+        k = bisect_right(self._row_starts, first) - 1
+        row = first
+        end = min(first + count, self.row_count)
+        while row < end and k < len(self.hunks):
+            hunk = self.hunks[k]
+            offset = row - self._row_starts[k]
+            left = hunk.a_start + offset
+            right = hunk.b_start + offset
+            yield (hunk.tag,
+                   left if left < hunk.a_end else None,
+                   right if right < hunk.b_end else None)
+            row += 1
+            if row >= self._row_starts[k] + max(hunk.a_end - hunk.a_start, hunk.b_end - hunk.b_start):
+                k += 1
+
+
+class DiffPane(QAbstractScrollArea):
+    """One side of a side-by-side diff, painting only the rows on screen.
+
+    Backgrounds of removed/added lines and filler rows are drawn
+    directly, so a diff of any size costs the same to open and scroll.
+    """
+
+    TAB_WIDTH = 4
+
+    BACKGROUND = QColor("#1e1e1e")
+    FILLER = QColor("#2d2d2d")
+    # Per side: background and left border of changed lines
+    CHANGED = {
+        'left': (QColor("#4d1f1f"), QColor("#f44336")),
+        'right': (QColor("#1f4d1f"), QColor("#4caf50")),
+    }
+    # Per side: background of the changed words inside a changed line
+    INTRALINE = {
+        'left': QColor("#8c2f2f"),
+        'right': QColor("#2f7a2f"),
+    }
+
+    def __init__(self, side, parent=None):
+        super().__init__(parent)
+        self.side = side
+        self.rows = DiffRows()
+        self.lines = []
+        self.other_lines = []
+        self._max_width = 0
+        self.setFont(QFont("Consolas", 10))
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.verticalScrollBar().setSingleStep(1)
+
+    def set_diff(self, rows, lines, other_lines=()):
+        """Show the lines of this side aligned on `rows`.
+
+        With the lines of the other side, changed words of replaced lines
+        are marked as well (computed only for the rows painted).
+        """
+        self.rows = rows
+        self.lines = lines
+        self.other_lines = other_lines
+        self._max_width = max(map(len, lines), default=0) * self._char_width()
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def rows_changed(self):
+        """Call after rows were appended to the model."""
+        self._update_scrollbars()
+        self.viewport().update()
+
+    # ---- layout -------------------------------------------------------
+
+    def _line_height(self):
+        return self.fontMetrics().lineSpacing() + 2
+
+    def _char_width(self):
+        return max(self.fontMetrics().horizontalAdvance('M'), 1)
+
+    def _visible_rows(self):
+        return max(self.viewport().height() // self._line_height(), 1)
+
+    def _gutter_width(self):
+        digits = len(str(max(len(self.lines), 1)))
+        return (digits + 2) * self._char_width()
+
+    def _update_scrollbars(self):
+        vbar = self.verticalScrollBar()
+        vbar.setPageStep(self._visible_rows())
+        vbar.setRange(0, max(len(self.rows) - self._visible_rows(), 0))
+        hbar = self.horizontalScrollBar()
+        hbar.setPageStep(self.viewport().width())
+        hbar.setRange(0, max(self._max_width - self.viewport().width() + self._gutter_width(), 0))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    # ---- painting -----------------------------------------------------
+
+    def visible_rows(self):
+        """(tag, left line, right line) of the rows on screen."""
+        return self.rows.rows(self.verticalScrollBar().value(), self._visible_rows() + 1)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        width = self.viewport().width()
+        painter.fillRect(event.rect(), self.BACKGROUND)
+        metrics = self.fontMetrics()
+        line_height = self._line_height()
+        gutter = self._gutter_width()
+        x_offset = gutter + 4 - self.horizontalScrollBar().value()
+        changed_color, border_color = self.CHANGED[self.side]
+        intraline_color = self.INTRALINE[self.side]
+        text_color = QColor("#d4d4d4")
+        number_color = QColor("#858585")
+        left_side = self.side == 'left'
+        painter.fillRect(0, 0, gutter, self.viewport().height(), QColor("#252526"))
+
+        for row, (tag, left, right) in enumerate(self.visible_rows()):
+            line = left if left_side else right
+            y = row * line_height
+            if line is None:
+                painter.fillRect(gutter, y, width - gutter, line_height, self.FILLER)
+                continue
+            if tag != 'equal':
+                painter.fillRect(gutter, y, width - gutter, line_height, changed_color)
+                painter.fillRect(gutter, y, 3, line_height, border_color)
+
+            shown = self.lines[line].expandtabs(self.TAB_WIDTH)
+            self._max_width = max(self._max_width, len(shown) * self._char_width())
+            painter.setClipRect(QRect(gutter + 3, y, width, line_height))
+            if tag == 'replace' and left is not None and right is not None and self.other_lines:
+                other = self.other_lines[right if left_side else left].expandtabs(self.TAB_WIDTH)
+                if left_side:
+                    spans = intraline_changes(shown, other)[0]
+                else:
+                    spans = intraline_changes(other, shown)[1]
+                for start, end in spans:
+                    painter.fillRect(x_offset + metrics.horizontalAdvance(shown[:start]), y,
+                                     metrics.horizontalAdvance(shown[start:end]), line_height,
+                                     intraline_color)
+            painter.setPen(text_color)
+            painter.drawText(x_offset, y + 1 + metrics.ascent(), shown)
+            painter.setClipping(False)
+
+            painter.setPen(number_color)
+            painter.drawText(0, y, gutter - self._char_width(), line_height,
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                             str(line + 1))
@@ -0,0 +1,113 @@
+import codecs
+import os
+import threading
+
+
+SAMPLE_SIZE = 64 * 1024
+
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def _chardet_detect(sample):
+    # chardet is slow to import, so it is only loaded when really needed
+    import chardet
+
+    result = chardet.detect(sample)
+    detected_encoding = result['encoding']
+    confidence = result['confidence'] or 0.0
+
+    # Normalize encoding names
+    if detected_encoding:
+        detected_encoding = detected_encoding.lower()
+        if 'iso-8859' in detected_encoding or 'latin' in detected_encoding:
+            detected_encoding = 'latin-1'  # ANSI
+        elif 'utf-8' in detected_encoding:
+            detected_encoding = 'utf-8'
+        elif 'windows-1252' in detected_encoding or 'cp1252' in detected_encoding:
+            detected_encoding = 'cp1252'  # ANSI Windows
+        elif 'ascii' in detected_encoding:
+            detected_encoding = 'utf-8'  # ASCII is compatible with UTF-8
+
+    # The sample is known not to be UTF-8 here, so an unsure guess falls
+    # back to ANSI Windows instead
+    if not detected_encoding or detected_encoding == 'utf-8' or confidence < 0.7:
+        detected_encoding = 'cp1252'
+
+    return detected_encoding, confidence
+
+
+def detect_bytes(sample, complete=False):
+    """Detect the encoding of raw bytes: BOM, then strict UTF-8, then chardet.
+
+    `complete` tells whether the sample is the whole file, so a multi-byte
+    character cut at the end of a partial sample is not an error.
+    """
+    if not sample:
+        return 'utf-8', 1.0
+
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, 1.0
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+        return 'utf-8', 1.0
+    except UnicodeDecodeError:
+        pass
+
+    return _chardet_detect(sample)
+
+
+class EncodingDetector:
+    """Caches detected encodings by (path, size, mtime)."""
+
+    def __init__(self, sample_size=SAMPLE_SIZE, max_entries=1024):
+        self.sample_size = sample_size
+        self.max_entries = max_entries
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def detect(self, file_path, sample=None):
+        """Encoding and confidence of a file.
+
+        Pass `sample` (the first bytes of the file) when the caller has
+        already read them, so the file is not opened a second time.
+        """
+        try:
+            stat = os.stat(file_path)
+            key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached:
+                return cached
+
+            if sample is None:
+                with open(file_path, 'rb') as f:
+                    sample = f.read(self.sample_size)
+            # Callers may pass more than sample_size bytes; only what is
+            # decoded can tell whether the whole file was seen
+            sample = sample[:self.sample_size]
+            result = detect_bytes(sample, complete=len(sample) >= stat.st_size)
+
+            with self._lock:
+                if len(self._cache) >= self.max_entries:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = result
+            return result
+        except Exception as e:
+            print(f"Error detecting encoding: {e}")
+            return 'utf-8', 0.0
+
+
+encoding_detector = EncodingDetector()
+
+
+def detect_encoding(file_path, sample=None):
+    return encoding_detector.detect(file_path, sample)
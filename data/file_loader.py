@@ -0,0 +1,90 @@
+import codecs
+import os
+import threading
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .encoding_detector import SAMPLE_SIZE, detect_encoding
+
+
+class FileLoaderThread(QThread):
+    """Reads and decodes a file in chunks outside the UI thread.
+
+    Every chunk ends on a line boundary so the editor can append whole
+    blocks. At most `max_pending` chunks wait in the event queue; the
+    editor calls chunk_consumed() after inserting each one. Without an
+    explicit encoding, it is detected from the first bytes read, so the
+    file is only read once.
+    """
+
+    encoding_detected = pyqtSignal(str)
+    chunk_ready = pyqtSignal(str, int)  # text, percent loaded
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, file_path, encoding=None, chunk_size=256 * 1024, max_pending=4):
+        super().__init__()
+        self.file_path = file_path
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self._slots = threading.Semaphore(max_pending)
+
+    def chunk_consumed(self):
+        self._slots.release()
+
+    def cancel(self):
+        """Stop reading and wait for the thread to finish"""
+        self.requestInterruption()
+        self._slots.release()
+        self.wait()
+
+    def _wait_for_slot(self):
+        while not self._slots.acquire(timeout=0.05):
+            if self.isInterruptionRequested():
+                return False
+        return not self.isInterruptionRequested()
+
+    def run(self):
+        try:
+            total = max(os.path.getsize(self.file_path), 1)
+            read = 0
+            pending = ''
+            with open(self.file_path, 'rb') as f:
+                data = f.read(max(self.chunk_size, SAMPLE_SIZE))
+                if not self.encoding:
+                    self.encoding, _ = detect_encoding(self.file_path, sample=data)
+                try:
+                    decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+                except LookupError:
+                    # Fallback to UTF-8
+                    self.encoding = 'utf-8'
+                    decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+                self.encoding_detected.emit(self.encoding)
+
+                while not self.isInterruptionRequested():
+                    read += len(data)
+                    text = pending + decoder.decode(data, final=not data)
+                    if data and text.endswith('\r'):
+                        # The matching '\n' may start the next chunk
+                        text, pending = text[:-1], '\r'
+                    else:
+                        pending = ''
+                    text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+                    if data:
+                        cut = text.rfind('\n') + 1
+                        if cut == 0 and len(text) < 8 * self.chunk_size:
+                            pending = text + pending
+                            data = f.read(self.chunk_size)
+                            continue
+                        if cut:
+                            text, pending = text[:cut], text[cut:] + pending
+
+                    if text:
+                        if not self._wait_for_slot():
+                            return
+                        self.chunk_ready.emit(text, min(read * 100 // total, 100 if not data else 99))
+                    if not data:
+                        break
+                    data = f.read(self.chunk_size)
+        except Exception as e:
+            self.load_failed.emit(str(e))
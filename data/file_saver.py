@@ -0,0 +1,120 @@
+import codecs
+import functools
+import os
+import re
+import tempfile
+import time
+
+from PyQt6.QtCore import QThread
+
+
+_SURROGATE = re.compile('[\ud800-\udfff]')
+
+
+def write_temp_file(file_path, source):
+    """Write `source` (bytes or a callable taking a binary stream) to a
+    fsynced temp file in the same folder as file_path; returns its path."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.",
+                                     suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            if callable(source):
+                source(stream)
+            else:
+                stream.write(source)
+            stream.flush()
+            os.fsync(stream.fileno())
+        if os.path.exists(file_path):
+            try:
+                os.chmod(temp_path, os.stat(file_path).st_mode & 0o7777)
+            except OSError:
+                pass
+        return temp_path
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def replace_file(temp_path, file_path, keep_backup=True):
+    """Atomically swap temp_path in place of file_path.
+
+    The previous version is kept as file_path + '.bak' through a hard
+    link, so no data is copied.
+    """
+    if keep_backup and os.path.exists(file_path):
+        backup_path = file_path + ".bak"
+        try:
+            if os.path.lexists(backup_path):
+                os.remove(backup_path)
+            os.link(file_path, backup_path)
+        except OSError as backup_error:
+            # Não impedir o salvamento se o backup falhar, apenas informar no console
+            print(f"Falha ao criar backup .bak de '{file_path}': {backup_error}")
+    try:
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def atomic_write(file_path, source, keep_backup=True):
+    replace_file(write_temp_file(file_path, source), file_path, keep_backup)
+
+
+class FileSaverThread(QThread):
+    """Encodes and writes a document snapshot outside the UI thread.
+
+    `source` is either the text to save, as a string or a list of chunks
+    (encoded here with `encoding`), or a callable that streams bytes. With commit=False the temp file is
+    left in `temp_path` for the caller to swap in. Check `error` once the
+    thread has finished.
+    """
+
+    def __init__(self, file_path, source, encoding='utf-8', commit=True):
+        super().__init__()
+        self.file_path = file_path
+        self.source = source
+        self.encoding = encoding
+        self.commit = commit
+        self.temp_path = None
+        self.error = None
+        self.elapsed = 0.0
+
+    def _write_text(self, chunks, stream):
+        # Encoding chunk by chunk keeps each step short, so the UI thread
+        # gets the GIL back often while a big document is written
+        encoder = codecs.getincrementalencoder(self.encoding)(errors='replace')
+        carry = ''
+        for i, chunk in enumerate(chunks):
+            chunks[i] = None
+            chunk, carry = carry + chunk, ''
+            if chunk and '\ud800' <= chunk[-1] <= '\udbff':
+                # High surrogate whose pair starts the next chunk
+                chunk, carry = chunk[:-1], chunk[-1]
+            if _SURROGATE.search(chunk):
+                chunk = chunk.encode('utf-16', 'surrogatepass').decode('utf-16', 'replace')
+            # Same newline translation as writing in text mode
+            if os.linesep != '\n':
+                chunk = chunk.replace('\n', os.linesep)
+            stream.write(encoder.encode(chunk))
+        stream.write(encoder.encode(carry, final=True))
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            source = self.source
+            self.source = None
+            if isinstance(source, str):
+                source = [source]
+            if isinstance(source, list):
+                source = functools.partial(self._write_text, source)
+            self.temp_path = write_temp_file(self.file_path, source)
+            if self.commit:
+                replace_file(self.temp_path, self.file_path)
+                self.temp_path = None
+        except Exception as e:
+            self.error = str(e)
+        self.elapsed = time.perf_counter() - start
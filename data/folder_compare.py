@@ -0,0 +1,178 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .workspace import IGNORED_DIRS
+
+
+# Files of the same size are read in chunks of this size and compared
+# until the first difference
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileDifference:
+    __slots__ = ('status', 'relative', 'left', 'right')
+
+    def __init__(self, status, relative, left, right):
+        self.status = status      # 'added', 'removed' or 'changed'
+        self.relative = relative  # path relative to both folders
+        self.left = left          # full path, None for added files
+        self.right = right        # full path, None for removed files
+
+
+def scan_tree(root, ignored_dirs=IGNORED_DIRS, should_stop=None):
+    """{key: (relative path, size, mtime_ns)} of the files under `root`.
+
+    Keys are the normalized relative paths, so both trees of a comparison
+    line up even on case-insensitive file systems.
+    """
+    files = {}
+    stack = ['']
+    while stack:
+        if should_stop is not None and should_stop():
+            break
+        folder = stack.pop()
+        try:
+            entries = list(os.scandir(os.path.join(root, folder)))
+        except OSError:
+            continue
+        for entry in entries:
+            relative = os.path.join(folder, entry.name) if folder else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in ignored_dirs:
+                        stack.append(relative)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[os.path.normcase(relative)] = (relative, stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+    return files
+
+
+def same_contents(left, right):
+    """Whether two files of the same size hold the same bytes."""
+    try:
+        with open(left, 'rb') as a, open(right, 'rb') as b:
+            while True:
+                chunk = a.read(CHUNK_SIZE)
+                if chunk != b.read(CHUNK_SIZE):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+class FolderCompareThread(QThread):
+    """Compares two folder trees file by file.
+
+    Both trees are scanned at once. Files with the same size and
+    modification time are taken as unchanged and files of different
+    sizes as changed, without reading either; only the rest have their
+    contents compared, by a pool of workers. Differences are emitted in
+    batches (at most every BATCH_INTERVAL seconds).
+    """
+
+    differences_found = pyqtSignal(object)  # list of FileDifference
+    compare_finished = pyqtSignal(int, int, float)  # files, differences, seconds
+
+    BATCH_INTERVAL = 0.1
+    # Files compared per pool task; one task per file costs more than
+    # reading a small file
+    FILES_PER_TASK = 64
+
+    def __init__(self, left_root, right_root, workers=None):
+        super().__init__()
+        self.left_root = left_root
+        self.right_root = right_root
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 4)
+        self.files_read = 0
+
+    def run(self):
+        start_time = time.perf_counter()
+        self._batch = []
+        self._last_emit = 0.0
+        self._differences = 0
+        stopped = self.isInterruptionRequested
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            left, right = pool.map(lambda root: scan_tree(root, should_stop=stopped),
+                                   (self.left_root, self.right_root))
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        pending = set()
+        task = []
+        try:
+            for key in sorted(left.keys() | right.keys()):
+                if stopped():
+                    break
+                difference = self._quick_compare(left.get(key), right.get(key))
+                if difference is not None:
+                    self._add(difference)
+                elif key in left and key in right and left[key][2] != right[key][2]:
+                    self.files_read += 1
+                    task.append((left[key][0], right[key][0]))
+                    if len(task) < self.FILES_PER_TASK:
+                        continue
+                    pending.add(pool.submit(self._compare_contents, task))
+                    task = []
+                    if len(pending) >= self.workers * 4:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self._collect(done)
+            if task and not stopped():
+                pending.add(pool.submit(self._compare_contents, task))
+            while pending and not stopped():
+                done, pending = wait(pending, timeout=self.BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+                self._collect(done)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        self._flush()
+        self.compare_finished.emit(len(left.keys() | right.keys()), self._differences,
+                                   time.perf_counter() - start_time)
+
+    def _quick_compare(self, left, right):
+        """Difference found from the scanned sizes alone, None if unsure."""
+        if right is None:
+            return self._difference('removed', left[0])
+        if left is None:
+            return self._difference('added', right[0])
+        if left[1] != right[1]:
+            return self._difference('changed', left[0], right[0])
+        return None
+
+    def _difference(self, status, left_relative, right_relative=None):
+        left = None if status == 'added' else os.path.join(self.left_root, left_relative)
+        right = None if status == 'removed' else os.path.join(self.right_root, right_relative or left_relative)
+        return FileDifference(status, left_relative, left, right)
+
+    def _compare_contents(self, pairs):
+        """Runs in a pool worker; the changed files among (left, right) relative paths."""
+        differences = []
+        for left_relative, right_relative in pairs:
+            if self.isInterruptionRequested():
+                break
+            difference = self._difference('changed', left_relative, right_relative)
+            if not same_contents(difference.left, difference.right):
+                differences.append(difference)
+        return differences
+
+    def _collect(self, futures):
+        for future in futures:
+            for difference in future.result():
+                self._add(difference)
+
+    def _add(self, difference):
+        self._batch.append(difference)
+        self._differences += 1
+        now = time.perf_counter()
+        # The first differences go out at once; later ones are grouped
+        if not self._last_emit or now - self._last_emit >= self.BATCH_INTERVAL:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self._last_emit = time.perf_counter()
+            self.differences_found.emit(self._batch)
+            self._batch = []
@@ -0,0 +1,196 @@
+import codecs
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .file_saver import atomic_write
+from .folder_search import FolderSearchThread, detect_text_encoding, may_contain
+from .search_engine import replacement_template
+from .workspace import is_inside, matches_file_filter, path_key
+
+
+class FileReplacement:
+    """A file that a replace in files will change."""
+
+    __slots__ = ('path', 'count', 'encoding', 'mtime_ns', 'size', 'text', 'error')
+
+    def __init__(self, path, count, encoding=None, mtime_ns=None, size=None, text=None, error=None):
+        self.path = path
+        self.count = count
+        self.encoding = encoding
+        self.mtime_ns = mtime_ns  # state of the file when it was planned,
+        self.size = size          # so changes made since are not overwritten
+        self.text = text          # text of an open tab with unsaved changes
+        self.error = error        # why the file will not be changed
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        return f.read(), stat
+
+
+def _encode(text, encoding, original):
+    """Encode like the original contents, keeping the byte order of their BOM."""
+    if encoding in ('utf-16', 'utf-32'):
+        bom = original[:2 if encoding == 'utf-16' else 4]
+        little = bom in (codecs.BOM_UTF16_LE, codecs.BOM_UTF32_LE)
+        return bom + text.encode(f"{encoding}-{'le' if little else 'be'}")
+    return text.encode(encoding)
+
+
+def _subn(pattern, replacement, regex, text):
+    """pattern.subn over text, with line ends as the editor shows them.
+
+    In a CRLF file '$' would not match before the CR, so the pattern
+    runs on LF line ends and CRLF is put back afterwards (also on new
+    lines the replacement adds). Files mixing line ends are searched as
+    they are, so no byte outside the matches changes.
+    """
+    crlf = '\r\n' in text and text.count('\n') == text.count('\r\n')
+    if crlf:
+        text = text.replace('\r\n', '\n')
+    new_text, count = pattern.subn(replacement_template(replacement, regex), text)
+    if crlf and count:
+        new_text = new_text.replace('\n', '\r\n')
+    return new_text, count
+
+
+def plan_file(path, pattern, replacement, regex=False, prefilter=None):
+    """FileReplacement for a file on disk, None if nothing in it would change."""
+    try:
+        data, stat = _read(path)
+    except OSError:
+        return None
+    if not data or not may_contain(data, prefilter):
+        return None
+    encoding = detect_text_encoding(data, len(data))
+    if encoding is None:
+        return None
+    try:
+        # Strict: rewriting a file must not touch the bytes around the matches
+        text = data.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        _, count = _subn(pattern, replacement, regex, data.decode(encoding, errors='replace'))
+        return FileReplacement(path, count, encoding,
+                               error=f"not valid {encoding}") if count else None
+    _, count = _subn(pattern, replacement, regex, text)
+    if not count:
+        return None
+    return FileReplacement(path, count, encoding, stat.st_mtime_ns, stat.st_size)
+
+
+def preview_texts(planned, pattern, replacement, regex=False):
+    """Text of a planned file before and after the replacement."""
+    if planned.text is not None:
+        old_text = planned.text
+    else:
+        data, _ = _read(planned.path)
+        old_text = data.decode(planned.encoding)
+    new_text, count = _subn(pattern, replacement, regex, old_text)
+    return old_text, new_text if count else old_text
+
+
+def apply_file(planned, pattern, replacement, regex=False):
+    """Rewrite a planned file on disk; returns the number of replacements.
+
+    Raises OSError, or ValueError if the file changed since it was planned.
+    """
+    data, stat = _read(planned.path)
+    if (stat.st_mtime_ns, stat.st_size) != (planned.mtime_ns, planned.size):
+        raise ValueError("changed on disk since the preview")
+    new_text, count = _subn(pattern, replacement, regex, data.decode(planned.encoding))
+    if count:
+        # The preview is the safety net here: no .bak next to every file
+        atomic_write(planned.path, _encode(new_text, planned.encoding, data), keep_backup=False)
+    return count
+
+
+class ReplacePlanThread(FolderSearchThread):
+    """Finds the files a replace in files would change.
+
+    Walks the folder like FolderSearchThread; `results_found` carries
+    (path, FileReplacement) batches. Open tabs with unsaved changes are
+    planned from their text (`buffers`, by path), and paths in `skipped`
+    (path key -> reason) are reported but not changed.
+    """
+
+    MAX_RESULTS = None
+
+    def __init__(self, root, pattern, replacement, regex=False, prefilter=None, file_patterns=(),
+                 candidates=None, buffers=None, skipped=None):
+        super().__init__(root, pattern, prefilter, file_patterns, candidates=candidates)
+        self.replacement = replacement
+        self.regex = regex
+        self.buffers = {path_key(path): text for path, text in (buffers or {}).items()}
+        self.buffer_paths = list(buffers or ())
+        self.skipped = skipped or {}
+
+    def process_file(self, path):
+        key = path_key(path)
+        text = self.buffers.get(key)
+        if text is not None:
+            _, count = self.pattern.subn(replacement_template(self.replacement, self.regex), text)
+            return path, FileReplacement(path, count, text=text) if count else None
+
+        planned = plan_file(path, self.pattern, self.replacement, self.regex, self.prefilter)
+        if planned is not None and key in self.skipped:
+            planned.error = self.skipped[key]
+        return path, planned
+
+    def result_size(self, result):
+        return result.count
+
+    def _files_to_search(self):
+        # Unsaved text can match where the file on disk does not
+        buffered = [path for path in self.buffer_paths
+                    if is_inside(path, self.root)
+                    and matches_file_filter(os.path.basename(path), self.file_patterns)]
+        files = super()._files_to_search()
+        return self._chain(buffered, files)
+
+    def _chain(self, buffered, files):
+        yield from buffered
+        for path in files:
+            if path_key(path) not in self.buffers:
+                yield path
+
+
+class ReplaceApplyThread(QThread):
+    """Rewrites planned files on disk in parallel, each one atomically.
+
+    Once finished, `replaced` holds (path, count) of the rewritten files
+    and `errors` holds (path, message) of the ones that failed.
+    """
+
+    progress = pyqtSignal(int, int)  # files done, files in total
+
+    def __init__(self, planned, pattern, replacement, regex=False, workers=None):
+        super().__init__()
+        self.planned = planned
+        self.pattern = pattern
+        self.replacement = replacement
+        self.regex = regex
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 4)
+        self.replaced = []
+        self.errors = []
+        self.elapsed = 0.0
+
+    def run(self):
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(apply_file, planned, self.pattern, self.replacement, self.regex): planned
+                       for planned in self.planned}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future].path
+                try:
+                    count = future.result()
+                except (OSError, ValueError) as e:
+                    self.errors.append((path, str(e)))
+                else:
+                    if count:
+                        self.replaced.append((path, count))
+                self.progress.emit(done, len(futures))
+        self.elapsed = time.perf_counter() - start_time
@@ -0,0 +1,248 @@
+import codecs
+import mmap
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .encoding_detector import SAMPLE_SIZE, detect_bytes
+from .workspace import iter_workspace_files, matches_file_filter
+
+
+# Files from this size on are memory-mapped instead of read
+MMAP_THRESHOLD = 1024 * 1024
+MAX_MATCHES_PER_FILE = 1000
+# Matched lines longer than this are cut around the match for display
+MAX_LINE_LENGTH = 300
+
+_WIDE_BOMS = (codecs.BOM_UTF32_BE, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+class FileMatch:
+    __slots__ = ('line', 'column', 'length', 'text')
+
+    def __init__(self, line, column, length, text):
+        self.line = line          # 0-based line number
+        self.column = column      # in characters of the line
+        self.length = length
+        self.text = text          # the line, possibly shortened
+
+
+def literal_prefilter(search_text, case_sensitive=False, regex=False):
+    """Bytes pattern that every file with a match must contain, or None.
+
+    Plain ASCII searches can skip files by looking at their raw bytes,
+    without decoding them (valid for UTF-8 and the 8-bit encodings).
+    """
+    if regex or not search_text.isascii():
+        return None
+    flags = 0 if case_sensitive else re.IGNORECASE
+    return re.compile(re.escape(search_text.encode('ascii')), flags)
+
+
+def may_contain(data, prefilter):
+    """Whether raw file contents can match, judging by the prefilter."""
+    # UTF-16/32 text does not contain the search text's ASCII bytes
+    return prefilter is None or data[:4].startswith(_WIDE_BOMS) or prefilter.search(data) is not None
+
+
+def _shorten(line, column):
+    if len(line) <= MAX_LINE_LENGTH:
+        return line
+    start = max(0, min(column - MAX_LINE_LENGTH // 3, len(line) - MAX_LINE_LENGTH))
+    return line[start:start + MAX_LINE_LENGTH]
+
+
+def search_text(text, pattern, max_matches=MAX_MATCHES_PER_FILE):
+    """FileMatch for each match of `pattern` in `text`."""
+    # As in the editor: '$' has to match before the CR of CRLF files
+    text = text.replace('\r\n', '\n')
+    matches = []
+    line = 0
+    line_start = 0
+    scanned = 0
+    for match in pattern.finditer(text):
+        start = match.start()
+        newlines = text.count('\n', scanned, start)
+        if newlines:
+            line += newlines
+            line_start = text.rfind('\n', scanned, start) + 1
+        scanned = start
+        line_end = text.find('\n', start)
+        if line_end < 0:
+            line_end = len(text)
+        column = start - line_start
+        line_text = _shorten(text[line_start:line_end].rstrip('\r'), column)
+        matches.append(FileMatch(line, column, match.end() - start, line_text))
+        if len(matches) >= max_matches:
+            break
+    return matches
+
+
+def _read_bytes(path):
+    """Contents of a file (memory-mapped if large) and its size."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size
+        return f.read(), size
+
+
+def detect_text_encoding(data, size):
+    """Encoding of file contents, None if they look binary."""
+    sample = data[:SAMPLE_SIZE]
+    if b'\0' in sample and not sample.startswith(_WIDE_BOMS):
+        return None
+    encoding, _ = detect_bytes(sample, complete=size <= SAMPLE_SIZE)
+    return encoding
+
+
+def _decode(data, size):
+    """Text of file contents, None if they look binary."""
+    encoding = detect_text_encoding(data, size)
+    if encoding is None:
+        return None
+    try:
+        return str(data, encoding, errors='replace')
+    except LookupError:
+        return None
+
+
+def read_file_text(path):
+    """Decoded text of a file; None for binary or unreadable files."""
+    try:
+        data, size = _read_bytes(path)
+    except (OSError, ValueError):
+        return None
+    try:
+        return _decode(data, size)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def search_file(path, pattern, prefilter=None):
+    """Matches of `pattern` in a file; None for binary or unreadable files."""
+    try:
+        data, size = _read_bytes(path)
+    except (OSError, ValueError):
+        return None
+    if not size:
+        return []
+
+    try:
+        if not may_contain(data, prefilter):
+            return []
+        text = _decode(data, size)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    return None if text is None else search_text(text, pattern)
+
+
+class FolderSearchThread(QThread):
+    """Searches every file under a folder with a pool of workers.
+
+    The tree is walked lazily and files are handed to the pool as they
+    are found, so the first results arrive before the walk is over.
+    Results are emitted in batches (at most every BATCH_INTERVAL seconds)
+    to keep the UI thread free.
+    """
+
+    results_found = pyqtSignal(object)  # list of (path, [FileMatch])
+    search_finished = pyqtSignal(int, int, float)  # files searched, matches, seconds
+
+    BATCH_INTERVAL = 0.1
+    MAX_RESULTS = 20000
+
+    def __init__(self, root, pattern, prefilter=None, file_patterns=(), workers=None, candidates=None):
+        super().__init__()
+        self.root = root
+        self.pattern = pattern
+        self.prefilter = prefilter
+        self.file_patterns = file_patterns
+        # Optional callable returning the files to search instead of
+        # walking the folder (e.g. from an index), or None to walk anyway
+        self.candidates = candidates
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 4)
+        self.limited = False
+        self.used_candidates = False
+
+    def run(self):
+        start_time = time.perf_counter()
+        self._files = 0
+        self._matches = 0
+        self._batch = []
+        self._last_emit = 0.0
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        pending = set()
+        try:
+            for path in self._files_to_search():
+                if self._stopped():
+                    break
+                pending.add(pool.submit(self._process_file, path))
+                # Keep a bounded queue so a huge tree is not all queued at once
+                if len(pending) >= self.workers * 4:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+            while pending and not self._stopped():
+                done, pending = wait(pending, timeout=self.BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+                self._collect(done)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Emitted even after an error, so the panel never stays on "Searching..."
+            self._flush()
+            self.search_finished.emit(self._files, self._matches, time.perf_counter() - start_time)
+
+    def process_file(self, path):
+        """Runs in a pool worker; returns (path, result) for `results_found`."""
+        return path, search_file(path, self.pattern, self.prefilter)
+
+    def _process_file(self, path):
+        # A file that fails in an unexpected way is skipped, not the whole search
+        try:
+            return self.process_file(path)
+        except Exception as e:
+            print(f"Error searching '{path}': {e}")
+            return path, None
+
+    def result_size(self, result):
+        return len(result)
+
+    def _files_to_search(self):
+        paths = None
+        if self.candidates is not None:
+            try:
+                paths = self.candidates()
+            except Exception as e:
+                print(f"Search candidates unavailable, searching every file: {e}")
+        self.used_candidates = paths is not None
+        if paths is None:
+            return iter_workspace_files(self.root, self.file_patterns)
+        return (path for path in paths
+                if matches_file_filter(os.path.basename(path), self.file_patterns))
+
+    def _stopped(self):
+        return self.isInterruptionRequested() or self.limited
+
+    def _collect(self, futures):
+        for future in futures:
+            path, result = future.result()
+            self._files += 1
+            if result:
+                self._batch.append((path, result))
+                self._matches += self.result_size(result)
+                if self.MAX_RESULTS is not None and self._matches >= self.MAX_RESULTS:
+                    self.limited = True
+        now = time.perf_counter()
+        # The first hits go out at once; later ones are grouped
+        if self._batch and (not self._last_emit or now - self._last_emit >= self.BATCH_INTERVAL):
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self._last_emit = time.perf_counter()
+            self.results_found.emit(self._batch)
+            self._batch = []
@@ -46,6 +46,23 @@ class GeminiAI(BaseAI):
         except Exception as e:
             raise Exception(f"Erro ao gerar resposta: {str(e)}")
     
+    def stream_response(self, prompt: str):
+        """Gera a resposta em pedaços, conforme o Gemini os envia"""
+        if not self.is_connected or not self.model:
+            raise Exception("Não conectado ao Gemini. Use connect() primeiro.")
+        
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                # Pedaços sem texto (ex.: só metadados de segurança) são pulados
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                if text:
+                    yield text
+        except Exception as e:
+            raise Exception(f"Erro ao gerar resposta: {str(e)}")
+    
     def get_available_models(self) -> list[str]:
         """Retorna modelos Gemini disponíveis"""
         try:
@@ -0,0 +1,310 @@
+import re
+
+from PyQt6.QtCore import QObject, QEvent, QTimer
+from PyQt6.QtGui import QFont, QTextCharFormat, QColor, QTextCursor, QTextBlockUserData
+from PyQt6.QtWidgets import QTextEdit
+
+from .text_utils import astral_indexes, to_qt_position
+
+
+def build_formats():
+    """Text formats for each token kind (dark theme)."""
+    def make(color, bold=False):
+        text_format = QTextCharFormat()
+        text_format.setForeground(QColor(color))
+        if bold:
+            text_format.setFontWeight(QFont.Weight.Bold)
+        return text_format
+
+    return {
+        'keyword': make("#569CD6", bold=True),  # Azul
+        'string': make("#CE9178"),              # Laranja
+        'comment': make("#6A9955"),             # Verde
+        'function': make("#DCDCAA"),            # Amarelo
+        'number': make("#B5CEA8"),              # Verde claro
+        'property': make("#9CDCFE"),            # Azul claro
+        'boolean': make("#569CD6"),             # Azul
+        'widget': make("#4EC9B0", bold=True),   # Verde-azulado
+    }
+
+
+_CAPTURING_GROUP = re.compile(r'(?<!\\)\((?!\?)')
+
+
+class Tokenizer:
+    """Scans a block once with a single alternation of named groups.
+
+    Alternatives are ordered by precedence, so comments and strings win
+    over anything inside them. Plain words are classified with set
+    lookups instead of one regular expression per keyword.
+
+    `spans` are constructs that may cross lines, as (kind, open regex,
+    close regex) tuples. '{level}' in the close regex is replaced by the
+    first group of the opener, for Lua's --[==[ ... ]==]. A block that
+    ends inside a span gets a non-zero end state, which is passed as the
+    start state of the next block.
+    """
+
+    _WORD = r'\b[A-Za-z_][A-Za-z0-9_]*'
+
+    def __init__(self, keywords=(), widgets=(), booleans=(), comment=None, properties=False,
+                 spans=()):
+        words = [w for w in keywords if re.fullmatch(r'\w+', w)]
+        phrases = [w for w in keywords if w not in words]
+
+        self.keywords = frozenset(words)
+        self.phrases = tuple(phrases)
+        self.widgets = frozenset(widgets)
+        self.booleans = frozenset(booleans)
+
+        self.spans = tuple(spans)
+        self._openers = [re.compile(opener) for _, opener, _ in self.spans]
+        # State 0 is plain code; other states index (span, level) pairs
+        self._states = [None]
+        self._state_ids = {}
+        self._closers = {}
+
+        parts = []
+        # Openers go first so '--[[' wins over '--' and '"""' over '"'
+        for i, (_, opener, _) in enumerate(self.spans):
+            # Groups are only read back from the opener regex itself
+            opener = _CAPTURING_GROUP.sub('(?:', opener)
+            parts.append(f'(?P<span{i}>{opener})')
+        if comment:
+            parts.append(f'(?P<comment>{re.escape(comment)}.*)')
+        parts.append(r'''(?P<string>"[^"]*"|'[^']*')''')
+        parts.append(r'(?P<number>\b\d+\b)')
+        if properties:
+            parts.append(r'(?P<property>\b[\w-]+(?=\s*:))')
+        if phrases:
+            alternation = '|'.join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+            parts.append(rf'(?P<keyword>\b(?:{alternation})\b)')
+        parts.append(f'(?P<word>{self._WORD})')
+        self.pattern = re.compile('|'.join(parts))
+
+    def _word_kind(self, text, match):
+        word = match.group()
+        end = match.end()
+        if end < len(text) and text[end] == '(' and word[0] != '_':
+            return 'function'
+        if word in self.booleans:
+            return 'boolean'
+        if word in self.widgets:
+            return 'widget'
+        if word in self.keywords:
+            return 'keyword'
+        return None
+
+    def _state(self, span, level):
+        key = (span, level)
+        state = self._state_ids.get(key)
+        if state is None:
+            state = self._state_ids[key] = len(self._states)
+            self._states.append(key)
+        return state
+
+    def _closer(self, state):
+        closer = self._closers.get(state)
+        if closer is None:
+            span, level = self._states[state]
+            close = self.spans[span][2].replace('{level}', re.escape(level))
+            closer = self._closers[state] = re.compile(close)
+        return closer
+
+    def highlight_line(self, text, state=0, utf16=True):
+        """Tokens of one line as (start, length, kind), and the end state.
+
+        Positions are Qt (UTF-16) positions, or Python indexes with utf16=False.
+        """
+        tokens = []
+        pos = 0
+        size = len(text)
+        while True:
+            if state:
+                close = self._closer(state).search(text, pos)
+                kind = self.spans[self._states[state][0]][0]
+                if close is None:
+                    if size > pos:
+                        tokens.append((pos, size - pos, kind))
+                    break
+                tokens.append((pos, close.end() - pos, kind))
+                pos = close.end()
+                state = 0
+                continue
+
+            match = self.pattern.search(text, pos)
+            if match is None:
+                break
+            kind = match.lastgroup
+            start, pos = match.span()
+            if pos == start:
+                pos += 1
+                continue
+            if kind.startswith('span'):
+                span = int(kind[4:])
+                opener = self._openers[span].match(text, start)
+                level = opener.group(1) or '' if opener.re.groups else ''
+                state = self._state(span, level)
+                # The span's token starts at the opener
+                close = self._closer(state).search(text, pos)
+                end = close.end() if close else size
+                tokens.append((start, end - start, self.spans[span][0]))
+                if close is None:
+                    break
+                pos = end
+                state = 0
+                continue
+            if kind == 'word':
+                kind = self._word_kind(text, match)
+                if kind is None:
+                    continue
+            tokens.append((start, pos - start, kind))
+
+        if utf16:
+            astral = astral_indexes(text)
+            if astral:
+                tokens = [(to_qt_position(start, astral),
+                           to_qt_position(start + length, astral) - to_qt_position(start, astral),
+                           kind) for start, length, kind in tokens]
+        return tokens, state
+
+    def tokenize(self, text, utf16=True):
+        """Tokens of a single line, ignoring multi-line state."""
+        return self.highlight_line(text, 0, utf16)[0]
+
+
+class BlockCache(QTextBlockUserData):
+    """Per-block values (syntax selections, color codes...) that stay valid
+    while the block's revision is unchanged."""
+
+    def __init__(self):
+        super().__init__()
+        self.entries = {}
+
+
+def cached_block_value(block, key):
+    data = block.userData()
+    if isinstance(data, BlockCache):
+        entry = data.entries.get(key)
+        if entry is not None and entry[0] == block.revision():
+            return entry[1]
+    return None
+
+
+def cache_block_value(block, key, value):
+    data = block.userData()
+    if not isinstance(data, BlockCache):
+        data = BlockCache()
+        block.setUserData(data)
+    data.entries[key] = (block.revision(), value)
+
+
+def visible_blocks(editor):
+    """Numbers of the first and last blocks shown in a QTextEdit's viewport.
+
+    Binary search over block rectangles: cursorForPosition() walks the
+    layout and gets slow on big documents.
+    """
+    document = editor.document()
+    layout = document.documentLayout()
+    top = editor.verticalScrollBar().value()
+    bottom = top + editor.viewport().height()
+
+    def block_at(y):
+        low, high = 0, document.blockCount() - 1
+        while low < high:
+            middle = (low + high) // 2
+            if layout.blockBoundingRect(document.findBlockByNumber(middle)).bottom() <= y:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    return block_at(top), block_at(bottom)
+
+
+def make_selection(document, position, length, text_format):
+    cursor = QTextCursor(document)
+    cursor.setPosition(position)
+    cursor.setPosition(position + length, QTextCursor.MoveMode.KeepAnchor)
+    selection = QTextEdit.ExtraSelection()
+    selection.cursor = cursor
+    selection.format = text_format
+    return selection
+
+
+class ViewportHighlighter(QObject):
+    """Highlights only the blocks around the visible part of a CodeEditor.
+
+    Used for big documents, where formatting the whole file up front (or
+    changing block formats, which relayouts the rest of a QTextEdit) is too
+    slow. Tokens are shown as the 'syntax' layer of extra selections, which
+    only costs a repaint, and are cached per block until the block is edited.
+
+    Multi-line state is carried from the first block of the highlighted
+    range, whose start state is taken from the block above it if that one
+    has been highlighted (plain code otherwise).
+    """
+
+    MARGIN = 50  # blocks highlighted above and below the viewport
+
+    def __init__(self, editor, tokenizer, formats):
+        super().__init__(editor)
+        self.editor = editor
+        self.tokenizer = tokenizer
+        self.formats = formats
+        self.document = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.highlight_visible)
+        editor.verticalScrollBar().valueChanged.connect(self.schedule)
+        editor.viewport().installEventFilter(self)
+        self.setDocument(editor.document())
+
+    def setDocument(self, document):
+        if self.document is not None:
+            self.document.contentsChange.disconnect(self.schedule)
+            self.editor.set_extra_selections('syntax', [])
+        self.document = document
+        if document is not None:
+            document.contentsChange.connect(self.schedule)
+            self.schedule()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Resize:
+            self.schedule()
+        return False
+
+    def schedule(self, *args):
+        if self.document is not None:
+            self.timer.start(0)
+
+    def block_selections(self, block, state):
+        """Selections of a block starting in `state`, and its end state."""
+        cached = cached_block_value(block, 'syntax')
+        if cached is not None and cached[0] == state:
+            return cached[2], cached[1]
+
+        formats = self.formats
+        position = block.position()
+        tokens, end_state = self.tokenizer.highlight_line(block.text(), state)
+        selections = [make_selection(self.document, position + start, length, formats[kind])
+                      for start, length, kind in tokens]
+        cache_block_value(block, 'syntax', (state, end_state, selections))
+        return selections, end_state
+
+    def highlight_visible(self):
+        if self.document is None:
+            return
+        first, last = visible_blocks(self.editor)
+        block = self.document.findBlockByNumber(max(first - self.MARGIN, 0))
+        stop = last + self.MARGIN
+        above = cached_block_value(block.previous(), 'syntax')
+        state = above[1] if above is not None else 0
+        selections = []
+        while block.isValid() and block.blockNumber() <= stop:
+            block_selections, state = self.block_selections(block, state)
+            selections.extend(block_selections)
+            block = block.next()
+        self.editor.set_extra_selections('syntax', selections)
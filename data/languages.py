@@ -0,0 +1,144 @@
+import threading
+
+from .highlighting import Tokenizer, build_formats
+
+
+class LanguageDefinition:
+    """Highlighting rules of one language.
+
+    The tokenizer is compiled on first use and then shared by every
+    highlighter of that language.
+    """
+
+    def __init__(self, name, keywords=(), widgets=(), booleans=(), comment=None, properties=False,
+                 spans=()):
+        self.name = name
+        self.keywords = tuple(keywords)
+        self.widgets = tuple(widgets)
+        self.booleans = tuple(booleans)
+        self.comment = comment
+        self.properties = properties
+        self.spans = tuple(spans)
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    self._tokenizer = Tokenizer(self.keywords, self.widgets, self.booleans,
+                                                self.comment, self.properties, self.spans)
+        return self._tokenizer
+
+
+_languages = {}
+_default_language = LanguageDefinition('text')
+_formats = None
+
+
+def register_language(extensions, definition):
+    """Use `definition` for files with any of the given extensions."""
+    if isinstance(extensions, str):
+        extensions = [extensions]
+    for extension in extensions:
+        _languages[extension.lower()] = definition
+    return definition
+
+
+def get_language(extension):
+    """Definition for a file extension (plain strings/numbers/calls if unknown)."""
+    return _languages.get(extension.lower(), _default_language)
+
+
+def shared_formats():
+    """Text formats shared by all highlighters (created on first use)."""
+    global _formats
+    if _formats is None:
+        _formats = build_formats()
+    return _formats
+
+
+# ---- built-in languages ----------------------------------------------
+
+# Multi-line constructs as (kind, open regex, close regex)
+C_BLOCK_COMMENT = ('comment', r'/\*', r'\*/')
+PYTHON_TRIPLE_QUOTES = [('string', r'"""', r'"""'), ('string', r"'''", r"'''")]
+LUA_LONG_BRACKETS = [('comment', r'--\[(=*)\[', r'\]{level}\]'),
+                     ('string', r'\[(=*)\[', r'\]{level}\]')]
+
+OTUI_WIDGETS = [
+    'UIWidget', 'UIButton', 'UILabel', 'UITextEdit', 'UICheckBox',
+    'UIWindow', 'UIScrollArea', 'UIScrollBar', 'UIProgressBar',
+    'UISpinBox', 'UIComboBox', 'UITabBar', 'UILineEdit',
+    'UIItem', 'UICreature', 'UIMap', 'UIMinimap', 'Panel',
+    'Button', 'Label', 'TextEdit', 'CheckBox', 'Window',
+    'ScrollArea', 'VerticalScrollBar', 'HorizontalScrollBar',
+    'MainWindow', 'MiniWindow', 'Item', 'Creature'
+]
+
+register_language('.py', LanguageDefinition('python', comment='#', spans=PYTHON_TRIPLE_QUOTES, keywords=[
+    'def', 'class', 'import', 'from', 'as', 'if', 'elif', 'else',
+    'for', 'while', 'return', 'try', 'except', 'finally', 'with',
+    'True', 'False', 'None', 'and', 'or', 'not', 'in', 'is', 'lambda']))
+
+register_language('.js', LanguageDefinition('javascript', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'var', 'let', 'const', 'function', 'if', 'else', 'for', 'while',
+    'return', 'class', 'extends', 'import', 'export', 'async', 'await',
+    'try', 'catch', 'finally', 'new', 'this', 'null', 'undefined']))
+
+register_language('.ts', LanguageDefinition('typescript', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'var', 'let', 'const', 'function', 'if', 'else', 'for', 'while',
+    'return', 'class', 'interface', 'type', 'extends', 'implements',
+    'import', 'export', 'async', 'await', 'public', 'private', 'protected']))
+
+register_language('.java', LanguageDefinition('java', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'public', 'private', 'protected', 'class', 'interface', 'extends',
+    'implements', 'void', 'int', 'String', 'boolean', 'if', 'else',
+    'for', 'while', 'return', 'new', 'this', 'static', 'final']))
+
+register_language('.cs', LanguageDefinition('csharp', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'public', 'private', 'protected', 'class', 'interface', 'namespace',
+    'using', 'void', 'int', 'string', 'bool', 'if', 'else', 'for',
+    'while', 'return', 'new', 'this', 'static', 'async', 'await']))
+
+register_language('.cpp', LanguageDefinition('cpp', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'class', 'namespace', 'public', 'private', 'protected', 'virtual',
+    'void', 'int', 'char', 'bool', 'if', 'else', 'for', 'while',
+    'return', 'new', 'delete', 'this', 'nullptr', 'const', 'static']))
+
+register_language('.c', LanguageDefinition('c', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'int', 'char', 'float', 'double', 'void', 'if', 'else', 'for',
+    'while', 'return', 'struct', 'typedef', 'const', 'static', 'extern']))
+
+register_language('.php', LanguageDefinition('php', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'class', 'function', 'if', 'else', 'elseif', 'for', 'while',
+    'return', 'public', 'private', 'protected', 'static', 'namespace',
+    'use', 'new', 'this', 'echo', 'require', 'include']))
+
+register_language('.rb', LanguageDefinition('ruby', comment='#', keywords=[
+    'def', 'class', 'module', 'if', 'elsif', 'else', 'unless', 'for',
+    'while', 'return', 'require', 'include', 'attr_accessor', 'end']))
+
+register_language('.go', LanguageDefinition('go', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'func', 'package', 'import', 'var', 'const', 'type', 'struct',
+    'interface', 'if', 'else', 'for', 'return', 'defer', 'go', 'chan']))
+
+register_language('.swift', LanguageDefinition('swift', comment='//', spans=[C_BLOCK_COMMENT], keywords=[
+    'func', 'class', 'struct', 'enum', 'protocol', 'var', 'let',
+    'if', 'else', 'for', 'while', 'return', 'import', 'self', 'init']))
+
+register_language('.lua', LanguageDefinition('lua', comment='--', spans=LUA_LONG_BRACKETS, keywords=[
+    'function', 'local', 'if', 'then', 'else', 'elseif', 'end',
+    'for', 'while', 'do', 'return', 'nil', 'true', 'false', 'and', 'or', 'not']))
+
+register_language(['.otui', '.otml'], LanguageDefinition(
+    'otui', comment='#', widgets=OTUI_WIDGETS, booleans=('true', 'false'), properties=True,
+    keywords=['anchors', 'margin', 'padding', 'size', 'color', 'background-color',
+              'text', 'font', 'opacity', 'visible', 'enabled', 'focusable',
+              'phantom', 'draggable', 'image-source', 'image-clip', 'image-border',
+              'layout', 'image-color', 'text-offset', 'text-align', 'text-wrap',
+              'on', 'id', '@onLoad', '@onDestroy', '@onSetup']))
+
+register_language('.sh', LanguageDefinition('shell', comment='#'))
+register_language('.sql', LanguageDefinition('sql', comment='--', spans=[C_BLOCK_COMMENT]))
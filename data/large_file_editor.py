@@ -0,0 +1,439 @@
+import functools
+import os
+
+from PyQt6.QtGui import QFont, QPainter, QColor
+from PyQt6.QtCore import Qt, QTimer, QRect, pyqtSignal
+from PyQt6.QtWidgets import QAbstractScrollArea, QFileDialog, QMessageBox
+
+from .piece_table import PieceTable
+from .file_saver import FileSaverThread
+from .languages import get_language, shared_formats
+
+
+# Files above this size open in the piece-table view instead of a QTextEdit
+LARGE_FILE_THRESHOLD = 32 * 1024 * 1024
+
+
+class LargeFileEditor(QAbstractScrollArea):
+    """Editor for very large files backed by a memory-mapped PieceTable.
+
+    Only the visible lines are decoded and painted, so opening a file
+    costs the same whatever its size. It exposes the subset of the
+    CodeEditor interface used by MainWindow (save, undo, encodings).
+    """
+
+    save_finished = pyqtSignal(bool, str)
+
+    TAB_WIDTH = 4
+
+    def __init__(self, file_path, encoding='utf-8'):
+        super().__init__()
+        self.file_path = file_path
+        self.current_encoding = encoding
+        self.table = PieceTable(file_path)
+        self.language = get_language(os.path.splitext(file_path)[1])
+        self.formats = shared_formats()
+        self.newline = self._detect_newline()
+
+        self.cursor_line = 0
+        self.cursor_column = 0
+        self.modified = False
+        self.save_thread = None
+        self.undo_stack = []
+        self.redo_stack = []
+        self._line_cache = {}
+        self._max_width = 0
+
+        self.setFont(QFont("Consolas", 11))
+        self.viewport().setCursor(Qt.CursorShape.IBeamCursor)
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.verticalScrollBar().setSingleStep(1)
+
+        # Keep indexing line offsets in the background after the first paint
+        self.index_timer = QTimer(self)
+        self.index_timer.timeout.connect(self._index_step)
+        self.index_timer.start(0)
+        self._update_scrollbars()
+
+    def _detect_newline(self):
+        end = self.table.line_start(1)
+        if end is not None and end >= 2 and self.table.read(end - 2, 1) == b'\r':
+            return b'\r\n'
+        return b'\n'
+
+    # ---- text access --------------------------------------------------
+
+    def decode(self, data):
+        return data.decode(self.current_encoding, errors='surrogateescape')
+
+    def encode(self, text):
+        return text.encode(self.current_encoding, errors='surrogateescape')
+
+    def line_text(self, line):
+        text = self._line_cache.get(line)
+        if text is None:
+            lines = self.table.lines(line, 1)
+            text = self.decode(lines[0]) if lines else ''
+            self._line_cache[line] = text
+        return text
+
+    def visible_lines(self, first, count):
+        missing = [n for n in range(first, first + count) if n not in self._line_cache]
+        if missing:
+            start = missing[0]
+            for offset, data in enumerate(self.table.lines(start, missing[-1] - start + 1)):
+                self._line_cache[start + offset] = self.decode(data)
+        return [self._line_cache[n] for n in range(first, first + count) if n in self._line_cache]
+
+    def line_count(self):
+        if self.table.indexed:
+            return self.table.line_count()
+        return self.table.estimated_line_count()
+
+    def toPlainText(self):
+        """Whole document as text (expensive on huge files)."""
+        data = self.table.read(0, self.table.length)
+        return self.decode(data).replace('\r\n', '\n')
+
+    def _offset(self, line, column):
+        start = self.table.line_start(line)
+        return start + len(self.encode(self.line_text(line)[:column]))
+
+    # ---- edits --------------------------------------------------------
+
+    def _invalidate(self, from_line=0):
+        if from_line == 0:
+            self._line_cache.clear()
+        else:
+            self._line_cache = {n: t for n, t in self._line_cache.items() if n < from_line}
+        self.modified = True
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def insert_text(self, text):
+        if self.save_thread is not None:
+            return
+        data = self.encode(text.replace('\r\n', '\n')).replace(b'\n', self.newline)
+        offset = self._offset(self.cursor_line, self.cursor_column)
+        self.table.insert(offset, data)
+        self.undo_stack.append(('insert', offset, data, self.cursor_line, self.cursor_column))
+        self.redo_stack.clear()
+        self._invalidate(max(self.cursor_line - 1, 0))
+        self._move_to_offset(offset + len(data))
+
+    def delete_bytes(self, offset, length):
+        if self.save_thread is not None:
+            return b''
+        removed = self.table.delete(offset, length)
+        if removed:
+            self.undo_stack.append(('delete', offset, removed, self.cursor_line, self.cursor_column))
+            self.redo_stack.clear()
+            self._invalidate(max(self.cursor_line - 1, 0))
+        return removed
+
+    def undo(self):
+        if not self.undo_stack or self.save_thread is not None:
+            return
+        kind, offset, data, line, column = self.undo_stack.pop()
+        if kind == 'insert':
+            self.table.delete(offset, len(data))
+        else:
+            self.table.insert(offset, data)
+        self.redo_stack.append((kind, offset, data, line, column))
+        self._invalidate()
+        self.cursor_line, self.cursor_column = line, column
+        self.ensure_cursor_visible()
+
+    def redo(self):
+        if not self.redo_stack or self.save_thread is not None:
+            return
+        kind, offset, data, line, column = self.redo_stack.pop()
+        if kind == 'insert':
+            self.table.insert(offset, data)
+        else:
+            self.table.delete(offset, len(data))
+        self.undo_stack.append((kind, offset, data, line, column))
+        self._invalidate()
+        self.cursor_line = line
+        self._move_to_offset(offset + len(data) if kind == 'insert' else offset)
+
+    def _move_to_offset(self, offset):
+        """Place the cursor at a byte offset near the current cursor line."""
+        line = max(self.cursor_line - 1, 0)
+        while True:
+            next_start = self.table.line_start(line + 1)
+            if next_start is None or next_start > offset:
+                break
+            line += 1
+        start = self.table.line_start(line)
+        prefix = self.table.read(start, offset - start).rstrip(b'\r')
+        self.cursor_line = line
+        self.cursor_column = len(self.decode(prefix))
+        self.ensure_cursor_visible()
+
+    # ---- saving / encodings -------------------------------------------
+
+    def save_file(self, encoding=None, file_path=None):
+        """Stream the original bytes plus edit pieces back to disk.
+
+        Large-file mode keeps the bytes as they are on disk; the encoding
+        only controls how they are displayed. Editing is paused until the
+        worker thread has written the temp file. `file_path` saves to
+        another file, which becomes the editor's once the save succeeds.
+        """
+        if self.save_thread is not None:
+            return False
+        pieces = self.table.snapshot()
+        thread = FileSaverThread(file_path or self.file_path,
+                                 functools.partial(self.table.write_to, pieces=pieces),
+                                 commit=False)
+        thread.finished.connect(functools.partial(self._on_save_finished, thread))
+        self.save_thread = thread
+        thread.start()
+        return True
+
+    def _on_save_finished(self, thread):
+        if thread is not self.save_thread:
+            return
+        self.save_thread = None
+        error = thread.error
+        if not error:
+            try:
+                self.table.commit_save(thread.temp_path, thread.file_path)
+            except Exception as e:
+                error = str(e)
+        if error:
+            QMessageBox.critical(None, "Error", f"Error saving file: {error}")
+            self.save_finished.emit(False, error)
+            return
+
+        if thread.file_path != self.file_path:
+            self.file_path = thread.file_path
+            self.language = get_language(os.path.splitext(thread.file_path)[1])
+        self._line_cache.clear()
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.modified = False
+        self.index_timer.start(0)
+        self.viewport().update()
+        self.save_finished.emit(True, f"File saved: {thread.file_path} ({thread.elapsed * 1000:.0f} ms)")
+
+    def save_file_as(self, encoding=None):
+        file_path, _ = QFileDialog.getSaveFileName(None, "Save As", "All Files  (*)")
+        if file_path:
+            return self.save_file(encoding, file_path)
+        return False
+
+    def reload_with_encoding(self, encoding):
+        """Reinterpret the bytes with another encoding"""
+        if not PieceTable.supports_encoding(encoding):
+            QMessageBox.warning(None, "Large File",
+                                f"{encoding.upper()} is not supported in large-file mode.")
+            return
+        self.current_encoding = encoding
+        self._line_cache.clear()
+        self.viewport().update()
+
+    def closeEvent(self, event):
+        if self.save_thread is not None:
+            self.save_thread.wait()
+            self._on_save_finished(self.save_thread)
+        self.index_timer.stop()
+        self.table.close()
+        super().closeEvent(event)
+
+    # ---- layout -------------------------------------------------------
+
+    def _line_height(self):
+        return self.fontMetrics().lineSpacing()
+
+    def _char_width(self):
+        return max(self.fontMetrics().horizontalAdvance('M'), 1)
+
+    def _rows(self):
+        return max(self.viewport().height() // self._line_height(), 1)
+
+    def _gutter_width(self):
+        digits = len(str(max(self.line_count(), 1)))
+        return (digits + 2) * self._char_width()
+
+    def _index_step(self):
+        if self.table.index_step(2 * 1024 * 1024):
+            self.index_timer.stop()
+        self._update_scrollbars()
+
+    def _update_scrollbars(self):
+        vbar = self.verticalScrollBar()
+        vbar.setPageStep(self._rows())
+        vbar.setRange(0, max(self.line_count() - self._rows(), 0))
+        hbar = self.horizontalScrollBar()
+        hbar.setPageStep(self.viewport().width())
+        hbar.setRange(0, max(self._max_width - self.viewport().width() + self._gutter_width(), 0))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def ensure_cursor_visible(self):
+        vbar = self.verticalScrollBar()
+        first = vbar.value()
+        rows = self._rows()
+        if self.cursor_line < first:
+            vbar.setValue(self.cursor_line)
+        elif self.cursor_line >= first + rows:
+            vbar.setValue(self.cursor_line - rows + 1)
+        self.viewport().update()
+
+    def goto_line(self, line, column=0, length=0):
+        """Move the cursor to a 0-based line and column."""
+        self._update_scrollbars()
+        if self.table.indexed:
+            line = min(line, self.line_count() - 1)
+        self.cursor_line = max(line, 0)
+        self.cursor_column = min(column, len(self.line_text(self.cursor_line)))
+        self.ensure_cursor_visible()
+        self.setFocus()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), QColor("#1e1e1e"))
+        metrics = self.fontMetrics()
+        line_height = self._line_height()
+        first = self.verticalScrollBar().value()
+        gutter = self._gutter_width()
+        x_offset = gutter - self.horizontalScrollBar().value()
+
+        lines = self.visible_lines(first, self._rows() + 1)
+        painter.setClipRect(QRect(gutter, 0, self.viewport().width(), self.viewport().height()))
+        default_color = QColor("#d4d4d4")
+        formats = self.formats
+        tokenizer = self.language.tokenizer
+        # Multi-line state is followed from the first line on screen
+        state = 0
+        for row, text in enumerate(lines):
+            shown = text.expandtabs(self.TAB_WIDTH)
+            self._max_width = max(self._max_width, len(shown) * self._char_width())
+            y = row * line_height + metrics.ascent()
+            # Only the lines on screen are tokenized, so this costs the
+            # same for any file size
+            x = x_offset
+            pos = 0
+            tokens, state = tokenizer.highlight_line(shown, state, utf16=False)
+            for start, length, kind in tokens:
+                if start > pos:
+                    painter.setPen(default_color)
+                    painter.drawText(x, y, shown[pos:start])
+                    x += metrics.horizontalAdvance(shown[pos:start])
+                token = shown[start:start + length]
+                painter.setPen(formats[kind].foreground().color())
+                painter.drawText(x, y, token)
+                x += metrics.horizontalAdvance(token)
+                pos = start + length
+            if pos < len(shown):
+                painter.setPen(default_color)
+                painter.drawText(x, y, shown[pos:])
+
+        # Caret
+        if first <= self.cursor_line < first + len(lines) and self.hasFocus():
+            prefix = self.line_text(self.cursor_line)[:self.cursor_column].expandtabs(self.TAB_WIDTH)
+            x = x_offset + metrics.horizontalAdvance(prefix)
+            y = (self.cursor_line - first) * line_height
+            painter.fillRect(x, y, 2, line_height, QColor("#aeafad"))
+
+        # Line numbers
+        painter.setClipping(False)
+        painter.fillRect(0, 0, gutter, self.viewport().height(), QColor("#252526"))
+        painter.setPen(QColor("#858585"))
+        for row in range(len(lines)):
+            painter.drawText(0, row * line_height, gutter - self._char_width(), line_height,
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                             str(first + row + 1))
+
+    # ---- input --------------------------------------------------------
+
+    def _column_at(self, line, x):
+        text = self.line_text(line)
+        target = round(x / self._char_width())
+        width = 0
+        for column, char in enumerate(text):
+            width = (width // self.TAB_WIDTH + 1) * self.TAB_WIDTH if char == '\t' else width + 1
+            if width > target:
+                return column
+        return len(text)
+
+    def mousePressEvent(self, event):
+        line = self.verticalScrollBar().value() + int(event.position().y()) // self._line_height()
+        if self.table.line_start(line) is None:
+            line = max(self.line_count() - 1, 0)
+        x = event.position().x() - self._gutter_width() + self.horizontalScrollBar().value()
+        self.cursor_line = line
+        self.cursor_column = self._column_at(line, max(x, 0))
+        self.viewport().update()
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        ctrl = bool(event.modifiers() & Qt.KeyboardModifier.ControlModifier)
+        line, column = self.cursor_line, self.cursor_column
+        text = self.line_text(line)
+
+        if key == Qt.Key.Key_Left:
+            if column > 0:
+                column -= 1
+            elif line > 0:
+                line -= 1
+                column = len(self.line_text(line))
+        elif key == Qt.Key.Key_Right:
+            if column < len(text):
+                column += 1
+            elif self.table.line_start(line + 1) is not None:
+                line, column = line + 1, 0
+        elif key in (Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+            step = self._rows() if key in (Qt.Key.Key_PageUp, Qt.Key.Key_PageDown) else 1
+            if key in (Qt.Key.Key_Up, Qt.Key.Key_PageUp):
+                line = max(line - step, 0)
+            else:
+                line = min(line + step, max(self.line_count() - 1, 0))
+                while line > 0 and self.table.line_start(line) is None:
+                    line -= 1
+            column = min(column, len(self.line_text(line)))
+        elif key == Qt.Key.Key_Home:
+            line, column = (0, 0) if ctrl else (line, 0)
+        elif key == Qt.Key.Key_End:
+            if ctrl:
+                line = self.table.line_count() - 1
+            column = len(self.line_text(line))
+        elif key == Qt.Key.Key_Backspace:
+            # The cursor only moves if the edit is accepted (not during a save)
+            if column > 0:
+                offset = self._offset(line, column - 1)
+                if self.delete_bytes(offset, len(self.encode(text[column - 1]))):
+                    column -= 1
+            elif line > 0:
+                previous_column = len(self.line_text(line - 1))
+                if self.delete_bytes(self._offset(line - 1, previous_column), len(self.newline)):
+                    line, column = line - 1, previous_column
+        elif key == Qt.Key.Key_Delete:
+            offset = self._offset(line, column)
+            if column < len(text):
+                self.delete_bytes(offset, len(self.encode(text[column])))
+            else:
+                self.delete_bytes(offset, len(self.newline))
+        elif key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            self.insert_text('\n')
+            return
+        elif event.text() and event.text().isprintable() or key == Qt.Key.Key_Tab:
+            self.insert_text('\t' if key == Qt.Key.Key_Tab else event.text())
+            return
+        else:
+            super().keyPressEvent(event)
+            return
+
+        self.cursor_line, self.cursor_column = line, column
+        self.ensure_cursor_visible()
+
+    def focusNextPrevChild(self, next):
+        # Keep Tab inside the editor
+        return False
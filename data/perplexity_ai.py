@@ -5,10 +5,14 @@ from .base_ai import BaseAI
 class PerplexityAI(BaseAI):
     """Provedor de IA Perplexity"""
     
-    def __init__(self):
+    BASE_URL = "https://api.perplexity.ai"
+    
+    def __init__(self, base_url=None):
         super().__init__()
         self.model_name = None
         self.client = None
+        # Outra URL permite usar qualquer servidor compatível com a API da OpenAI
+        self.base_url = base_url or self.BASE_URL
         
     def get_provider_name(self) -> str:
         return "Perplexity AI"
@@ -19,7 +23,7 @@ class PerplexityAI(BaseAI):
             self.api_key = api_key
             self.client = OpenAI(
                 api_key=api_key,
-                base_url="https://api.perplexity.ai"
+                base_url=self.base_url
             )
             
             # Listar modelos disponíveis
@@ -60,6 +64,24 @@ class PerplexityAI(BaseAI):
         except Exception as e:
             raise Exception(f"Erro ao gerar resposta: {str(e)}")
     
+    def stream_response(self, prompt: str):
+        """Gera a resposta em pedaços, conforme o Perplexity os envia"""
+        if not self.is_connected or not self.client:
+            raise Exception("Não conectado ao Perplexity. Use connect() primeiro.")
+        
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
+            with stream:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise Exception(f"Erro ao gerar resposta: {str(e)}")
+    
     def get_available_models(self) -> list[str]:
         """Retorna modelos Perplexity disponíveis"""
         return [
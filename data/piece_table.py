@@ -0,0 +1,274 @@
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, count
+from operator import add
+
+from .file_saver import write_temp_file, replace_file
+
+
+class LineIndex:
+    """Line start offsets of a byte buffer, built lazily in chunks."""
+
+    def __init__(self, data, chunk_size=8 * 1024 * 1024):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.starts = array('q', [0])
+        self.scanned = 0
+
+    @property
+    def complete(self):
+        return self.scanned >= len(self.data)
+
+    def scan(self, max_bytes=None):
+        """Index up to max_bytes more of the buffer. Returns True when done."""
+        size = len(self.data)
+        end = min(size, self.scanned + (max_bytes or self.chunk_size))
+        if end > self.scanned:
+            parts = self.data[self.scanned:end].split(b'\n')
+            # Start of line k+1 = chunk start + len(parts[0..k]) + (k + 1)
+            self.starts.extend(map(add, accumulate(map(len, parts[:-1])),
+                                   count(self.scanned + 1)))
+            self.scanned = end
+        return self.scanned >= size
+
+    def scan_to(self, offset):
+        while self.scanned < offset and not self.scan():
+            pass
+
+    def count_newlines(self, start, end):
+        """Number of b'\\n' bytes in data[start:end]."""
+        self.scan_to(end)
+        starts = self.starts
+        return bisect_right(starts, end) - bisect_right(starts, start)
+
+    def nth_line_start(self, start, n):
+        """Offset just after the n-th newline at or after `start` (n >= 1), or None."""
+        starts = self.starts
+        idx = bisect_right(starts, start) + n - 1
+        while len(starts) <= idx and not self.complete:
+            self.scan()
+        return starts[idx] if idx < len(starts) else None
+
+    def seen_lines(self):
+        return len(self.starts)
+
+
+class Piece:
+    __slots__ = ('added', 'start', 'length')
+
+    def __init__(self, added, start, length):
+        self.added = added
+        self.start = start
+        self.length = length
+
+
+class PieceTable:
+    """Memory-mapped piece table over the bytes of a file.
+
+    The original file is never copied: edits are stored as small pieces
+    pointing into an append-only add buffer, and saving streams the
+    original bytes plus those pieces to disk.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = None
+        self._map = None
+        self.add_buffer = bytearray()
+        self.add_index = LineIndex(self.add_buffer)
+        self._open(file_path)
+
+    @staticmethod
+    def supports_encoding(encoding):
+        """Only ASCII-compatible encodings can be indexed by b'\\n'."""
+        try:
+            return 'a\n'.encode(encoding) == b'a\n'
+        except (LookupError, TypeError):
+            return False
+
+    def _open(self, file_path):
+        self._file = open(file_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            original = self._map
+        else:
+            original = b''
+        self.original = original
+        self.index = LineIndex(original)
+        self.pieces = [Piece(False, 0, size)] if size else []
+        self.length = size
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # ---- lookup -------------------------------------------------------
+
+    def _buffer(self, piece):
+        return self.add_buffer if piece.added else self.original
+
+    def _line_index(self, piece):
+        return self.add_index if piece.added else self.index
+
+    def index_step(self, max_bytes=None):
+        """Advance the background line index. Returns True when complete."""
+        return self.index.scan(max_bytes)
+
+    @property
+    def indexed(self):
+        return self.index.complete
+
+    def line_count(self):
+        """Exact number of lines (forces a full index scan)."""
+        total = 1
+        for piece in self.pieces:
+            total += self._line_index(piece).count_newlines(piece.start, piece.start + piece.length)
+        return total
+
+    def estimated_line_count(self):
+        """Line count extrapolated from the part of the file indexed so far."""
+        if self.index.complete:
+            return self.line_count()
+        index = self.index
+        ratio = len(self.original) / max(index.scanned, 1)
+        return max(int(index.seen_lines() * ratio), index.seen_lines())
+
+    def line_start(self, line):
+        """Byte offset where `line` (0-based) starts, or None past EOF."""
+        if line == 0:
+            return 0
+        remaining = line
+        offset = 0
+        for piece in self.pieces:
+            index = self._line_index(piece)
+            end = piece.start + piece.length
+            pos = index.nth_line_start(piece.start, remaining)
+            if pos is not None and pos <= end:
+                return offset + pos - piece.start
+            remaining -= index.count_newlines(piece.start, end)
+            offset += piece.length
+        return None
+
+    def read(self, offset, length):
+        """Bytes in [offset, offset + length) of the current text."""
+        out = []
+        pos = 0
+        stop = offset + length
+        for piece in self.pieces:
+            piece_end = pos + piece.length
+            if piece_end > offset and pos < stop:
+                lo = max(offset, pos) - pos + piece.start
+                hi = min(stop, piece_end) - pos + piece.start
+                out.append(self._buffer(piece)[lo:hi])
+            if piece_end >= stop:
+                break
+            pos = piece_end
+        return b''.join(out)
+
+    def lines(self, first, count_, max_line_bytes=64 * 1024):
+        """Up to `count_` lines starting at `first`, without line terminators.
+
+        Lines longer than `max_line_bytes` are truncated for display.
+        """
+        result = []
+        start = self.line_start(first)
+        if start is None:
+            return result
+        for line in range(first, first + count_):
+            end = self.line_start(line + 1)
+            if end is None:
+                data = self.read(start, min(self.length - start, max_line_bytes))
+                result.append(data.rstrip(b'\r'))
+                break
+            data = self.read(start, min(end - 1 - start, max_line_bytes))
+            result.append(data.rstrip(b'\r'))
+            start = end
+        return result
+
+    # ---- edits --------------------------------------------------------
+
+    def _split(self, offset):
+        """Ensure a piece boundary at `offset`; returns the piece index there."""
+        pos = 0
+        for i, piece in enumerate(self.pieces):
+            if offset == pos:
+                return i
+            if offset < pos + piece.length:
+                inner = offset - pos
+                tail = Piece(piece.added, piece.start + inner, piece.length - inner)
+                piece.length = inner
+                self.pieces.insert(i + 1, tail)
+                return i + 1
+            pos += piece.length
+        return len(self.pieces)
+
+    def insert(self, offset, data):
+        if not data:
+            return
+        start = len(self.add_buffer)
+        self.add_buffer += data
+        self.add_index.scan(len(data))
+        i = self._split(offset)
+        prev = self.pieces[i - 1] if i > 0 else None
+        if prev is not None and prev.added and prev.start + prev.length == start:
+            # Consecutive typing keeps extending the same piece
+            prev.length += len(data)
+        else:
+            self.pieces.insert(i, Piece(True, start, len(data)))
+        self.length += len(data)
+
+    def delete(self, offset, length):
+        """Remove `length` bytes at `offset` and return them."""
+        length = min(length, self.length - offset)
+        if length <= 0:
+            return b''
+        removed = self.read(offset, length)
+        first = self._split(offset)
+        last = self._split(offset + length)
+        del self.pieces[first:last]
+        self.length -= length
+        return removed
+
+    # ---- saving -------------------------------------------------------
+
+    def snapshot(self):
+        """Copy of the piece list, safe to write from another thread."""
+        return [Piece(p.added, p.start, p.length) for p in self.pieces]
+
+    def write_to(self, stream, pieces=None, block_size=1024 * 1024):
+        for piece in pieces if pieces is not None else self.pieces:
+            view = memoryview(self._buffer(piece))
+            pos = piece.start
+            end = piece.start + piece.length
+            while pos < end:
+                step = min(block_size, end - pos)
+                stream.write(view[pos:pos + step])
+                pos += step
+            view.release()
+
+    def commit_save(self, temp_path, file_path=None):
+        """Swap in a temp file produced by write_to() and map the saved file."""
+        file_path = file_path or self.file_path
+        # The mapping must be released before replacing the file (Windows)
+        self.close()
+        try:
+            replace_file(temp_path, file_path)
+        except BaseException:
+            self._open(self.file_path)
+            raise
+        self.file_path = file_path
+        self.add_buffer = bytearray()
+        self.add_index = LineIndex(self.add_buffer)
+        self._open(file_path)
+
+    def save(self, file_path=None):
+        """Stream the document to disk atomically."""
+        file_path = file_path or self.file_path
+        self.commit_save(write_temp_file(file_path, self.write_to), file_path)
@@ -0,0 +1,384 @@
+import functools
+import os
+import re
+import sqlite3
+import time
+from array import array
+from collections import Counter, namedtuple
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .folder_search import read_file_text
+from .workspace import is_inside, iter_workspace_files, matches_file_filter, workspace_cache_dir
+
+
+# Files offered to the AI as project context
+CONTEXT_EXTENSIONS = ('.lua', '.py', '.js', '.ts', '.json', '.xml', '.html', '.css',
+                      '.otui', '.otml', '.txt')
+CONTEXT_PATTERNS = ['*' + extension for extension in CONTEXT_EXTENSIONS]
+# Bigger files (data dumps, minified code) are left out
+MAX_CONTEXT_FILE_SIZE = 512 * 1024
+CHUNK_LINES = 40
+# A chunk this long is closed at the next top-level definition
+MIN_CHUNK_LINES = 10
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS files ("
+    " id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,"
+    " mtime_ns INTEGER, size INTEGER, stem TEXT)",
+    "CREATE INDEX IF NOT EXISTS files_stem ON files (stem)",
+    # Modules each file requires/imports, as bare file stems
+    "CREATE TABLE IF NOT EXISTS refs (file_id INTEGER NOT NULL, stem TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS refs_stem ON refs (stem)",
+    "CREATE INDEX IF NOT EXISTS refs_file ON refs (file_id)",
+    "CREATE TABLE IF NOT EXISTS chunks ("
+    " id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL,"
+    " first_line INTEGER, last_line INTEGER, text TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS chunks_file ON chunks (file_id)",
+    # The terms of each chunk (rowid = chunks.id), ranked with FTS5's bm25()
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chunk_terms USING fts5("
+    " terms, tokenize=\"unicode61 tokenchars '_'\")",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chunk_vocab USING fts5vocab(chunk_terms, 'row')",
+    # Normalized float32 vectors, when an embedder is set
+    "CREATE TABLE IF NOT EXISTS embeddings (chunk_id INTEGER PRIMARY KEY, vector BLOB NOT NULL)",
+)
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_CAMEL_PART = re.compile(r'[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])')
+_DEFINITION = re.compile(r'(?:local\s+)?function\b|def\s|class\s|[A-Za-z_][\w.:]*\s*=\s*(?:function\b|\{)')
+_REFERENCES = re.compile(
+    r'''(?:require|dofile|importStyle|loadfile)\s*\(?\s*['"]([^'"]+)['"]'''
+    r'''|^\s*(?:from|import)\s+([\w.]+)'''
+    r'''|\bfrom\s+['"]([^'"]+)['"]''',
+    re.MULTILINE)
+_STOPWORDS = frozenset((
+    'and', 'break', 'do', 'else', 'elseif', 'end', 'false', 'for', 'function', 'if', 'in',
+    'local', 'nil', 'not', 'or', 'repeat', 'return', 'then', 'true', 'until', 'while', 'self',
+    'def', 'class', 'import', 'from', 'none', 'var', 'let', 'const', 'this', 'new',
+    'the', 'what', 'how', 'why', 'does', 'with', 'that', 'are', 'can', 'file',
+    'que', 'como', 'para', 'por', 'uma', 'um', 'esse', 'este', 'isso', 'qual', 'quais',
+    'com', 'sem', 'mais', 'arquivo', 'codigo', 'código', 'funcao', 'função', 'faz', 'fazer',
+))
+
+Chunk = namedtuple('Chunk', 'id path first_line last_line text')
+
+
+@functools.lru_cache(maxsize=65536)
+def _identifier_terms(identifier):
+    found = []
+    lowered = identifier.lower()
+    if len(lowered) >= 3 and lowered not in _STOPWORDS:
+        found.append(lowered)
+    parts = [part.lower() for piece in identifier.split('_') for part in _CAMEL_PART.findall(piece)]
+    if len(parts) > 1:
+        found.extend(part for part in parts if len(part) >= 3 and part not in _STOPWORDS)
+    return tuple(found)
+
+
+def term_counts(text):
+    """Counter of the lowercased identifiers of `text`, camelCase/snake_case parts included."""
+    counts = Counter()
+    for identifier, count in Counter(_IDENTIFIER.findall(text)).items():
+        for term in _identifier_terms(identifier):
+            counts[term] += count
+    return counts
+
+
+def reference_stems(text):
+    """Module names a file requires/imports, reduced to bare file stems."""
+    stems = set()
+    for match in _REFERENCES.finditer(text):
+        reference = next(group for group in match.groups() if group)
+        reference = os.path.splitext(reference.replace('\\', '/'))[0]
+        if reference.endswith(('.lua', '.otui')):
+            reference = os.path.splitext(reference)[0]
+        stem = re.split(r'[/.]', reference)[-1].lower()
+        if stem:
+            stems.add(stem)
+    return stems
+
+
+def split_chunks(text):
+    """(first line, last line, text) pieces of a file.
+
+    Pieces are cut before top-level functions and tables where possible,
+    and never grow past CHUNK_LINES.
+    """
+    lines = text.splitlines()
+    chunks = []
+    start = 0
+    for number, line in enumerate(lines):
+        size = number - start
+        top_level_definition = line[:1].strip() and _DEFINITION.match(line)
+        if size >= CHUNK_LINES or (size >= MIN_CHUNK_LINES and top_level_definition):
+            chunks.append((start, number - 1, '\n'.join(lines[start:number])))
+            start = number
+    if start < len(lines):
+        chunks.append((start, len(lines) - 1, '\n'.join(lines[start:])))
+    return [chunk for chunk in chunks if chunk[2].strip()]
+
+
+def file_stem(path):
+    return os.path.splitext(os.path.basename(path))[0].lower()
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model as a RetrievalIndex embedder.
+
+    Any object with a `name` and an `embed(texts)` method returning one
+    vector per text can be used instead. The model is loaded from disk
+    only, so indexing never goes online.
+    """
+
+    def __init__(self, model_path):
+        from sentence_transformers import SentenceTransformer
+        self.name = f"sentence-transformers:{os.path.basename(os.path.normpath(model_path))}"
+        self.model = SentenceTransformer(model_path, local_files_only=True)
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), normalize_embeddings=True)
+
+
+def _normalized(vector):
+    values = array('f', vector)
+    norm = sum(value * value for value in values) ** 0.5 or 1.0
+    return array('f', (value / norm for value in values))
+
+
+class RetrievalIndex:
+    """On-disk BM25 index of the code chunks of a workspace, for AI context.
+
+    Kept in SQLite (FTS5) under the workspace's cache folder and updated
+    file by file by RetrievalIndexer. Queries rank chunks with bm25();
+    with an embedder, chunk vectors are stored too and can rerank the
+    results by similarity to the question.
+    """
+
+    FILE_NAME = 'retrieval_index.sqlite'
+
+    def __init__(self, root, embedder=None):
+        self.root = root
+        self.embedder = embedder
+        self.path = os.path.join(workspace_cache_dir(root), self.FILE_NAME)
+        self.last_refresh = 0.0
+        self._reader = None
+        connection = self.connect()
+        try:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            # Vectors of another model cannot be compared with this one's
+            name = embedder.name if embedder is not None else None
+            stored = connection.execute("SELECT value FROM meta WHERE key = 'embedder'").fetchone()
+            if name is not None and (stored is None or stored[0] != name):
+                connection.execute("DELETE FROM embeddings")
+                connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('embedder', ?)", (name,))
+            connection.commit()
+            self.ready = connection.execute("SELECT EXISTS (SELECT 1 FROM files)").fetchone()[0] == 1
+        finally:
+            connection.close()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # WAL lets queries read while the indexer writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def reader(self):
+        """Connection kept open for queries from the UI thread."""
+        if self._reader is None:
+            self._reader = self.connect()
+        return self._reader
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def chunk_count(self):
+        return self.reader().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def frequencies(self, terms):
+        """{term: number of chunks containing it} for the indexed terms among `terms`."""
+        terms = list(terms)
+        if not terms:
+            return {}
+        placeholders = ','.join('?' * len(terms))
+        return dict(self.reader().execute(
+            f"SELECT term, doc FROM chunk_vocab WHERE term IN ({placeholders})", terms))
+
+    def search(self, terms, limit=200):
+        """[(score, Chunk)] of the chunks with any of `terms`, best bm25 first."""
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        # Terms are identifiers, so quoting them is enough to make them literal
+        query = ' OR '.join(f'"{term}"' for term in terms)
+        rows = self.reader().execute(
+            "SELECT -bm25(chunk_terms), chunks.id, files.path, chunks.first_line, chunks.last_line, chunks.text"
+            " FROM chunk_terms JOIN chunks ON chunks.id = chunk_terms.rowid"
+            " JOIN files ON files.id = chunks.file_id"
+            " WHERE chunk_terms MATCH ? ORDER BY bm25(chunk_terms) LIMIT ?", (query, limit))
+        return [(score, Chunk(*row)) for score, *row in rows]
+
+    def related_chunks(self, stems, referenced_stem=None, max_files=20, per_file=2):
+        """First chunks of the files named by `stems` and of those requiring `referenced_stem`."""
+        stems = list(stems)
+        conditions = []
+        if stems:
+            conditions.append(f"SELECT id FROM files WHERE stem IN ({','.join('?' * len(stems))})")
+        if referenced_stem:
+            conditions.append("SELECT file_id FROM refs WHERE stem = ?")
+            stems.append(referenced_stem)
+        if not conditions:
+            return []
+        rows = self.reader().execute(
+            "SELECT id, path, first_line, last_line, text FROM ("
+            " SELECT chunks.*, files.path,"
+            "  ROW_NUMBER() OVER (PARTITION BY chunks.file_id ORDER BY chunks.first_line) AS number"
+            " FROM chunks JOIN files ON files.id = chunks.file_id"
+            f" WHERE chunks.file_id IN (SELECT * FROM ({' UNION '.join(conditions)}) LIMIT ?))"
+            " WHERE number <= ?", (*stems, max_files, per_file))
+        return [Chunk(*row) for row in rows]
+
+    def similarities(self, text, chunk_ids):
+        """{chunk id: cosine similarity to `text`} for the chunks with a vector."""
+        if self.embedder is None or not chunk_ids:
+            return {}
+        chunk_ids = list(chunk_ids)
+        query = _normalized(self.embedder.embed([text])[0])
+        rows = self.reader().execute(
+            f"SELECT chunk_id, vector FROM embeddings WHERE chunk_id IN ({','.join('?' * len(chunk_ids))})",
+            chunk_ids)
+        similarities = {}
+        for chunk_id, blob in rows:
+            vector = array('f')
+            vector.frombytes(blob)
+            similarities[chunk_id] = sum(a * b for a, b in zip(query, vector))
+        return similarities
+
+
+class RetrievalIndexer(QThread):
+    """Brings a RetrievalIndex up to date outside the UI thread.
+
+    Files whose mtime and size did not change are skipped, so refreshing
+    an indexed workspace only costs a walk of the tree. Pass `paths` to
+    update just those files (e.g. after a save).
+    """
+
+    index_ready = pyqtSignal(int, float)  # files (re)indexed, seconds
+
+    COMMIT_INTERVAL = 1.0
+    EMBED_BATCH = 64
+
+    def __init__(self, index, paths=None):
+        super().__init__()
+        self.index = index
+        self.paths = paths
+        self.embedder = index.embedder
+
+    def run(self):
+        start_time = time.perf_counter()
+        connection = self.index.connect()
+        known = {path: (file_id, mtime_ns, size) for file_id, path, mtime_ns, size
+                 in connection.execute("SELECT id, path, mtime_ns, size FROM files")}
+        full_walk = self.paths is None
+        if full_walk:
+            paths = iter_workspace_files(self.index.root, CONTEXT_PATTERNS)
+        else:
+            paths = (path for path in self.paths if is_inside(path, self.index.root)
+                     and matches_file_filter(os.path.basename(path), CONTEXT_PATTERNS))
+        seen = set()
+        indexed = 0
+        last_commit = time.perf_counter()
+        try:
+            for path in paths:
+                if self.isInterruptionRequested():
+                    full_walk = False  # not everything was seen: delete nothing
+                    break
+                relative = os.path.relpath(path, self.index.root)
+                seen.add(relative)
+                if self._update_file(connection, path, relative, known.get(relative)):
+                    indexed += 1
+                if time.perf_counter() - last_commit >= self.COMMIT_INTERVAL:
+                    connection.commit()
+                    last_commit = time.perf_counter()
+
+            if full_walk:
+                for relative in known.keys() - seen:
+                    self._remove(connection, known[relative][0])
+            connection.commit()
+            if self.embedder is not None:
+                self._embed_missing(connection)
+        finally:
+            connection.close()
+        if full_walk:
+            self.index.ready = True
+            self.index.last_refresh = time.time()
+        self.index_ready.emit(indexed, time.perf_counter() - start_time)
+
+    def _update_file(self, connection, path, relative, known):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if known:
+                self._remove(connection, known[0])
+            return False
+        if known and known[1:] == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        # Files too big or not text are recorded without chunks, so they
+        # are not read again until they change
+        text = read_file_text(path) if stat.st_size <= MAX_CONTEXT_FILE_SIZE else None
+        if known:
+            file_id = known[0]
+            self._remove_chunks(connection, file_id)
+            connection.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                               (stat.st_mtime_ns, stat.st_size, file_id))
+        else:
+            file_id = connection.execute(
+                "INSERT INTO files (path, mtime_ns, size, stem) VALUES (?, ?, ?, ?)",
+                (relative, stat.st_mtime_ns, stat.st_size, file_stem(path))).lastrowid
+        if text is None:
+            return True
+
+        connection.executemany("INSERT INTO refs (file_id, stem) VALUES (?, ?)",
+                               [(file_id, stem) for stem in reference_stems(text)])
+        for first, last, chunk in split_chunks(text):
+            chunk_id = connection.execute(
+                "INSERT INTO chunks (file_id, first_line, last_line, text) VALUES (?, ?, ?, ?)",
+                (file_id, first, last, chunk)).lastrowid
+            connection.execute("INSERT INTO chunk_terms (rowid, terms) VALUES (?, ?)",
+                               (chunk_id, ' '.join(term_counts(chunk).elements())))
+        return True
+
+    def _embed_missing(self, connection):
+        """Store vectors for the chunks without one (new, or of another embedder)."""
+        missing = connection.execute(
+            "SELECT id, text FROM chunks WHERE id NOT IN (SELECT chunk_id FROM embeddings)").fetchall()
+        for start in range(0, len(missing), self.EMBED_BATCH):
+            if self.isInterruptionRequested():
+                return
+            batch = missing[start:start + self.EMBED_BATCH]
+            try:
+                vectors = self.embedder.embed([text for _, text in batch])
+            except Exception as e:
+                # The BM25 index stays usable without vectors
+                print(f"Embedding failed, indexing without vectors: {e}")
+                return
+            connection.executemany("INSERT OR REPLACE INTO embeddings (chunk_id, vector) VALUES (?, ?)",
+                                   [(chunk_id, _normalized(vector).tobytes())
+                                    for (chunk_id, _), vector in zip(batch, vectors)])
+            connection.commit()
+
+    def _remove_chunks(self, connection, file_id):
+        ids = [(chunk_id,) for chunk_id, in connection.execute("SELECT id FROM chunks WHERE file_id = ?", (file_id,))]
+        connection.executemany("DELETE FROM chunk_terms WHERE rowid = ?", ids)
+        connection.executemany("DELETE FROM embeddings WHERE chunk_id = ?", ids)
+        connection.execute("DELETE FROM chunks WHERE file_id = ?", (file_id,))
+        connection.execute("DELETE FROM refs WHERE file_id = ?", (file_id,))
+
+    def _remove(self, connection, file_id):
+        self._remove_chunks(connection, file_id)
+        connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
@@ -0,0 +1,366 @@
+import functools
+import re
+import time
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+from bisect import bisect_left
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .text_utils import astral_indexes, from_qt_position, to_qt_position
+
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(pattern, flags=0):
+    """re.compile with its own cache, so typing never recompiles a pattern."""
+    return re.compile(pattern, flags)
+
+
+def build_pattern(search_text, case_sensitive=False, whole_word=False, regex=False):
+    """Compile the search text with the same options as QTextDocument.find.
+
+    In regex mode the text is used as a Python regular expression
+    (raises re.error if it is invalid); '^' and '$' match at every line.
+    """
+    pattern = search_text if regex else re.escape(search_text)
+    if whole_word:
+        pattern = rf'(?<!\w)(?:{pattern})(?!\w)'
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return compile_pattern(pattern, flags)
+
+
+def replacement_template(replacement, regex=False):
+    """Template for re.sub/Match.expand.
+
+    Group references (\\1, \\g<name>) only work in regex mode; otherwise
+    backslashes are kept as typed.
+    """
+    return replacement if regex else replacement.replace('\\', '\\\\')
+
+
+class TextSnapshot:
+    """Text of a QTextDocument at one point in time.
+
+    Paragraph separators become '\\n' so patterns work line by line, and
+    Python indexes can be converted to document (UTF-16) positions.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.astral = astral_indexes(text)
+
+    @classmethod
+    def from_document(cls, document):
+        # toRawText keeps characters such as no-break spaces that
+        # toPlainText would normalize, so rebuilt text stays identical
+        return cls(document.toRawText().replace('\u2029', '\n'))
+
+    def position(self, index):
+        """Document position of a Python index into the text."""
+        return to_qt_position(index, self.astral)
+
+    def index(self, position):
+        """Python index into the text of a document position."""
+        return from_qt_position(position, self.astral)
+
+
+def find_match(snapshot, pattern, index, backward=False):
+    """First match starting at or after `index` (or the last one before it).
+
+    Returns None if there is none; the caller decides whether to wrap.
+    """
+    text = snapshot.text
+    if not backward:
+        return pattern.search(text, index)
+
+    # Search windows of growing size backwards from the index, so finding
+    # a nearby match does not scan the whole text before it
+    window = 64 * 1024
+    while True:
+        start = max(0, index - window)
+        last = None
+        for match in pattern.finditer(text, start):
+            if match.start() >= index:
+                break
+            last = match
+        if last is not None or start == 0:
+            return last
+        window *= 4
+
+
+class ReplaceResult:
+    __slots__ = ('count', 'start', 'end', 'text', 'elapsed')
+
+    def __init__(self, count, start, end, text, elapsed):
+        self.count = count
+        self.start = start  # span of the snapshot text to replace...
+        self.end = end
+        self.text = text    # ...with this text
+        self.elapsed = elapsed
+
+
+def _common_suffix(a, b, block=4096):
+    """Length of the longest common suffix of two strings."""
+    len_a, len_b = len(a), len(b)
+    limit = min(len_a, len_b)
+    size = 0
+    # Compare whole blocks first (fast C slices), then characters
+    while size + block <= limit and a[len_a - size - block:len_a - size] == b[len_b - size - block:len_b - size]:
+        size += block
+    while size < limit and a[len_a - size - 1] == b[len_b - size - 1]:
+        size += 1
+    return size
+
+
+def replace_all(snapshot, pattern, replacement, regex=False):
+    """Replace every match in one pass over the snapshot.
+
+    Only the span from the first match to the end of the last changed
+    character is returned, so the result can be applied as a single edit.
+    """
+    start_time = time.perf_counter()
+    text = snapshot.text
+    first = pattern.search(text)
+    if first is None:
+        return ReplaceResult(0, 0, 0, '', time.perf_counter() - start_time)
+
+    # Substitute over the whole text so lookbehinds and anchors see the
+    # real context; everything before the first match is left as it was
+    new_text, count = pattern.subn(replacement_template(replacement, regex), text)
+    start = first.start()
+    tail = text[start:]
+    new_tail = new_text[start:]
+    unchanged = _common_suffix(tail, new_tail)
+    return ReplaceResult(count, start, len(text) - unchanged, new_tail[:len(new_tail) - unchanged],
+                         time.perf_counter() - start_time)
+
+
+_NEWLINE = ord('\n')
+# Character categories that include '\n'
+_NEWLINE_CATEGORIES = frozenset(('CATEGORY_SPACE', 'CATEGORY_NOT_WORD', 'CATEGORY_NOT_DIGIT',
+                                 'CATEGORY_LINEBREAK', 'CATEGORY_UNI_SPACE', 'CATEGORY_UNI_NOT_WORD',
+                                 'CATEGORY_UNI_NOT_DIGIT', 'CATEGORY_UNI_LINEBREAK'))
+
+
+# Possessive repeats and atomic groups only exist from Python 3.11 on
+_REPEATS = tuple(op for op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT,
+                               getattr(sre_parse, 'POSSESSIVE_REPEAT', None)) if op is not None)
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+
+
+def _class_has_newline(items):
+    negated = bool(items) and items[0][0] is sre_parse.NEGATE
+    found = False
+    for op, value in items[negated:]:
+        if op is sre_parse.LITERAL:
+            found = value == _NEWLINE
+        elif op is sre_parse.RANGE:
+            found = value[0] <= _NEWLINE <= value[1]
+        elif op is sre_parse.CATEGORY:
+            found = str(value) in _NEWLINE_CATEGORIES
+        if found:
+            break
+    return found != negated
+
+
+def _spans_lines(nodes, dotall):
+    for op, value in nodes:
+        if op is sre_parse.LITERAL:
+            if value == _NEWLINE:
+                return True
+        elif op is sre_parse.NOT_LITERAL:
+            if value != _NEWLINE:
+                return True
+        elif op is sre_parse.ANY:
+            if dotall:
+                return True
+        elif op is sre_parse.IN:
+            if _class_has_newline(value):
+                return True
+        elif op is sre_parse.AT:
+            # \A and \Z would also match at the edges of the text searched again
+            if str(value) in ('AT_BEGINNING_STRING', 'AT_END_STRING'):
+                return True
+        elif op is sre_parse.BRANCH:
+            if any(_spans_lines(branch, dotall) for branch in value[1]):
+                return True
+        elif op is sre_parse.GROUPREF_EXISTS:
+            if any(branch is not None and _spans_lines(branch, dotall) for branch in value[1:]):
+                return True
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            if _spans_lines(value[1], dotall):
+                return True
+        elif op is sre_parse.SUBPATTERN:
+            add_flags, del_flags = value[1], value[2]
+            inner_dotall = (dotall or bool(add_flags & re.DOTALL)) and not del_flags & re.DOTALL
+            if _spans_lines(value[-1], inner_dotall):
+                return True
+        elif op in _REPEATS:
+            if _spans_lines(value[-1], dotall):
+                return True
+        elif op is _ATOMIC_GROUP:
+            if _spans_lines(value, dotall):
+                return True
+    return False
+
+
+@functools.lru_cache(maxsize=64)
+def can_span_lines(pattern):
+    """Whether a compiled pattern may match text across a line break.
+
+    Such matches depend on more than the lines around an edit. Patterns
+    that cannot be analysed count as spanning lines.
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return True
+    return _spans_lines(parsed, bool(pattern.flags & re.DOTALL))
+
+
+class MatchIndex:
+    """Positions of every match of a pattern in a document.
+
+    Positions are document (UTF-16) positions, kept current on edits:
+    only the blocks around an edit are searched again (the whole document
+    when the pattern can match across lines). Entries after an
+    edit are shifted lazily -- from `_shift_from` on they are stored
+    without the pending `_shift` -- so typing in one place costs the same
+    however many matches follow it.
+    """
+
+    def __init__(self, pattern, starts, ends):
+        self.pattern = pattern
+        self._starts = starts
+        self._ends = ends
+        self._shift_from = len(starts)
+        self._shift = 0
+
+    @classmethod
+    def from_snapshot(cls, pattern, snapshot, should_stop=None):
+        """Index every match in the snapshot (None if stopped early)."""
+        starts = []
+        ends = []
+        position = snapshot.position
+        for match in pattern.finditer(snapshot.text):
+            if should_stop is not None and should_stop():
+                return None
+            starts.append(position(match.start()))
+            ends.append(position(match.end()))
+        return cls(pattern, starts, ends)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _value(self, values, k):
+        return values[k] + self._shift if k >= self._shift_from else values[k]
+
+    def _bisect(self, position):
+        """Index of the first match starting at or after `position`."""
+        starts = self._starts
+        k = bisect_left(starts, position, 0, self._shift_from)
+        if k < self._shift_from:
+            return k
+        return bisect_left(starts, position - self._shift, self._shift_from, len(starts))
+
+    def _add(self, first, last, delta):
+        starts, ends = self._starts, self._ends
+        for k in range(first, last):
+            starts[k] += delta
+            ends[k] += delta
+
+    def number(self, position):
+        """1-based number of the match starting at `position`, 0 if none."""
+        k = self._bisect(position)
+        if k < len(self._starts) and self._value(self._starts, k) == position:
+            return k + 1
+        return 0
+
+    def matches_between(self, first, last):
+        """(start, end) of the matches starting between two positions."""
+        k = self._bisect(first)
+        while k < len(self._starts):
+            start = self._value(self._starts, k)
+            if start > last:
+                break
+            yield start, self._value(self._ends, k)
+            k += 1
+
+    def update(self, document, position, removed, added):
+        """Apply a QTextDocument.contentsChange to the index."""
+        if can_span_lines(self.pattern):
+            self._recount(document)
+            return
+        delta = added - removed
+        first_block = document.findBlock(position)
+        last_block = document.findBlock(position + added)
+        # One more block, so a match running over the line break is found again
+        if last_block.next().isValid():
+            last_block = last_block.next()
+        start = first_block.position()
+        i = self._bisect(start)
+        # Matches from earlier blocks that reached into the edit are redone too
+        while i > 0 and self._value(self._ends, i - 1) > start:
+            first_block = document.findBlock(self._value(self._starts, i - 1))
+            start = first_block.position()
+            i = self._bisect(start)
+        end = last_block.position() + last_block.length() - 1
+        j = self._bisect(end - delta)
+
+        lines = []
+        block = first_block
+        while True:
+            lines.append(block.text())
+            if block == last_block:
+                break
+            block = block.next()
+        text = '\n'.join(lines)
+        astral = astral_indexes(text)
+        new_starts = []
+        new_ends = []
+        for match in self.pattern.finditer(text):
+            new_starts.append(start + to_qt_position(match.start(), astral))
+            new_ends.append(start + to_qt_position(match.end(), astral))
+
+        # Move the pending shift boundary into [i, j]: entries it passes
+        # over get their real position (or lose the shift) explicitly
+        if self._shift_from < i:
+            self._add(self._shift_from, i, self._shift)
+        elif self._shift_from > j:
+            self._add(j, self._shift_from, -self._shift)
+        self._starts[i:j] = new_starts
+        self._ends[i:j] = new_ends
+        self._shift_from = i + len(new_starts)
+        self._shift += delta
+
+    def _recount(self, document):
+        index = MatchIndex.from_snapshot(self.pattern, TextSnapshot.from_document(document))
+        self._starts = index._starts
+        self._ends = index._ends
+        self._shift_from = len(self._starts)
+        self._shift = 0
+
+
+class MatchCounter(QThread):
+    """Builds the MatchIndex of a snapshot outside the UI thread.
+
+    `matches_found` carries the request id given to the constructor, so
+    results of a search that has since changed can be ignored.
+    """
+
+    matches_found = pyqtSignal(int, object)  # request id, MatchIndex
+
+    def __init__(self, request_id, snapshot, pattern):
+        super().__init__()
+        self.request_id = request_id
+        self.snapshot = snapshot
+        self.pattern = pattern
+
+    def run(self):
+        index = MatchIndex.from_snapshot(self.pattern, self.snapshot, self.isInterruptionRequested)
+        if index is not None:
+            self.matches_found.emit(self.request_id, index)
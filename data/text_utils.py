@@ -0,0 +1,33 @@
+import re
+from bisect import bisect_left
+
+
+# Characters outside the BMP take two positions in Qt (UTF-16) strings
+_ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+
+
+def astral_indexes(text):
+    """Python indexes of the characters stored as surrogate pairs by Qt."""
+    if text.isascii():
+        return []
+    return [m.start() for m in _ASTRAL.finditer(text)]
+
+
+def to_qt_position(index, astral):
+    """Convert a Python string index to a Qt (UTF-16) position."""
+    return index + bisect_left(astral, index) if astral else index
+
+
+def from_qt_position(position, astral):
+    """Convert a Qt (UTF-16) position back to a Python string index."""
+    if not astral:
+        return position
+    # The n-th astral character sits at Qt position astral[n] + n
+    low, high = 0, len(astral)
+    while low < high:
+        middle = (low + high) // 2
+        if astral[middle] + middle < position:
+            low = middle + 1
+        else:
+            high = middle
+    return position - low
@@ -0,0 +1,282 @@
+import os
+import re
+import sqlite3
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .folder_search import read_file_text
+from .workspace import iter_workspace_files, workspace_cache_dir
+
+
+# Bigger files are not indexed; searches always read them
+MAX_INDEXED_SIZE = 2 * 1024 * 1024
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS files ("
+    " id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,"
+    " mtime_ns INTEGER, size INTEGER, kind TEXT)",
+    # detail=none keeps no token positions: the index only narrows files
+    # down, LIKE confirms the substring on the stored text
+    "CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5("
+    " text, tokenize='trigram', detail=none)",
+)
+
+_ESCAPABLE = set('.^$*+?{}[]()|\\-/#&~ "\'<>=!,:;%@`')
+_QUANTIFIER = re.compile(r'\{(\d*)(,\d*)?\}')
+# Escapes longer than two characters: hex, unicode, named, octal and back-references
+# Prefixes of the (?...) groups understood: non-capturing, atomic,
+# lookarounds, named, and inline flags (scoped "(?i:" or global "(?i)")
+_GROUP_PREFIX = re.compile(r'\(\?(?:[:>=!]|<[=!]|P<\w+>|([aiLmsux]*(?:-[imsx]+)?)[:)])')
+_LONG_ESCAPE = re.compile(r'\\(?:x[0-9A-Fa-f]{0,2}|u[0-9A-Fa-f]{0,4}|U[0-9A-Fa-f]{0,8}|N\{[^}]*\}?|[0-9]{1,3})')
+
+
+def _optional_quantifier(text):
+    """Whether `text` starts with a quantifier that allows zero repeats."""
+    if text[:1] in ('?', '*'):
+        return True
+    quantifier = _QUANTIFIER.match(text)
+    return bool(quantifier) and int(quantifier.group(1) or 0) == 0
+
+
+def _ascii_runs(literal):
+    return re.findall(r'[\x00-\x7f]{3,}', literal)
+
+
+def required_literals(pattern):
+    """Literal strings that any match of a regex must contain.
+
+    Conservative: anything it does not understand (alternatives,
+    lookarounds, verbose mode) just yields fewer literals, possibly none.
+    """
+    if '|' in pattern or '(?x' in pattern:
+        return []
+    literals = []
+    run = []
+    groups = []  # for each open group: index into literals, and whether it is a lookaround
+    i = 0
+
+    def flush():
+        if run:
+            literals.append(''.join(run))
+            run.clear()
+
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            escaped = pattern[i + 1:i + 2]
+            long_escape = _LONG_ESCAPE.match(pattern, i)
+            if long_escape:
+                # The character it stands for is not worth decoding: the
+                # whole escape is skipped, so its digits are not taken as text
+                flush()
+                i = long_escape.end()
+                continue
+            if escaped and escaped in _ESCAPABLE:
+                run.append(escaped)
+            else:
+                flush()  # \w, \d, \b, ... stand for unknown text
+            i += 2
+            continue
+        quantifier = _QUANTIFIER.match(pattern, i) if char == '{' else None
+        if char in '*?' or quantifier:
+            if run and _optional_quantifier(pattern[i:]):
+                run.pop()  # the previous character may be absent
+            flush()
+            if quantifier:
+                i = quantifier.end()
+                continue
+        elif char == '[':
+            flush()
+            i += 1
+            if pattern[i:i + 1] == '^':
+                i += 1
+            if pattern[i:i + 1] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+        elif char == '(':
+            flush()
+            if pattern.startswith(('(?P=', '(?#'), i):
+                # Back-reference or comment: nothing known about the text
+                end = pattern.find(')', i)
+                i = end + 1 if end >= 0 else len(pattern)
+                continue
+            if pattern.startswith('(?', i):
+                prefix = _GROUP_PREFIX.match(pattern, i)
+                flags = prefix.group(1) if prefix else None
+                if prefix is None or (flags and 'x' in flags.partition('-')[0]):
+                    return []  # an unknown kind of group, or verbose mode: no guess
+                if prefix.group().endswith(')'):
+                    # Global flags such as (?im): not a group, no text
+                    i = prefix.end()
+                    continue
+                lookaround = pattern.startswith(('(?=', '(?!', '(?<=', '(?<!'), i)
+                groups.append((len(literals), lookaround))
+                # Skip the group's prefix, e.g. (?: or (?P<name> or (?i:
+                i = prefix.end() - 1
+            else:
+                groups.append((len(literals), False))
+        elif char == ')':
+            flush()
+            if groups:
+                start, lookaround = groups.pop()
+                if lookaround or _optional_quantifier(pattern[i + 1:]):
+                    del literals[start:]
+        elif char in '.^$+':
+            flush()
+        else:
+            run.append(char)
+        i += 1
+    flush()
+    return literals
+
+
+class TrigramIndex:
+    """On-disk trigram index of the text files of a workspace.
+
+    Kept in SQLite (FTS5 with the trigram tokenizer) under the
+    workspace's cache folder. Queries return the files that can contain
+    a match; callers still search those files to confirm.
+    """
+
+    FILE_NAME = 'search_index.sqlite'
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(workspace_cache_dir(root), self.FILE_NAME)
+        self.last_refresh = 0.0
+        # Files may have changed since an earlier session left the index:
+        # it is trusted only once a full refresh has checked every file
+        self.ready = False
+        connection = self.connect()
+        try:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # WAL lets searches read while the indexer writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def candidates(self, search_text, regex=False):
+        """Paths of the files that may contain a match, None if unknown.
+
+        None means the query cannot be narrowed (e.g. fewer than three
+        known characters) and every file has to be searched. Paths are
+        produced while the query runs, so call this from a worker thread.
+        """
+        literals = required_literals(search_text) if regex else [search_text]
+        # LIKE is case-insensitive for ASCII only; '%' cannot be escaped
+        # without losing the index, and '_' just matches any character
+        parts = [run for literal in literals for piece in literal.split('%')
+                 for run in _ascii_runs(piece)]
+        if not parts:
+            return None
+        return self._query_paths(parts)
+
+    def _query_paths(self, parts):
+        where = ' AND '.join(['content.text LIKE ?'] * len(parts))
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                f"SELECT files.path FROM content JOIN files ON files.id = content.rowid WHERE {where} "
+                "UNION ALL SELECT path FROM files WHERE kind = 'large'",
+                [f'%{part}%' for part in parts])
+            for path, in rows:
+                yield os.path.join(self.root, path)
+        finally:
+            connection.close()
+
+
+class WorkspaceIndexer(QThread):
+    """Brings a TrigramIndex up to date outside the UI thread.
+
+    Files whose mtime and size did not change are skipped, so refreshing
+    an indexed workspace only costs a walk of the tree. Pass `paths` to
+    update just those files (e.g. after a save).
+    """
+
+    progress = pyqtSignal(int, int)  # files checked, files (re)indexed
+    index_ready = pyqtSignal(int, float)  # files (re)indexed, seconds
+
+    COMMIT_INTERVAL = 1.0
+
+    def __init__(self, index, paths=None):
+        super().__init__()
+        self.index = index
+        self.paths = paths
+
+    def run(self):
+        start_time = time.perf_counter()
+        connection = self.index.connect()
+        known = {path: (file_id, mtime_ns, size) for file_id, path, mtime_ns, size
+                 in connection.execute("SELECT id, path, mtime_ns, size FROM files")}
+        full_walk = self.paths is None
+        paths = iter_workspace_files(self.index.root) if full_walk else self.paths
+        seen = set()
+        checked = indexed = 0
+        last_commit = time.perf_counter()
+        try:
+            for path in paths:
+                if self.isInterruptionRequested():
+                    full_walk = False  # not everything was seen: delete nothing
+                    break
+                relative = os.path.relpath(path, self.index.root)
+                seen.add(relative)
+                checked += 1
+                if self._update_file(connection, path, relative, known.get(relative)):
+                    indexed += 1
+                if time.perf_counter() - last_commit >= self.COMMIT_INTERVAL:
+                    connection.commit()
+                    last_commit = time.perf_counter()
+                    self.progress.emit(checked, indexed)
+
+            if full_walk:
+                for relative in known.keys() - seen:
+                    self._remove(connection, known[relative][0])
+            connection.commit()
+        finally:
+            connection.close()
+        if full_walk:
+            self.index.ready = True
+            self.index.last_refresh = time.time()
+        self.index_ready.emit(indexed, time.perf_counter() - start_time)
+
+    def _update_file(self, connection, path, relative, known):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if known:
+                self._remove(connection, known[0])
+            return False
+        if known and known[1:] == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        text = None
+        if stat.st_size > MAX_INDEXED_SIZE:
+            kind = 'large'
+        else:
+            text = read_file_text(path)
+            kind = 'binary' if text is None else 'text'
+        if known:
+            file_id = known[0]
+            connection.execute("DELETE FROM content WHERE rowid = ?", (file_id,))
+            connection.execute("UPDATE files SET mtime_ns = ?, size = ?, kind = ? WHERE id = ?",
+                               (stat.st_mtime_ns, stat.st_size, kind, file_id))
+        else:
+            file_id = connection.execute(
+                "INSERT INTO files (path, mtime_ns, size, kind) VALUES (?, ?, ?, ?)",
+                (relative, stat.st_mtime_ns, stat.st_size, kind)).lastrowid
+        if text is not None:
+            connection.execute("INSERT INTO content (rowid, text) VALUES (?, ?)", (file_id, text))
+        return True
+
+    def _remove(self, connection, file_id):
+        connection.execute("DELETE FROM content WHERE rowid = ?", (file_id,))
+        connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
@@ -0,0 +1,80 @@
+import fnmatch
+import hashlib
+import os
+
+
+# Folder (inside the workspace) where indexes and caches are kept
+CACHE_DIR_NAME = '.projectai'
+
+# Folders never searched or indexed: VCS data, dependencies, caches
+IGNORED_DIRS = frozenset({'.git', '.hg', '.svn', 'node_modules', '__pycache__', '.vscode',
+                          CACHE_DIR_NAME})
+
+
+def parse_file_filter(text):
+    """Split "*.lua, *.otui" into fnmatch patterns (empty means all files)."""
+    return [part.strip() for part in text.replace(';', ',').split(',') if part.strip()]
+
+
+def matches_file_filter(name, patterns):
+    return not patterns or any(fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def path_key(path):
+    """Normalized form of a path, for telling whether two paths are the same file."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def is_inside(path, root):
+    try:
+        relative = os.path.relpath(path_key(path), path_key(root))
+    except ValueError:  # another drive
+        return False
+    return relative != os.pardir and not relative.startswith(os.pardir + os.sep)
+
+
+def workspace_cache_dir(root):
+    """Folder for the workspace's indexes and caches, created if needed.
+
+    It lives in the workspace itself; read-only workspaces fall back to a
+    folder per workspace under ~/.projectai.
+    """
+    path = os.path.join(root, CACHE_DIR_NAME)
+    try:
+        os.makedirs(path, exist_ok=True)
+        if os.access(path, os.W_OK):
+            return path
+    except OSError:
+        pass
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    path = os.path.join(os.path.expanduser('~'), CACHE_DIR_NAME, digest)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def iter_workspace_files(root, patterns=(), ignored_dirs=IGNORED_DIRS):
+    """Yield the files under `root`, lazily and depth-first.
+
+    Files come out while the tree is still being walked, so callers can
+    start working on the first ones right away.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in ignored_dirs:
+                        subdirs.append(entry.path)
+                elif entry.is_file():
+                    if matches_file_filter(entry.name, patterns):
+                        yield entry.path
+            except OSError:
+                continue
+        # Reversed so folders are visited in directory order
+        stack.extend(reversed(subdirs))